@@ -0,0 +1,22 @@
+-- ส่วนของเลขครุภัณฑ์ (ประเภท-ชนิด-ลำดับ-วิธีได้มา-ปี พ.ศ.) แยกเป็น column ที่มี index
+-- import_equipment.py เติมค่าผ่าน python/equipment_codes.py (และแตกช่วงเลขเป็นแถวละชิ้น)
+ALTER TABLE equipment ADD COLUMN IF NOT EXISTS code_type VARCHAR(9);     -- เช่น 7110-0626
+ALTER TABLE equipment ADD COLUMN IF NOT EXISTS code_running INTEGER;     -- ลำดับ
+ALTER TABLE equipment ADD COLUMN IF NOT EXISTS code_method SMALLINT;     -- วิธีได้มา
+ALTER TABLE equipment ADD COLUMN IF NOT EXISTS code_year SMALLINT;       -- ปี พ.ศ.
+
+CREATE INDEX IF NOT EXISTS idx_equipment_code_parts ON equipment(code_type, code_year, code_running);
+
+-- แถวเดิมที่เป็นรูปแบบมาตรฐานอยู่แล้ว (ช่วงเลขต้อง import ใหม่เพื่อแตกเป็นแถว)
+UPDATE equipment
+SET code_type = substring(equipment_code from '^(\d{4}-\d{2,4})-'),
+    code_running = substring(equipment_code from '^\d{4}-\d{2,4}-(\d{1,5})-')::int,
+    code_method = substring(equipment_code from '^\d{4}-\d{2,4}-\d{1,5}-(\d{1,2})-')::smallint,
+    code_year = substring(equipment_code from '-(\d{4})$')::smallint
+WHERE code_type IS NULL
+  AND equipment_code ~ '^\d{4}-\d{2,4}-\d{1,5}-\d{1,2}-\d{4}$';
+
+COMMENT ON COLUMN equipment.code_type IS 'ประเภท-ชนิด จากเลขครุภัณฑ์';
+COMMENT ON COLUMN equipment.code_running IS 'ลำดับจากเลขครุภัณฑ์';
+COMMENT ON COLUMN equipment.code_method IS 'วิธีได้มาจากเลขครุภัณฑ์';
+COMMENT ON COLUMN equipment.code_year IS 'ปี พ.ศ. จากเลขครุภัณฑ์';
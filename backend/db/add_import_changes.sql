@@ -0,0 +1,21 @@
+-- บันทึกการเปลี่ยนแปลงจากการ import (change log) - แถวละหนึ่ง insert / update / delete ตาม natural key
+-- python/change_log.py เขียนผ่าน ImportAudit (ใน transaction เดียวกับข้อมูล) ห้าม UPDATE/DELETE
+-- partition รายเดือนตาม changed_at: importer สร้าง partition ของเดือนให้เอง, ลบประวัติเก่าด้วย DROP TABLE import_changes_YYYY_MM
+CREATE TABLE IF NOT EXISTS import_changes (
+    run_id VARCHAR(40) NOT NULL,              -- ตรงกับ details->>'run' ใน activity_logs
+    table_name VARCHAR(50) NOT NULL,
+    change_type VARCHAR(10) NOT NULL CHECK (change_type IN ('insert', 'update', 'delete')),
+    row_key JSONB NOT NULL,                   -- natural key เช่น {"full_name": ..., "rank": ...}
+    changed_columns TEXT[],                   -- update เท่านั้น
+    old_values JSONB,                         -- update: เฉพาะ column ที่เปลี่ยน, delete: ทั้งแถว
+    new_values JSONB,                         -- update: เฉพาะ column ที่เปลี่ยน, insert: ทั้งแถว
+    source_file VARCHAR(255),
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+) PARTITION BY RANGE (changed_at);
+
+-- แถวที่ไม่ตรง partition ใด (ไม่ควรมี)
+CREATE TABLE IF NOT EXISTS import_changes_default PARTITION OF import_changes DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_import_changes_table_time ON import_changes(table_name, changed_at);
+CREATE INDEX IF NOT EXISTS idx_import_changes_run ON import_changes(run_id);
+CREATE INDEX IF NOT EXISTS idx_import_changes_key ON import_changes USING GIN (row_key jsonb_path_ops);
@@ -0,0 +1,4 @@
+-- Index สำหรับเงื่อนไขที่ updater/importer ใช้หาแถว (ดู python/index_advisor.py)
+
+-- import_secondment.py: merge ตาม (full_name, destination_unit)
+CREATE INDEX IF NOT EXISTS idx_secondment_key ON secondment(full_name, destination_unit);
@@ -0,0 +1,26 @@
+-- อายุ / อายุราชการ / ปีงบประมาณที่เกษียณ ของแต่ละคน และประมาณการเกษียณรายปีต่อ บก.
+-- คำนวณครั้งเดียวหลัง import ด้วย python/retirement_forecast.py (excel_parser.py เรียกให้อัตโนมัติ)
+-- dashboard อ่านจากตารางนี้แทนการคำนวณจากวันที่ทีละแถวตอน query
+CREATE TABLE IF NOT EXISTS personnel_tenure (
+    personnel_id INTEGER PRIMARY KEY REFERENCES personnel(id) ON DELETE CASCADE,
+    age_years SMALLINT,                       -- อายุ (ปีเต็ม) ณ วันที่คำนวณ
+    service_years NUMERIC(4,1),               -- อายุราชการนับจากวันบรรจุ
+    years_in_position NUMERIC(4,1),           -- นับจากวันแต่งตั้งครั้งสุดท้าย
+    retirement_date DATE,                     -- จาก Excel หรือคำนวณจากวันเกิด (retirement_projected)
+    retirement_fiscal_year SMALLINT,          -- ปีงบประมาณ (พ.ศ.) ที่เกษียณ
+    retirement_projected BOOLEAN NOT NULL DEFAULT FALSE,
+    computed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_personnel_tenure_fiscal_year ON personnel_tenure(retirement_fiscal_year);
+
+CREATE TABLE IF NOT EXISTS retirement_forecast (
+    headquarters VARCHAR(100) NOT NULL,
+    fiscal_year SMALLINT NOT NULL,            -- พ.ศ.
+    retirees INTEGER NOT NULL DEFAULT 0,
+    commissioned INTEGER NOT NULL DEFAULT 0,  -- สัญญาบัตร
+    non_commissioned INTEGER NOT NULL DEFAULT 0, -- ประทวน
+    average_service_years NUMERIC(4,1),
+    computed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (headquarters, fiscal_year)
+);
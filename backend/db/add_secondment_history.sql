@@ -0,0 +1,31 @@
+-- ประวัติการไปช่วยราชการ (versioned) - import_secondment.py ปิด/เปิด version ทุกครั้งที่ import
+-- แถวที่ valid_to IS NULL คือการไปช่วยราชการที่ยังมีผลอยู่
+CREATE TABLE IF NOT EXISTS secondment_history (
+    id SERIAL PRIMARY KEY,
+    full_name VARCHAR(200) NOT NULL,
+    rank VARCHAR(50),
+    origin_unit VARCHAR(100),
+    destination_unit VARCHAR(200),
+    period VARCHAR(100),
+    note VARCHAR(100),
+    source_file VARCHAR(255),
+    valid_from TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    valid_to TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_secondment_history_name ON secondment_history(full_name);
+CREATE INDEX IF NOT EXISTS idx_secondment_history_destination ON secondment_history(destination_unit);
+
+-- version ที่เปิดอยู่ได้หนึ่งแถวต่อ คน + หน่วยปลายทาง
+CREATE UNIQUE INDEX IF NOT EXISTS idx_secondment_history_open
+    ON secondment_history(full_name, COALESCE(destination_unit, ''))
+    WHERE valid_to IS NULL;
+
+-- เริ่มประวัติจากข้อมูลปัจจุบัน
+INSERT INTO secondment_history (full_name, rank, origin_unit, destination_unit, period, note, valid_from)
+SELECT DISTINCT ON (full_name, COALESCE(destination_unit, ''))
+       full_name, rank, origin_unit, destination_unit, period, note, created_at
+FROM secondment
+WHERE full_name IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM secondment_history)
+ORDER BY full_name, COALESCE(destination_unit, ''), id DESC;
@@ -0,0 +1,10 @@
+-- ชื่อหน่วยที่สะกดต่างกัน -> ชื่อมาตรฐาน (เพิ่มเติมจาก SEED_ALIASES ใน python/unit_normalizer.py)
+-- importer ใช้ผ่าน cache: python python/unit_normalizer.py --sync หลังเพิ่ม/แก้แถว
+CREATE TABLE IF NOT EXISTS unit_aliases (
+    alias VARCHAR(200) PRIMARY KEY,
+    canonical VARCHAR(200) NOT NULL,
+    note VARCHAR(255),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_unit_aliases_canonical ON unit_aliases(canonical);
@@ -4,13 +4,20 @@ Budget Import Script - นำเข้าข้อมูลงบลงทุน
 Phase 5: Budget/Investment Management System
 """
 
-import pandas as pd
 import psycopg2
-from psycopg2.extras import execute_values
 import sys
 import os
-import re
-from datetime import datetime
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+from copy_stream import copy_frame
+from csv_reader import is_delimited, load_csv
+from dataset_registry import get_dataset, report_issues
+from excel_reader import use_reader_option
+from import_audit import ImportAudit, excel_rows
+from import_plan import record_throughput, run_plan
+from swap_publish import publish, publish_frame
+from table_snapshot import pre_import_snapshot
 
 # Database configuration
 DB_CONFIG = {
@@ -22,267 +29,113 @@ DB_CONFIG = {
     'sslmode': 'require'
 }
 
-def clean_value(val):
-    """Clean and normalize value"""
-    if pd.isna(val) or val == '' or val == '-':
-        return None
-    if isinstance(val, str):
-        return val.strip()
-    return val
-
-def clean_amount(val):
-    """Clean and convert amount to float"""
-    if pd.isna(val) or val == '' or val == '-':
-        return None
-    if isinstance(val, (int, float)):
-        return float(val)
-    if isinstance(val, str):
-        # Remove commas, newlines, spaces
-        cleaned = re.sub(r'[,\s\n]', '', val)
-        try:
-            return float(cleaned)
-        except:
-            return None
-    return None
-
-def clean_int(val):
-    """Clean and convert to integer"""
-    if pd.isna(val) or val == '' or val == '-':
-        return None
-    try:
-        return int(float(val))
-    except:
-        return None
+BUDGET = get_dataset('budget')
 
-def parse_date(val):
-    """Parse date from various formats"""
-    if pd.isna(val) or val == '' or val == '-':
-        return None
-    
-    if isinstance(val, datetime):
-        return val.date()
-    
-    if isinstance(val, pd.Timestamp):
-        return val.date()
-    
-    if isinstance(val, str):
-        val = val.strip().replace('\n', '')
-        # Try various formats
-        formats = [
-            '%Y-%m-%d',
-            '%d/%m/%Y',
-            '%d/%m/%y',
-            '%Y-%m-%d %H:%M:%S'
-        ]
-        for fmt in formats:
-            try:
-                return datetime.strptime(val, fmt).date()
-            except:
-                continue
-    return None
-
-def parse_fiscal_year(val):
-    """Parse fiscal year and return (fiscal_year, start, end)"""
-    if pd.isna(val) or val == '':
-        return None, None, None
-    
-    val = str(val).strip()
-    
-    # Check for range: "2569 - 2570"
-    match = re.match(r'(\d{4})\s*-\s*(\d{4})', val)
-    if match:
-        start = int(match.group(1))
-        end = int(match.group(2))
-        return val, start, end
-    
-    # Single year
-    match = re.match(r'(\d{4})', val)
-    if match:
-        year = int(match.group(1))
-        return val, year, year
-    
-    return val, None, None
-
-def determine_status_group(status):
-    """Determine status group from status text"""
-    if not status:
-        return 'pending'
-    
-    status_lower = status.lower()
-    
-    if 'ลงนาม' in status:
-        return 'signed'
-    elif 'ผู้ชนะ' in status:
-        return 'winner_announced'
-    elif 'อุทธรณ์' in status:
-        return 'appeal_period'
-    elif 'เชิญชวน' in status or 'ประกาศ' in status:
-        return 'announcement'
-    elif 'tor' in status_lower or 'ราคากลาง' in status:
-        return 'tor_approval'
-    elif 'เผยแพร่' in status or 'ร่าง' in status:
-        return 'draft'
-    else:
-        return 'in_progress'
-
-def read_excel(filepath):
+def read_excel(filepath, audit):
     """Read and parse Excel file"""
     print(f"Reading Excel file: {filepath}")
     
-    # Read with header
-    df = pd.read_excel(filepath, header=0)
+    # Read with header - column ค้นจากชื่อหัวตาราง (รองรับทั้งแบบ 14 และ 15 columns)
+    df = BUDGET.read_raw(filepath)
     
     print(f"Columns found: {df.columns.tolist()}")
     print(f"Total rows: {len(df)}")
     
-    records = []
-    
-    for idx, row in df.iterrows():
-        # Skip header or note rows
-        first_col = row.iloc[0]
-        if pd.isna(first_col) or str(first_col).startswith('หมายเหตุ'):
-            continue
-        
-        try:
-            seq = clean_int(row.iloc[0])
-            if not seq:
-                continue
-        except:
-            continue
-        
-        # Determine column positions based on file structure
-        # File has 15 columns with category in column 2
-        if len(df.columns) >= 15:
-            division = clean_value(row.iloc[1])
-            category = clean_value(row.iloc[2])
-            project_name = clean_value(row.iloc[3])
-            project_type = clean_value(row.iloc[4])
-            status = clean_value(row.iloc[5])
-            contract_amount = clean_amount(row.iloc[6])
-            fiscal_year_raw = clean_value(row.iloc[7])
-            budget_type = clean_value(row.iloc[8])
-            contract_date = parse_date(row.iloc[9])
-            end_date = parse_date(row.iloc[10])
-            installments = clean_int(row.iloc[11])
-            contractor = clean_value(row.iloc[12])
-            progress = clean_amount(row.iloc[13])
-            remarks = clean_value(row.iloc[14]) if len(row) > 14 else None
-        else:
-            # 14 column format without category
-            division = clean_value(row.iloc[1])
-            category = None
-            project_name = clean_value(row.iloc[2])
-            project_type = clean_value(row.iloc[3])
-            status = clean_value(row.iloc[4])
-            contract_amount = clean_amount(row.iloc[5])
-            fiscal_year_raw = clean_value(row.iloc[6])
-            budget_type = clean_value(row.iloc[7])
-            contract_date = parse_date(row.iloc[8])
-            end_date = parse_date(row.iloc[9])
-            installments = clean_int(row.iloc[10])
-            contractor = clean_value(row.iloc[11])
-            progress = clean_amount(row.iloc[12])
-            remarks = clean_value(row.iloc[13]) if len(row) > 13 else None
-        
-        # Parse fiscal year
-        fiscal_year, fiscal_year_start, fiscal_year_end = parse_fiscal_year(fiscal_year_raw)
-        
-        # Determine status group
-        status_group = determine_status_group(status)
-        
-        # Clean contractor name
-        if contractor:
-            contractor = contractor.replace('\n', ' ').strip()
-        
-        # Clean status
-        if status:
-            status = status.replace('\n', ' ').strip()
-        
-        record = {
-            'division': division,
-            'category': category,
-            'project_name': project_name,
-            'project_type': project_type,
-            'status': status,
-            'status_group': status_group,
-            'contract_amount': contract_amount,
-            'fiscal_year': fiscal_year,
-            'fiscal_year_start': fiscal_year_start,
-            'fiscal_year_end': fiscal_year_end,
-            'budget_type': budget_type,
-            'contract_date': contract_date,
-            'end_date': end_date,
-            'installments': installments,
-            'contractor': contractor,
-            'progress': progress,
-            'remarks': remarks
-        }
-        
-        records.append(record)
-    
+    with audit.step('parse', rows=excel_rows(BUDGET.header, len(df))) as event:
+        records, issues = BUDGET.clean(df)
+        event.update(count=len(records), issues=issues or None)
+    report_issues(issues)
     return records
 
-def import_to_db(records):
-    """Import records to database"""
+def import_to_db(records, audit, swap=False):
+    """Import records to database (swap=True: โหลดเข้า budget_staging แล้ว swap แทน DELETE)"""
+    pre_import_snapshot(BUDGET.table, audit.source_path, DB_CONFIG, audit)
     print(f"\nConnecting to database...")
     
     conn = psycopg2.connect(**DB_CONFIG)
     cur = conn.cursor()
+    start = time.perf_counter()
     
-    # Prepare data for bulk insert
-    columns = [
-        'division', 'category', 'project_name', 'project_type',
-        'status', 'status_group', 'contract_amount',
-        'fiscal_year', 'fiscal_year_start', 'fiscal_year_end', 'budget_type',
-        'contract_date', 'end_date', 'installments', 'contractor',
-        'progress', 'remarks'
-    ]
-    
-    values = []
-    for r in records:
-        values.append((
-            r['division'], r['category'], r['project_name'], r['project_type'],
-            r['status'], r['status_group'], r['contract_amount'],
-            r['fiscal_year'], r['fiscal_year_start'], r['fiscal_year_end'], r['budget_type'],
-            r['contract_date'], r['end_date'], r['installments'], r['contractor'],
-            r['progress'], r['remarks']
-        ))
-    
-    # Clear existing data
-    cur.execute("DELETE FROM budget")
+    if swap:
+        publish_frame(conn, 'budget', records, BUDGET.copy_columns, audit)
+    else:
+        with audit.changes(cur):
+            # Clear existing data
+            with audit.step('delete') as event:
+                cur.execute("DELETE FROM budget")
+                event['count'] = cur.rowcount
+            
+            # Bulk load - stream rows straight into COPY
+            with audit.step('load', count=len(records)) as event:
+                event['bytes'] = copy_frame(cur, 'budget', records, BUDGET.copy_columns)
+        
+        audit.flush(cur)
+        conn.commit()
+    record_throughput(BUDGET.name, len(records), time.perf_counter() - start)
+    cur.close()
+    conn.close()
     
-    # Bulk insert
-    insert_query = f"""
-        INSERT INTO budget ({', '.join(columns)})
-        VALUES %s
+    print(f"Successfully imported {len(records)} records")
+
+def import_csv(filepath, audit, swap=False):
+    """
+    CSV/TSV -> budget แบบ streaming (ไม่สร้าง DataFrame ทั้งไฟล์)
+    header เป็นชื่อ column ใน DB -> COPY ไฟล์ตรง ๆ, ไม่เช่นนั้น clean ทีละ chunk
     """
+    print(f"Streaming CSV file: {filepath}")
+    pre_import_snapshot(BUDGET.table, filepath, DB_CONFIG, audit)
     
-    execute_values(cur, insert_query, values)
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    start = time.perf_counter()
     
-    conn.commit()
+    if swap:
+        loaded = publish(conn, 'budget', lambda c, staging: load_csv(c, BUDGET, filepath, staging), audit)
+    else:
+        with audit.changes(cur):
+            with audit.step('delete') as event:
+                cur.execute("DELETE FROM budget")
+                event['count'] = cur.rowcount
+            
+            with audit.step('load') as event:
+                loaded = load_csv(cur, BUDGET, filepath)
+                event.update(loaded)
+        
+        audit.flush(cur)
+        conn.commit()
+    record_throughput(BUDGET.name, loaded['count'], time.perf_counter() - start)
+    report_issues(loaded['issues'] or {})
     cur.close()
     conn.close()
     
-    print(f"Successfully imported {len(records)} records")
+    print(f"Successfully imported {loaded['count']} records ({loaded['mode']} COPY)")
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python import_budget.py <excel_file>")
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if len(args) < 1:
+        print("Usage: python import_budget.py <excel_or_csv_file> [--plan] [--swap] [--reader=auto|openpyxl|calamine|arrow]")
         sys.exit(1)
     
-    filepath = sys.argv[1]
+    filepath = args[0]
+    use_reader_option(sys.argv)
     
     if not os.path.exists(filepath):
         print(f"Error: File not found: {filepath}")
         sys.exit(1)
     
+    if is_delimited(filepath) and '--plan' not in sys.argv:
+        import_csv(filepath, audit=ImportAudit(filepath, BUDGET.table, dataset=BUDGET), swap='--swap' in sys.argv)
+        print("\nImport completed!")
+        return
+    
     # Read Excel
-    records = read_excel(filepath)
+    audit = ImportAudit(filepath, BUDGET.table, dataset=BUDGET)
+    records = read_excel(filepath, audit)
     print(f"\nParsed {len(records)} records")
     
     # Preview
     print("\nPreview of first 3 records:")
-    for i, r in enumerate(records[:3]):
+    for i, r in enumerate(BUDGET.dicts(records.head(3))):
         print(f"\n--- Record {i+1} ---")
         print(f"  Division: {r['division']}")
         print(f"  Category: {r['category']}")
@@ -295,8 +148,12 @@ def main():
     
     print(f"\nTotal records to import: {len(records)}")
     
+    if '--plan' in sys.argv:
+        run_plan(BUDGET, records, DB_CONFIG, 'replace')
+        return
+    
     # Import
-    import_to_db(records)
+    import_to_db(records, audit, swap='--swap' in sys.argv)
     
     print("\nImport completed!")
 
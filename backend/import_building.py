@@ -4,12 +4,21 @@ Building Import Script - นำเข้าข้อมูลอาคารท
 Phase 6: Building Management System
 """
 
-import pandas as pd
 import psycopg2
-from psycopg2.extras import execute_values
 import sys
 import os
-import re
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+from copy_stream import copy_frame
+from csv_reader import is_delimited, load_csv
+from dataset_registry import get_dataset, report_issues
+from excel_reader import use_reader_option
+from import_audit import ImportAudit, excel_rows
+from import_plan import record_throughput, run_plan
+from search_index import refresh_search_index
+from swap_publish import publish, publish_frame
+from table_snapshot import pre_import_snapshot
 
 # Database configuration
 DB_CONFIG = {
@@ -21,245 +30,125 @@ DB_CONFIG = {
     'sslmode': 'require'
 }
 
-def clean_value(val):
-    """Clean and normalize value"""
-    if pd.isna(val) or val == '' or val == '-':
-        return None
-    if isinstance(val, str):
-        return val.strip()
-    return val
-
-def clean_int(val):
-    """Clean and convert to integer"""
-    if pd.isna(val) or val == '' or val == '-':
-        return None
-    try:
-        return int(float(val))
-    except:
-        return None
-
-def determine_ownership_status(building_type, land_type, remarks):
-    """Determine ownership status from building data"""
-    building_type_str = str(building_type) if building_type else ''
-    land_type_str = str(land_type) if land_type else ''
-    remarks_str = str(remarks) if remarks else ''
-    
-    combined = (building_type_str + land_type_str + remarks_str).lower()
-    
-    # ใช้ที่ทำการของหน่วยอื่น
-    if 'ใช้ที่ทำการของหน่วย' in building_type_str or 'ใช้พื้นที่' in building_type_str:
-        return 'use_other'
-    
-    # รองบประมาณ
-    if 'รองบประมาณ' in combined or 'ที่ดินพร้อมรองบ' in combined:
-        return 'wait_budget'
-    
-    # จัดหาที่ดิน
-    if 'จัดหาที่' in combined or 'ระหว่างจัดหา' in combined:
-        return 'finding_land'
-    
-    # มีที่ทำการ (default if has building info)
-    if building_type_str and 'อาคาร' in building_type_str:
-        return 'has_building'
-    
-    # Default
-    return 'has_building'
-
-def normalize_division(division):
-    """Normalize division name"""
-    if not division:
-        return None
-    
-    division = str(division).strip()
-    
-    # Mapping for consistent names
-    mappings = {
-        'ศพฐ.1(ปทุมธานี)': 'ศพฐ.1',
-        'ศพฐ.2 (ชลบุรี)': 'ศพฐ.2',
-        'ศพฐ.3(นครราชสีมา)': 'ศพฐ.3',
-        'ศพฐ.4 (ขอนแก่น)': 'ศพฐ.4',
-        'ศพฐ.5(ลำปาง)': 'ศพฐ.5',
-        'ศพฐ.6(พิษณุโลก)': 'ศพฐ.6',
-        'ศพฐ.7(นครปฐม)': 'ศพฐ.7',
-        'ศพฐ.8(สุราษฎร์ธานี)': 'ศพฐ.8',
-        'ศพฐ.9(สงขลา)': 'ศพฐ.9',
-        'ศพฐ.10(ยะลา)': 'ศพฐ.10',
-    }
-    
-    return mappings.get(division, division)
+BUILDING = get_dataset('building')
 
-def read_excel(filepath):
+def read_excel(filepath, audit):
     """Read and parse Excel file"""
     print(f"Reading Excel file: {filepath}")
     
-    # Read with header at row 1
-    df = pd.read_excel(filepath, header=1)
+    # Read with header at row 1 - mapping/cleaner/ownership_status อยู่ใน dataset_registry
+    df = BUILDING.read_raw(filepath)
     
     print(f"Columns found: {df.columns.tolist()}")
     print(f"Total rows: {len(df)}")
     
-    records = []
-    
-    for idx, row in df.iterrows():
-        # Skip empty rows
-        seq = row.iloc[0]
-        if pd.isna(seq):
-            continue
-        
-        try:
-            seq_int = int(float(seq))
-        except:
-            continue
-        
-        bureau = clean_value(row.get('บช.'))
-        division_raw = clean_value(row.get('บก.'))
-        subdivision = clean_value(row.get('พฐ.จว.'))
-        building_name = clean_value(row.get('ชื่อ'))
-        building_count = clean_int(row.get('จำนวน'))
-        building_size = clean_value(row.get('ขนาด'))
-        budget_year = clean_value(row.get('ปี พ.ศ.ที่ได้รับงบ'))
-        operation_year = clean_value(row.get('ปี พ.ศ.ที่ใช้งาน'))
-        building_age = clean_int(row.get('อายุอาคาร'))
-        status = clean_value(row.get('สถานภาพ'))
-        building_type = clean_value(row.get('ประเภทอาคาร'))
-        land_type = clean_value(row.get('ประเภทที่ดินที่ก่อสร้าง'))
-        land_area = clean_value(row.get('จำนวนเนื้อที่ทั้งหมด (ไร่-งาน-วา)'))
-        subdistrict = clean_value(row.get('สถานที่ก่อสร้าง (ตำบล)'))
-        district = clean_value(row.get('สถานที่ก่อสร้าง (อำเภอ)'))
-        province = clean_value(row.get('สถานที่ก่อสร้าง (จังหวัด)'))
-        coordinates = clean_value(row.get('พิกัด'))
-        remarks = clean_value(row.get('หมายเหตุ'))
-        
-        # Normalize division
-        division = normalize_division(division_raw)
-        
-        # If division is empty, try to get from previous row or bureau
-        if not division and bureau:
-            division = bureau
-        
-        # Extract land doc number from land_type
-        land_doc_number = None
-        if land_type and 'เลขที่' in land_type:
-            match = re.search(r'เลขที่\s*([^\s]+)', land_type)
-            if match:
-                land_doc_number = match.group(1)
-        
-        # Determine ownership status
-        ownership_status = determine_ownership_status(building_type, land_type, remarks)
-        
-        # Normalize status
-        if status:
-            status = status.strip()
-        
-        # Parse coordinates if available
-        location_lat = None
-        location_lng = None
-        if coordinates:
-            # Try to parse coordinates
-            parts = str(coordinates).split(',')
-            if len(parts) == 2:
-                try:
-                    location_lat = float(parts[0].strip())
-                    location_lng = float(parts[1].strip())
-                except:
-                    pass
-        
-        record = {
-            'bureau': bureau or 'สพฐ.ตร.',
-            'division': division,
-            'subdivision': subdivision,
-            'building_name': building_name,
-            'building_count': building_count or 1,
-            'building_size': building_size,
-            'building_type': building_type,
-            'budget_year': str(budget_year) if budget_year else None,
-            'operation_year': str(operation_year) if operation_year else None,
-            'building_age': building_age,
-            'status': status,
-            'ownership_status': ownership_status,
-            'land_type': land_type,
-            'land_doc_number': land_doc_number,
-            'land_area': land_area,
-            'subdistrict': subdistrict,
-            'district': district,
-            'province': province,
-            'location_lat': location_lat,
-            'location_lng': location_lng,
-            'master_plan_url': None,
-            'remarks': remarks
-        }
-        
-        records.append(record)
-    
+    with audit.step('parse', rows=excel_rows(BUILDING.header, len(df))) as event:
+        records, issues = BUILDING.clean(df)
+        event.update(count=len(records), issues=issues or None)
+    report_issues(issues)
     return records
 
-def import_to_db(records):
-    """Import records to database"""
+def import_to_db(records, audit, swap=False):
+    """Import records to database (swap=True: โหลดเข้า building_staging แล้ว swap แทน DELETE)"""
+    pre_import_snapshot(BUILDING.table, audit.source_path, DB_CONFIG, audit)
     print(f"\nConnecting to database...")
     
     conn = psycopg2.connect(**DB_CONFIG)
     cur = conn.cursor()
+    start = time.perf_counter()
+    
+    if swap:
+        publish_frame(conn, 'building', records, BUILDING.copy_columns, audit)
+    else:
+        with audit.changes(cur):
+            # Clear existing data
+            with audit.step('delete') as event:
+                cur.execute("DELETE FROM building")
+                event['count'] = cur.rowcount
+            
+            # Bulk load - stream rows straight into COPY
+            with audit.step('load', count=len(records)) as event:
+                event['bytes'] = copy_frame(cur, 'building', records, BUILDING.copy_columns)
+        
+        audit.flush(cur)
+        conn.commit()
+    record_throughput(BUILDING.name, len(records), time.perf_counter() - start)
+    cur.close()
     
-    # Prepare data for bulk insert
-    columns = [
-        'bureau', 'division', 'subdivision',
-        'building_name', 'building_count', 'building_size', 'building_type',
-        'budget_year', 'operation_year', 'building_age',
-        'status', 'ownership_status',
-        'land_type', 'land_doc_number', 'land_area',
-        'subdistrict', 'district', 'province',
-        'location_lat', 'location_lng',
-        'master_plan_url', 'remarks'
-    ]
-    
-    values = []
-    for r in records:
-        values.append((
-            r['bureau'], r['division'], r['subdivision'],
-            r['building_name'], r['building_count'], r['building_size'], r['building_type'],
-            r['budget_year'], r['operation_year'], r['building_age'],
-            r['status'], r['ownership_status'],
-            r['land_type'], r['land_doc_number'], r['land_area'],
-            r['subdistrict'], r['district'], r['province'],
-            r['location_lat'], r['location_lng'],
-            r['master_plan_url'], r['remarks']
-        ))
-    
-    # Clear existing data
-    cur.execute("DELETE FROM building")
+    try:
+        refresh_search_index(conn, ['building'])
+    except Exception as e:
+        conn.rollback()
+        print(f"⚠️  Search index not updated: {e}")
+    conn.close()
     
-    # Bulk insert
-    insert_query = f"""
-        INSERT INTO building ({', '.join(columns)})
-        VALUES %s
+    print(f"Successfully imported {len(records)} records")
+
+def import_csv(filepath, audit, swap=False):
     """
+    CSV/TSV -> building แบบ streaming (ไม่สร้าง DataFrame ทั้งไฟล์)
+    header เป็นชื่อ column ใน DB -> COPY ไฟล์ตรง ๆ, ไม่เช่นนั้น clean ทีละ chunk
+    """
+    print(f"Streaming CSV file: {filepath}")
+    pre_import_snapshot(BUILDING.table, filepath, DB_CONFIG, audit)
     
-    execute_values(cur, insert_query, values)
-    
-    conn.commit()
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    start = time.perf_counter()
+    
+    if swap:
+        loaded = publish(conn, 'building', lambda c, staging: load_csv(c, BUILDING, filepath, staging), audit)
+    else:
+        with audit.changes(cur):
+            with audit.step('delete') as event:
+                cur.execute("DELETE FROM building")
+                event['count'] = cur.rowcount
+            
+            with audit.step('load') as event:
+                loaded = load_csv(cur, BUILDING, filepath)
+                event.update(loaded)
+        
+        audit.flush(cur)
+        conn.commit()
+    record_throughput(BUILDING.name, loaded['count'], time.perf_counter() - start)
+    report_issues(loaded['issues'] or {})
     cur.close()
+    
+    try:
+        refresh_search_index(conn, ['building'])
+    except Exception as e:
+        conn.rollback()
+        print(f"⚠️  Search index not updated: {e}")
     conn.close()
     
-    print(f"Successfully imported {len(records)} records")
+    print(f"Successfully imported {loaded['count']} records ({loaded['mode']} COPY)")
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python import_building.py <excel_file>")
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if len(args) < 1:
+        print("Usage: python import_building.py <excel_or_csv_file> [--plan] [--swap] [--reader=auto|openpyxl|calamine|arrow]")
         sys.exit(1)
     
-    filepath = sys.argv[1]
+    filepath = args[0]
+    use_reader_option(sys.argv)
     
     if not os.path.exists(filepath):
         print(f"Error: File not found: {filepath}")
         sys.exit(1)
     
+    if is_delimited(filepath) and '--plan' not in sys.argv:
+        import_csv(filepath, audit=ImportAudit(filepath, BUILDING.table, dataset=BUILDING), swap='--swap' in sys.argv)
+        print("\nImport completed!")
+        return
+    
     # Read Excel
-    records = read_excel(filepath)
+    audit = ImportAudit(filepath, BUILDING.table, dataset=BUILDING)
+    records = read_excel(filepath, audit)
     print(f"\nParsed {len(records)} records")
     
     # Preview
     print("\nPreview of first 5 records:")
-    for i, r in enumerate(records[:5]):
+    for i, r in enumerate(BUILDING.dicts(records.head(5))):
         print(f"\n--- Record {i+1} ---")
         print(f"  Division: {r['division']}")
         print(f"  Subdivision: {r['subdivision']}")
@@ -271,26 +160,25 @@ def main():
     
     # Stats
     print("\n=== Statistics ===")
-    ownership_counts = {}
-    division_counts = {}
-    for r in records:
-        os = r['ownership_status']
-        ownership_counts[os] = ownership_counts.get(os, 0) + 1
-        div = r['division']
-        division_counts[div] = division_counts.get(div, 0) + 1
+    ownership_counts = records['ownership_status'].value_counts()
+    division_counts = records['division'].value_counts()
     
     print("\nBy Ownership Status:")
-    for k, v in sorted(ownership_counts.items()):
+    for k, v in ownership_counts.sort_index().items():
         print(f"  {k}: {v}")
     
     print("\nBy Division:")
-    for k, v in sorted(division_counts.items(), key=lambda x: x[1], reverse=True):
+    for k, v in division_counts.items():
         print(f"  {k}: {v}")
     
     print(f"\nTotal records to import: {len(records)}")
     
+    if '--plan' in sys.argv:
+        run_plan(BUILDING, records, DB_CONFIG, 'replace')
+        return
+    
     # Import
-    import_to_db(records)
+    import_to_db(records, audit, swap='--swap' in sys.argv)
     
     print("\nImport completed!")
 
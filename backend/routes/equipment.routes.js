@@ -216,6 +216,36 @@ router.get('/', async (req, res) => {
     }
 });
 
+// GET /api/equipment/code/:code - Exact lookup by equipment code (MUST be before /:id)
+// รับได้ทั้ง 7110 0626 0069 3 2567 และ 7110-0626-69-3-2567 (เทียบด้วยส่วนที่แยกไว้ใน index)
+router.get('/code/:code', async (req, res) => {
+    let client;
+    try {
+        client = await getConnection();
+        const match = req.params.code.trim().replace(/\s*[-–—]\s*|\s+/g, '-')
+            .match(/^(\d{4}-\d{2,4})-(\d{1,5})-(\d{1,2})-(\d{4})$/);
+        
+        const result = match
+            ? await client.query(`
+                SELECT * FROM equipment
+                WHERE code_type = $1 AND code_year = $2 AND code_running = $3 AND code_method = $4
+                ORDER BY id
+            `, [match[1], parseInt(match[4]), parseInt(match[2]), parseInt(match[3])])
+            : await client.query('SELECT * FROM equipment WHERE equipment_code = $1 ORDER BY id', [req.params.code.trim()]);
+        
+        if (result.rows.length === 0) {
+            return res.status(404).json({ success: false, message: 'Not found' });
+        }
+        
+        res.json({ success: true, data: result.rows });
+    } catch (error) {
+        console.error('Error fetching equipment by code:', error);
+        res.status(500).json({ success: false, message: error.message });
+    } finally {
+        if (client && client.release) client.release();
+    }
+});
+
 // GET /api/equipment/:id - Get single equipment (MUST be after /years and /stats)
 router.get('/:id', async (req, res) => {
     let client;
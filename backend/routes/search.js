@@ -2,6 +2,25 @@ const express = require('express');
 const router = express.Router();
 const { query } = require('../db/connection');
 
+// ต้องตรงกับ normalize_text() / ngrams() ใน python/search_index.py
+const GRAM_SIZE = 3;
+
+const normalizeSearchText = (text) => String(text)
+  .normalize('NFC')
+  .replace(/[\u200b-\u200d\ufeff]/g, '')
+  .replace(/\u0e4d\u0e32/g, '\u0e33')
+  .toLowerCase()
+  .replace(/[\s.\-()/,'"\\]+/g, '');
+
+const ngrams = (text) => {
+  if (text.length < GRAM_SIZE) return [];
+  const grams = new Set();
+  for (let i = 0; i + GRAM_SIZE <= text.length; i++) {
+    grams.add(text.substring(i, i + GRAM_SIZE));
+  }
+  return [...grams];
+};
+
 router.get('/', async (req, res) => {
   try {
     const { q, headquarters, gender, vacancy_status } = req.query;
@@ -34,15 +53,38 @@ router.get('/', async (req, res) => {
       paramCount++;
     }
     
-    const whereClause = conditions.length > 0 ? 'WHERE ' + conditions.join(' AND ') : '';
-    
-    const result = await query(`
+    const searchSql = (where) => `
       SELECT full_name, rank, position, headquarters, department, gender, vacancy_status
       FROM personnel
-      ${whereClause}
+      ${where.length > 0 ? 'WHERE ' + where.join(' AND ') : ''}
       ORDER BY full_name
       LIMIT 100
-    `, params);
+    `;
+    
+    let result;
+    const grams = q ? ngrams(normalizeSearchText(q)) : [];
+    
+    if (grams.length > 0) {
+      // กรองด้วย search_tokens ก่อน ILIKE (record ที่แก้ไขหลังสร้างดัชนีผ่านเสมอ)
+      const tokenCondition = `(id IN (
+          SELECT entity_id FROM search_tokens
+          WHERE entity = 'personnel' AND gram = ANY($${paramCount})
+          GROUP BY entity_id
+          HAVING COUNT(DISTINCT gram) = $${paramCount + 1}
+        ) OR updated_at > COALESCE(
+          (SELECT built_at FROM search_index_state WHERE entity = 'personnel'), '-infinity'))`;
+      
+      try {
+        result = await query(searchSql([...conditions, tokenCondition]), [...params, grams, grams.length]);
+      } catch (error) {
+        // ยังไม่ได้รัน python/search_index.py - ใช้ ILIKE อย่างเดียว
+        if (error.code !== '42P01') throw error;
+      }
+    }
+    
+    if (!result) {
+      result = await query(searchSql(conditions), params);
+    }
     
     res.json({ success: true, data: result.rows });
   } catch (error) {
@@ -1,6 +1,15 @@
 const express = require('express');
 const router = express.Router();
 const { query } = require('../db/connection');
+const fs = require('fs');
+const path = require('path');
+
+// Snapshot ที่สร้างโดย python/stats_snapshot.py
+const SNAPSHOT_FILE = path.join(
+  process.env.STATS_SNAPSHOT_DIR || path.join(__dirname, '..', 'snapshots', 'stats'),
+  'latest.json'
+);
+let snapshotCache = { mtimeMs: 0, body: null, checksum: null };
 
 // Helper function สำหรับเรียงลำดับหน่วยงาน
 const getHeadquartersOrder = () => `
@@ -91,6 +100,30 @@ const getDepartmentOrder = (hq) => {
   return orderMaps[hq] || {};
 };
 
+// Precomputed snapshot (ETag = checksum ของข้อมูล)
+router.get('/snapshot', async (req, res) => {
+  try {
+    const stat = await fs.promises.stat(SNAPSHOT_FILE);
+    if (stat.mtimeMs !== snapshotCache.mtimeMs) {
+      const body = await fs.promises.readFile(SNAPSHOT_FILE, 'utf8');
+      snapshotCache = { mtimeMs: stat.mtimeMs, body, checksum: JSON.parse(body).checksum };
+    }
+    
+    const etag = `"${snapshotCache.checksum}"`;
+    res.set('ETag', etag);
+    res.set('Cache-Control', 'no-cache');
+    if (req.headers['if-none-match'] === etag) {
+      return res.status(304).end();
+    }
+    res.type('application/json').send(snapshotCache.body);
+  } catch (error) {
+    if (error.code === 'ENOENT') {
+      return res.status(404).json({ success: false, error: 'Snapshot not generated yet' });
+    }
+    res.status(500).json({ success: false, error: error.message });
+  }
+});
+
 // Summary
 router.get('/summary', async (req, res) => {
   try {
@@ -264,6 +297,23 @@ router.get('/map', async (req, res) => {
   }
 });
 
+// Retirement forecast by headquarters (precomputed by python/retirement_forecast.py after each import)
+router.get('/retirements', async (req, res) => {
+  try {
+    const years = Math.min(Math.max(parseInt(req.query.years) || 10, 1), 30);
+    const result = await query(`
+      SELECT headquarters, fiscal_year, retirees, commissioned, non_commissioned,
+             average_service_years, computed_at
+      FROM retirement_forecast
+      WHERE fiscal_year < (SELECT MIN(fiscal_year) FROM retirement_forecast) + $1
+      ORDER BY ${getHeadquartersOrder()}, fiscal_year
+    `, [years]);
+    res.json({ success: true, data: result.rows });
+  } catch (error) {
+    res.status(500).json({ success: false, error: error.message });
+  }
+});
+
 // Vacancies by department
 router.get('/vacancies/:name', async (req, res) => {
   try {
@@ -0,0 +1,35 @@
+-- ============================================
+-- Search Index Schema
+-- ดัชนีค้นหาภาษาไทย (character n-gram) สำหรับ personnel, equipment, vehicles, building
+-- สร้าง/เติมข้อมูลโดย python/search_index.py หลังการ import
+-- ============================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Token ของแต่ละ record (trigram ของข้อความที่ normalize แล้ว)
+CREATE TABLE IF NOT EXISTS search_tokens (
+    entity VARCHAR(20) NOT NULL,        -- personnel, equipment, vehicles, building
+    entity_id INTEGER NOT NULL,         -- id ของ record ในตารางต้นทาง
+    gram VARCHAR(16) NOT NULL           -- character n-gram
+);
+
+CREATE INDEX IF NOT EXISTS idx_search_tokens_gram ON search_tokens(entity, gram, entity_id);
+
+-- เวลาที่สร้างดัชนีล่าสุด (record ที่แก้ไขหลังจากนี้ยังไม่มี token)
+CREATE TABLE IF NOT EXISTS search_index_state (
+    entity VARCHAR(20) PRIMARY KEY,
+    built_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    row_count INTEGER DEFAULT 0,
+    token_count INTEGER DEFAULT 0
+);
+
+-- Trigram GIN indexes ให้ ILIKE '%q%' ใช้ index ได้
+CREATE INDEX IF NOT EXISTS idx_personnel_full_name_trgm ON personnel USING gin (full_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_personnel_position_trgm ON personnel USING gin (position gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_personnel_rank_trgm ON personnel USING gin (rank gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_equipment_item_name_trgm ON equipment USING gin (item_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_vehicles_license_plate_trgm ON vehicles USING gin (license_plate gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_building_building_name_trgm ON building USING gin (building_name gin_trgm_ops);
+
+COMMENT ON TABLE search_tokens IS 'ดัชนีค้นหาภาษาไทยแบบ n-gram';
+COMMENT ON TABLE search_index_state IS 'สถานะการสร้างดัชนีค้นหาล่าสุด';
@@ -7,11 +7,25 @@ Phase 3: ระบบจัดการครุภัณฑ์/สินทร
 
 import pandas as pd
 import psycopg2
-from psycopg2.extras import execute_values
 import os
-import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python'))
+from copy_stream import copy_frame
+from csv_reader import is_delimited, load_csv
+from dataset_registry import compact, get_dataset, report_issues
+from equipment_codes import duplicate_codes
+from excel_reader import use_reader_option
+from import_audit import ImportAudit, excel_rows
+from import_plan import record_throughput, run_plan
+from search_index import refresh_search_index
+from swap_publish import publish, publish_frame
+from table_snapshot import pre_import_snapshot
+
 # Load environment variables
 load_dotenv()
 
@@ -25,106 +39,86 @@ DB_CONFIG = {
     'sslmode': 'require'
 }
 
-def get_category(item_name):
-    """Extract category from item name"""
-    if not item_name or pd.isna(item_name):
-        return 'อื่นๆ'
-    
-    item_name = str(item_name).strip()
-    
-    # Define category patterns
-    categories = {
-        'โต๊ะ': ['โต๊ะ'],
-        'เก้าอี้': ['เก้าอี้'],
-        'ตู้': ['ตู้'],
-        'เครื่องคอมพิวเตอร์': ['เครื่องคอมพิวเตอร์', 'คอมพิวเตอร์', 'Computer', 'PC'],
-        'เครื่องพิมพ์': ['เครื่องพิมพ์', 'Printer'],
-        'เครื่องปรับอากาศ': ['เครื่องปรับอากาศ', 'แอร์'],
-        'เครื่องสำรองไฟ': ['เครื่องสำรองไฟ', 'UPS'],
-        'เครื่องฟอกอากาศ': ['เครื่องฟอกอากาศ'],
-        'โทรทัศน์': ['โทรทัศน์', 'TV', 'ทีวี'],
-        'กล้อง': ['กล้อง', 'Camera'],
-        'โทรศัพท์': ['โทรศัพท์'],
-        'เครื่องถ่ายเอกสาร': ['เครื่องถ่ายเอกสาร'],
-        'เครื่องทำลายเอกสาร': ['เครื่องทำลายเอกสาร'],
-        'พัดลม': ['พัดลม'],
-        'ตู้เย็น': ['ตู้เย็น'],
-        'เครื่องดูดฝุ่น': ['เครื่องดูดฝุ่น'],
-    }
-    
-    for category, patterns in categories.items():
-        for pattern in patterns:
-            if pattern in item_name:
-                return category
-    
-    # Default: use first word
-    first_word = item_name.split()[0] if item_name.split() else 'อื่นๆ'
-    return first_word
+EQUIPMENT = get_dataset('equipment')
 
-def clean_year(year_value):
-    """Clean and validate year value"""
-    if pd.isna(year_value) or year_value == '-':
-        return None
-    
-    try:
-        year = int(float(year_value))
-        # Valid Buddhist Era year range
-        if 2500 <= year <= 2600:
-            return year
-        return None
-    except:
-        return None
+def equipment_sheets(excel_path):
+    """
+    หา sheet ที่เป็นรายการครุภัณฑ์ (หนึ่ง sheet ต่อหน่วย) พร้อมแถว header ของแต่ละ sheet
+    -> [(sheet, header)]
+    """
+    sheets, skipped = EQUIPMENT.data_sheets(excel_path)
+    for sheet in skipped:
+        print(f"⏭️  Skipping sheet '{sheet}' (no equipment header found)")
+    return sheets
 
-def clean_quantity(qty_value):
-    """Clean quantity value"""
-    if pd.isna(qty_value):
-        return 1
-    try:
-        return int(float(qty_value))
-    except:
-        return 1
+def parse_sheet(excel_path, sheet, header):
+    """อ่านและ clean sheet เดียว (ทำงานใน worker process) - คืน frame แบบ Arrow/NumPy"""
+    start = time.perf_counter()
+    df = EQUIPMENT.read_raw(excel_path, sheet, header=header)
+    frame, issues = EQUIPMENT.clean(df)
+    return sheet, len(df), compact(frame), issues, time.perf_counter() - start
 
-def import_equipment(excel_path):
-    """Import equipment data from Excel file"""
-    
-    print(f"📂 Reading Excel file: {excel_path}")
-    
-    # Read Excel with header on row 1 (0-indexed)
-    df = pd.read_excel(excel_path, header=1)
-    
-    print(f"📊 Found {len(df)} rows")
-    
-    # Rename columns for clarity
-    column_mapping = {
-        'ลำดับ': 'sequence_no',
-        'บช.': 'bureau',
-        'บก.': 'division',
-        'กก./พฐ.จว.': 'unit',
-        'รายการ': 'item_name',
-        'เลขครุภัณฑ์': 'equipment_code',
-        'ปี พ.ศ.ที่ได้รับ': 'acquired_year',
-        'จำนวน': 'quantity',
-        'ภาพถ่าย': 'photo_url',
-        'หมายเหตุ': 'remarks'
-    }
-    
-    df = df.rename(columns=column_mapping)
-    
-    # Clean data
-    df['acquired_year'] = df['acquired_year'].apply(clean_year)
-    df['quantity'] = df['quantity'].apply(clean_quantity)
-    df['category'] = df['item_name'].apply(get_category)
-    df['status'] = 'ใช้งานได้'  # Default status
-    
-    # Replace NaN with None
-    df = df.where(pd.notnull(df), None)
+def parse_workbook(excel_path, audit, jobs=None):
+    """parse ทุก sheet พร้อมกัน -> (DataFrame รวม, จำนวนแถวใน Excel)"""
+    sheets = equipment_sheets(excel_path)
+    if not sheets:
+        raise ValueError(f"No equipment sheets found in {excel_path}")
+    
+    if len(sheets) == 1 or jobs == 1:
+        results = [parse_sheet(excel_path, sheet, header) for sheet, header in sheets]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs or min(len(sheets), os.cpu_count() or 1)) as pool:
+            results = list(pool.map(parse_sheet, repeat(excel_path),
+                                    [s for s, _ in sheets], [h for _, h in sheets]))
+    
+    frames = []
+    total_rows = 0
+    for (sheet, header), (_, rows, frame, issues, elapsed) in zip(sheets, results):
+        print(f"📄 {sheet}: {rows} rows -> {len(frame)} records (header row {header + 1})")
+        report_issues(issues, f"[{sheet}] ")
+        audit.record('parse', sheet=sheet, rows=excel_rows(header, rows), count=len(frame),
+                     duration=elapsed, issues=issues or None)
+        frames.append(frame)
+        total_rows += rows
+    
+    df = pd.concat(frames, ignore_index=True)
+    # เลขซ้ำข้ามหน่วย (แต่ละ sheet ตรวจเฉพาะภายใน sheet)
+    if len(frames) > 1:
+        issues = duplicate_codes(df)
+        report_issues(issues, '[all sheets] ')
+        if issues:
+            audit.record('duplicates', issues=issues)
+    return df, total_rows
+
+def import_equipment(excel_path, plan=False, jobs=None, swap=False):
+    """
+    Import equipment data from Excel file - ทุก sheet ในครั้งเดียว (plan=True: dry-run)
+    swap=True: โหลดเข้า equipment_staging แล้ว swap แทน DELETE + COPY (API ไม่เห็นตารางว่าง)
+    ไฟล์ CSV/TSV: stream เข้า COPY ทีละ chunk (ไม่สร้าง DataFrame ทั้งไฟล์)
+    """
+    
+    audit = ImportAudit(excel_path, EQUIPMENT.table, dataset=EQUIPMENT)
+    stream = is_delimited(excel_path) and not plan
+    
+    if stream:
+        print(f"📂 Streaming CSV file: {excel_path}")
+    else:
+        print(f"📂 Reading Excel file: {excel_path}")
+        
+        # Rename + clean ตาม dataset_registry (ปี พ.ศ., จำนวน, หมวดหมู่, สถานะเริ่มต้น)
+        df, raw_rows = parse_workbook(excel_path, audit, jobs)
+        
+        print(f"📊 Found {raw_rows} rows")
+        print(f"✅ Data cleaned")
+        print(f"   - Categories found: {df['category'].nunique()}")
+        print(f"   - Units found: {df['unit'].nunique()}")
     
-    # Convert equipment_code to string
-    df['equipment_code'] = df['equipment_code'].apply(lambda x: str(x) if x else None)
+    if plan:
+        run_plan(EQUIPMENT, df, DB_CONFIG, 'replace')
+        return
     
-    print(f"✅ Data cleaned")
-    print(f"   - Categories found: {df['category'].nunique()}")
-    print(f"   - Units found: {df['unit'].nunique()}")
+    # สำเนาข้อมูลเดิมก่อนแทนที่ (backups/tables/equipment)
+    pre_import_snapshot(EQUIPMENT.table, excel_path, DB_CONFIG, audit)
     
     # Connect to database
     print(f"\n🔗 Connecting to database...")
@@ -132,46 +126,44 @@ def import_equipment(excel_path):
     cur = conn.cursor()
     
     try:
-        # Clear existing data (optional)
-        print("🗑️  Clearing existing equipment data...")
-        cur.execute("DELETE FROM equipment")
-        
-        # Prepare data for insert
-        columns = ['sequence_no', 'bureau', 'division', 'unit', 'item_name', 
-                   'equipment_code', 'acquired_year', 'quantity', 'photo_url', 
-                   'remarks', 'status', 'category']
+        start = time.perf_counter()
         
-        values = []
-        for _, row in df.iterrows():
-            values.append((
-                row.get('sequence_no'),
-                row.get('bureau'),
-                row.get('division'),
-                row.get('unit'),
-                row.get('item_name'),
-                row.get('equipment_code'),
-                row.get('acquired_year'),
-                row.get('quantity', 1),
-                row.get('photo_url'),
-                row.get('remarks'),
-                row.get('status', 'ใช้งานได้'),
-                row.get('category')
-            ))
-        
-        # Insert data
-        print(f"📥 Inserting {len(values)} records...")
-        
-        insert_query = """
-            INSERT INTO equipment 
-            (sequence_no, bureau, division, unit, item_name, equipment_code, 
-             acquired_year, quantity, photo_url, remarks, status, category)
-            VALUES %s
-        """
-        
-        execute_values(cur, insert_query, values, page_size=100)
-        
-        conn.commit()
-        print(f"✅ Successfully imported {len(values)} equipment records!")
+        if swap and stream:
+            print(f"📥 Loading into equipment_staging...")
+            loaded = publish(conn, 'equipment', lambda c, staging: load_csv(c, EQUIPMENT, excel_path, staging), audit)
+            count = loaded['count']
+        elif swap:
+            print(f"📥 Loading {len(df)} records into equipment_staging...")
+            publish_frame(conn, 'equipment', df, EQUIPMENT.copy_columns, audit)
+            count = len(df)
+        else:
+            with audit.changes(cur):
+                # Clear existing data (optional)
+                print("🗑️  Clearing existing equipment data...")
+                with audit.step('delete') as event:
+                    cur.execute("DELETE FROM equipment")
+                    event['count'] = cur.rowcount
+                
+                if stream:
+                    print(f"📥 Streaming records...")
+                    with audit.step('load') as event:
+                        loaded = load_csv(cur, EQUIPMENT, excel_path)
+                        event.update(loaded)
+                    count = loaded['count']
+                else:
+                    # ทุก sheet ใน COPY เดียว (stream rows, no per-row tuple list)
+                    print(f"📥 Inserting {len(df)} records...")
+                    
+                    with audit.step('load', count=len(df)) as event:
+                        event['bytes'] = copy_frame(cur, 'equipment', df, EQUIPMENT.copy_columns)
+                    count = len(df)
+            
+            audit.flush(cur)
+            conn.commit()
+        if stream:
+            report_issues(loaded['issues'] or {})
+        record_throughput(EQUIPMENT.name, count, time.perf_counter() - start)
+        print(f"✅ Successfully imported {count} equipment records!")
         
         # Show summary
         cur.execute("SELECT COUNT(*) FROM equipment")
@@ -188,6 +180,12 @@ def import_equipment(excel_path):
         print(f"   - Units: {units}")
         print(f"   - Categories: {categories}")
         
+        try:
+            refresh_search_index(conn, ['equipment'])
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️  Search index not updated: {e}")
+        
     except Exception as e:
         conn.rollback()
         print(f"❌ Error: {e}")
@@ -197,11 +195,11 @@ def import_equipment(excel_path):
         conn.close()
 
 if __name__ == "__main__":
-    import sys
-    
-    if len(sys.argv) > 1:
-        excel_path = sys.argv[1]
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if args:
+        excel_path = args[0]
     else:
         excel_path = "รายการค_ร_ภ_ณฑ_.xlsx"
     
-    import_equipment(excel_path)
+    use_reader_option(sys.argv)
+    import_equipment(excel_path, plan='--plan' in sys.argv, swap='--swap' in sys.argv)
@@ -1,76 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Import Secondment Data from Excel to PostgreSQL
+ข้อมูลไปช่วยราชการ (ไปช่วย.xlsx - ทุก sheet: ในหน่วย/นอกหน่วย, ประทวน/สัญญาบัตร)
+
+- clean ทั้ง column ผ่าน dataset_registry ('secondment') - full_name ไม่มี 'nan'
+- โหลดเข้า temp table ด้วย COPY แล้ว merge เข้า secondment ตาม (full_name, destination_unit)
+  แทนการ DELETE ทั้งตาราง
+- ประวัติหน่วยปลายทางเก็บใน secondment_history (valid_from / valid_to)
+  ต้องรัน backend/db/add_secondment_history.sql ก่อนครั้งแรก
+"""
+
+import os
+import sys
+import time
+
 import pandas as pd
 import psycopg2
-from psycopg2.extras import execute_values
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python'))
+from copy_stream import copy_frame
+from dataset_registry import get_dataset, report_issues
+from excel_reader import use_reader_option
+from import_audit import ImportAudit, excel_rows
+from import_plan import record_throughput, run_plan
+
+# Load environment variables
+load_dotenv()
 
 # Database connection
-conn = psycopg2.connect(
-    host="forensic-hr-db.postgres.database.azure.com",
-    database="forensic_hr",
-    user="forensicadmin",
-    password="2009@ThekilL",
-    sslmode="require"
-)
-cur = conn.cursor()
-
-# Read Excel
-df = pd.read_excel('ไปช่วย.xlsx', header=1)
-
-# Rename columns
-df.columns = ['no', 'rank', 'gender', 'first_name', 'last_name', 'position', 'origin_unit', 'destination_unit', 'period', 'note']
-
-# Clean data
-df['gender'] = df['gender'].fillna('ชาย')  # Default male if not specified
-df['first_name'] = df['first_name'].fillna('')
-df['last_name'] = df['last_name'].fillna('')
-df['full_name'] = df['rank'].astype(str) + ' ' + df['first_name'].astype(str) + ' ' + df['last_name'].astype(str)
-
-print(f"Total records: {len(df)}")
-print(df[['rank', 'full_name', 'origin_unit', 'destination_unit']].head())
-
-# Clear existing data
-cur.execute("DELETE FROM secondment")
-print("Cleared existing data")
-
-# Insert data
-data = []
-for _, row in df.iterrows():
-    data.append((
-        str(row['rank']).strip() if pd.notna(row['rank']) else '',
-        str(row['gender']).strip() if pd.notna(row['gender']) else 'ชาย',
-        str(row['first_name']).strip() if pd.notna(row['first_name']) else '',
-        str(row['last_name']).strip() if pd.notna(row['last_name']) else '',
-        str(row['full_name']).strip(),
-        str(row['position']).strip() if pd.notna(row['position']) else '',
-        str(row['origin_unit']).strip() if pd.notna(row['origin_unit']) else '',
-        str(row['destination_unit']).strip() if pd.notna(row['destination_unit']) else '',
-        str(row['period']).strip() if pd.notna(row['period']) else '',
-        str(row['note']).strip() if pd.notna(row['note']) else ''
-    ))
-
-insert_sql = """
-    INSERT INTO secondment (rank, gender, first_name, last_name, full_name, position, origin_unit, destination_unit, period, note)
-    VALUES %s
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'forensic-hr-db.postgres.database.azure.com'),
+    'port': os.getenv('DB_PORT', '5432'),
+    'database': os.getenv('DB_NAME', 'forensic_hr'),
+    'user': os.getenv('DB_USER', 'forensicadmin'),
+    'password': os.getenv('DB_PASSWORD'),
+    'sslmode': 'require'
+}
+
+SECONDMENT = get_dataset('secondment')
+
+KEY_MATCH = "s.full_name = i.full_name AND s.destination_unit IS NOT DISTINCT FROM i.destination_unit"
+
+CREATE_INCOMING = """
+    CREATE TEMP TABLE secondment_incoming ON COMMIT DROP AS
+    SELECT {columns} FROM secondment WITH NO DATA
+"""
+
+# คนที่ไม่อยู่ในไฟล์ใหม่แล้ว (ครบกำหนด/ยกเลิก)
+DELETE_ENDED = f"""
+    DELETE FROM secondment s
+    WHERE NOT EXISTS (SELECT 1 FROM secondment_incoming i WHERE {KEY_MATCH})
 """
-execute_values(cur, insert_sql, data)
-conn.commit()
-
-print(f"✅ Imported {len(data)} records successfully!")
-
-# Verify
-cur.execute("SELECT COUNT(*) FROM secondment")
-count = cur.fetchone()[0]
-print(f"Total in database: {count}")
-
-# Show summary by origin unit
-cur.execute("""
-    SELECT origin_unit, COUNT(*) as count 
-    FROM secondment 
-    GROUP BY origin_unit 
-    ORDER BY count DESC
-""")
-print("\n📊 Summary by Origin Unit:")
-for row in cur.fetchall():
-    print(f"  {row[0]}: {row[1]} คน")
-
-cur.close()
-conn.close()
+
+UPDATE_CHANGED = """
+    UPDATE secondment s
+    SET {assignments}, updated_at = CURRENT_TIMESTAMP
+    FROM secondment_incoming i
+    WHERE {key_match}
+      AND ({current}) IS DISTINCT FROM ({incoming})
+"""
+
+INSERT_NEW = f"""
+    INSERT INTO secondment ({{columns}})
+    SELECT {{columns}} FROM secondment_incoming i
+    WHERE NOT EXISTS (SELECT 1 FROM secondment s WHERE {KEY_MATCH})
+"""
+
+# version ที่เปิดอยู่แต่หน่วยปลายทาง/ระยะเวลาไม่ตรงกับไฟล์ใหม่ -> ปิด
+CLOSE_HISTORY = """
+    UPDATE secondment_history h
+    SET valid_to = CURRENT_TIMESTAMP
+    WHERE h.valid_to IS NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM secondment_incoming i
+          WHERE i.full_name = h.full_name
+            AND i.destination_unit IS NOT DISTINCT FROM h.destination_unit
+            AND i.period IS NOT DISTINCT FROM h.period
+      )
+"""
+
+OPEN_HISTORY = """
+    INSERT INTO secondment_history (full_name, rank, origin_unit, destination_unit, period, note, source_file)
+    SELECT i.full_name, i.rank, i.origin_unit, i.destination_unit, i.period, i.note, %s
+    FROM secondment_incoming i
+    WHERE i.full_name IS NOT NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM secondment_history h
+          WHERE h.valid_to IS NULL
+            AND h.full_name = i.full_name
+            AND h.destination_unit IS NOT DISTINCT FROM i.destination_unit
+      )
+"""
+
+
+def parse_workbook(excel_path, audit):
+    """อ่านทุก sheet ที่เป็นข้อมูลไปช่วยราชการ -> DataFrame รวม (ไม่ซ้ำตาม natural key)"""
+    sheets, skipped = SECONDMENT.data_sheets(excel_path)
+    for sheet in skipped:
+        print(f"⏭️  Skipping sheet '{sheet}'")
+    if not sheets:
+        raise ValueError(f"No secondment sheets found in {excel_path}")
+
+    frames = []
+    for sheet, header in sheets:
+        with audit.step('parse', sheet=sheet) as event:
+            df = SECONDMENT.read_raw(excel_path, sheet, header=header)
+            frame, issues = SECONDMENT.clean(df)
+            event.update(rows=excel_rows(header, len(df)), count=len(frame), issues=issues or None)
+        print(f"📄 {sheet}: {len(frame)} records")
+        report_issues(issues, f"[{sheet}] ")
+        frames.append(frame)
+
+    df = pd.concat(frames, ignore_index=True)
+    duplicates = df.duplicated(list(SECONDMENT.natural_key), keep='last')
+    if duplicates.any():
+        print(f"⚠️  {int(duplicates.sum())} duplicate rows (same name + destination) - keeping the last one")
+        df = df[~duplicates].reset_index(drop=True)
+    return df
+
+
+def merge_secondment(cur, df, audit):
+    """COPY เข้า temp table แล้ว merge เข้า secondment + secondment_history -> จำนวน (ลบ, แก้, เพิ่ม)"""
+    columns = SECONDMENT.copy_columns
+    column_list = ', '.join(columns)
+    values = [c for c in columns if c not in SECONDMENT.natural_key]
+
+    cur.execute(CREATE_INCOMING.format(columns=column_list))
+    with audit.step('load', count=len(df)) as event:
+        event['bytes'] = copy_frame(cur, 'secondment_incoming', df, columns)
+
+    with audit.step('delete') as event:
+        cur.execute(DELETE_ENDED)
+        deleted = event['count'] = cur.rowcount
+
+    with audit.step('update') as event:
+        cur.execute(UPDATE_CHANGED.format(
+            assignments=', '.join(f"{c} = i.{c}" for c in values),
+            key_match=KEY_MATCH,
+            current=', '.join(f"s.{c}" for c in values),
+            incoming=', '.join(f"i.{c}" for c in values),
+        ))
+        updated = event['count'] = cur.rowcount
+
+    with audit.step('insert') as event:
+        cur.execute(INSERT_NEW.format(columns=column_list))
+        inserted = event['count'] = cur.rowcount
+
+    with audit.step('history') as event:
+        cur.execute(CLOSE_HISTORY)
+        event['closed'] = cur.rowcount
+        cur.execute(OPEN_HISTORY, (audit.source_file,))
+        event['opened'] = cur.rowcount
+
+    return deleted, updated, inserted
+
+
+def import_secondment(excel_path, plan=False):
+    """Import secondment data from Excel file (plan=True: dry-run)"""
+    print(f"📂 Reading Excel file: {excel_path}")
+    audit = ImportAudit(excel_path, SECONDMENT.table)
+
+    df = parse_workbook(excel_path, audit)
+    print(f"✅ Total records: {len(df)}")
+    print(df[['rank', 'full_name', 'origin_unit', 'destination_unit']].head())
+
+    if plan:
+        run_plan(SECONDMENT, df, DB_CONFIG, 'merge')
+        return
+
+    print(f"\n🔗 Connecting to database...")
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+
+    try:
+        start = time.perf_counter()
+        deleted, updated, inserted = merge_secondment(cur, df, audit)
+        audit.flush(cur)
+        conn.commit()
+        record_throughput(SECONDMENT.name, len(df), time.perf_counter() - start)
+        print(f"✅ Imported {len(df)} records: {inserted} new, {updated} changed, {deleted} ended")
+
+        # Verify
+        cur.execute("SELECT COUNT(*) FROM secondment")
+        print(f"Total in database: {cur.fetchone()[0]}")
+
+        # Show summary by origin unit
+        cur.execute("""
+            SELECT origin_unit, COUNT(*) as count
+            FROM secondment
+            GROUP BY origin_unit
+            ORDER BY count DESC
+        """)
+        print("\n📊 Summary by Origin Unit:")
+        for row in cur.fetchall():
+            print(f"  {row[0]}: {row[1]} คน")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Error: {e}")
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    excel_path = args[0] if args else 'ไปช่วย.xlsx'
+
+    if not os.path.exists(excel_path):
+        print(f"❌ File not found: {excel_path}")
+        sys.exit(1)
+
+    use_reader_option(sys.argv)
+    import_secondment(excel_path, plan='--plan' in sys.argv)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,20 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import pandas as pd
 import psycopg2
 from psycopg2.extras import execute_values
-from datetime import datetime
 import os
 import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python'))
+from dataset_registry import get_dataset, report_issues
+from excel_reader import use_reader_option
+from import_audit import ImportAudit, excel_rows
+from import_plan import record_throughput, run_plan
+from search_index import refresh_search_index
+from swap_publish import publish_frame
+from table_snapshot import pre_import_snapshot
 
 DB_CONFIG = {
     'host': os.getenv('DB_HOST', 'localhost'),
@@ -16,35 +24,102 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD', '')
 }
 
-def clean_data(value):
-    if pd.isna(value) or value == '' or value == 'nan':
-        return None
-    return str(value).strip()
+VEHICLES = get_dataset('vehicles')
+VEHICLE_COLUMNS = VEHICLES.copy_columns
+
+def vehicle_rows(df):
+    """แปลง DataFrame ดิบเป็น list of tuples ตามลำดับ VEHICLE_COLUMNS"""
+    frame, issues = VEHICLES.clean(df)
+    report_issues(issues)
+    return VEHICLES.records(frame)
 
-def parse_date(date_value):
-    if pd.isna(date_value):
-        return None
+def import_vehicles_async(df, audit):
+    """นำเข้าแบบ pipelined (asyncpg) เข้า vehicles_staging แล้ว swap - batch ใดล้มเหลว vehicles ยังเป็นชุดเดิม"""
+    from async_import import publish_import, frame_chunks
+    
+    conn = psycopg2.connect(**DB_CONFIG)
     try:
-        if isinstance(date_value, str):
-            return pd.to_datetime(date_value).date()
-        elif isinstance(date_value, datetime):
-            return date_value.date()
-        else:
-            return pd.to_datetime(date_value).date()
-    except:
-        return None
+        stats = publish_import(conn, 'vehicles', VEHICLE_COLUMNS, frame_chunks(df), transform=vehicle_rows,
+                               audit=audit, rows=excel_rows(VEHICLES.header, len(df)), config=DB_CONFIG)
+        record_throughput(VEHICLES.name, stats['rows'], stats['seconds'])
+        print(f"\n✅ นำเข้าข้อมูลสำเร็จ!")
+        print(f"   📊 สำเร็จ: {stats['rows']} รายการ")
+        print(f"   ❌ ผิดพลาด: {len(df) - stats['rows']} รายการ")
+        print(f"   💾 ข้อมูลทั้งหมดในฐานข้อมูล: {stats['rows']} รายการ")
+        try:
+            refresh_search_index(conn, ['vehicles'])
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️  Search index not updated: {e}")
+    except Exception as e:
+        print(f"❌ เกิดข้อผิดพลาดในการนำเข้าข้อมูล: {e}")
+        return False
+    finally:
+        conn.close()
+    return True
 
-def import_vehicles(excel_file):
+def import_vehicles_swap(df, audit):
+    """โหลดเข้า vehicles_staging แล้ว swap แทน TRUNCATE (API ไม่เห็นตารางว่างระหว่างโหลด)"""
+    with audit.step('parse', rows=excel_rows(VEHICLES.header, len(df))) as event:
+        frame, issues = VEHICLES.clean(df)
+        event['count'] = len(frame)
+    report_issues(issues)
+    if frame.empty:
+        print("❌ ไม่มีข้อมูลสำหรับนำเข้า")
+        return False
+    
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        start = time.perf_counter()
+        publish_frame(conn, 'vehicles', frame, VEHICLE_COLUMNS, audit)
+        record_throughput(VEHICLES.name, len(frame), time.perf_counter() - start)
+        print(f"\n✅ นำเข้าข้อมูลสำเร็จ (swap)!")
+        print(f"   📊 สำเร็จ: {len(frame)} รายการ")
+        print(f"   ❌ ผิดพลาด: {len(df) - len(frame)} รายการ")
+        try:
+            refresh_search_index(conn, ['vehicles'])
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️  Search index not updated: {e}")
+    except Exception as e:
+        print(f"❌ เกิดข้อผิดพลาดในการนำเข้าข้อมูล: {e}")
+        return False
+    finally:
+        conn.close()
+    return True
+
+def import_vehicles(excel_file, use_async=False, plan=False, swap=False):
     print("🚀 เริ่มต้นนำเข้าข้อมูลยานพาหนะ...")
     print(f"📁 ไฟล์: {excel_file}")
     
     try:
-        df = pd.read_excel(excel_file, sheet_name=0, skiprows=1)
+        df = VEHICLES.read_raw(excel_file)
         print(f"✅ อ่านไฟล์สำเร็จ: {len(df)} รายการ")
     except Exception as e:
         print(f"❌ เกิดข้อผิดพลาดในการอ่านไฟล์: {e}")
         return False
     
+    audit = ImportAudit(excel_file, VEHICLES.table, dataset=VEHICLES)
+    
+    if plan:
+        frame, issues = VEHICLES.clean(df)
+        report_issues(issues)
+        run_plan(VEHICLES, frame, DB_CONFIG, 'replace')
+        return True
+    
+    # สำเนาข้อมูลเดิมก่อนแทนที่ (backups/tables/vehicles)
+    try:
+        pre_import_snapshot(VEHICLES.table, excel_file, DB_CONFIG, audit)
+    except Exception as e:
+        print(f"❌ ไม่สามารถสร้าง snapshot ก่อนนำเข้า: {e}")
+        return False
+    
+    if swap:
+        return import_vehicles_swap(df, audit)
+    
+    if use_async:
+        return import_vehicles_async(df, audit)
+    
     try:
         conn = psycopg2.connect(**DB_CONFIG)
         cur = conn.cursor()
@@ -53,63 +128,30 @@ def import_vehicles(excel_file):
         print(f"❌ ไม่สามารถเชื่อมต่อฐานข้อมูล: {e}")
         return False
     
-    try:
-        cur.execute("TRUNCATE TABLE vehicles RESTART IDENTITY CASCADE")
-        conn.commit()
-        print("🗑️  ลบข้อมูลเก่าออกแล้ว")
-    except Exception as e:
-        print(f"⚠️  เตือน: {e}")
-        conn.rollback()
+    start = time.perf_counter()
     
-    vehicles_data = []
-    success_count = 0
-    error_count = 0
-    
-    for idx, row in df.iterrows():
-        try:
-            unit = clean_data(row['หน่วยงาน'])
-            department_code = clean_data(row['บก.'])
-            bureau_code = clean_data(row['บช.'])
-            vehicle_type = clean_data(row['ประเภทรถ'])
-            mission = clean_data(row['ภารกิจ'])
-            
-            try:
-                engine_capacity = float(row['ปริมาตรกระบอกสูบ']) if pd.notna(row['ปริมาตรกระบอกสูบ']) else None
-            except:
-                engine_capacity = None
-            
-            brand = clean_data(row['ยี่ห้อ'])
-            license_plate = clean_data(row['ทะเบียน'])
-            acquired_date = parse_date(row['วันที่รับมา'])
-            vehicle_age = clean_data(row['อายุรถ ใส่เฉพาะตัวเลข  ปี เดือน'])
-            status = clean_data(row['สถานภาพ']) or 'ใช้งานได้'
-            remarks = clean_data(row['หมายเหตุ'])
-            
-            vehicles_data.append((
-                unit, department_code, bureau_code, vehicle_type, mission,
-                engine_capacity, brand, license_plate, acquired_date,
-                vehicle_age, status, remarks
-            ))
-            
-            success_count += 1
-            
-        except Exception as e:
-            error_count += 1
-            print(f"⚠️  แถวที่ {idx + 2}: {e}")
-            continue
+    with audit.step('parse', rows=excel_rows(VEHICLES.header, len(df))) as event:
+        vehicles_data = vehicle_rows(df)
+        event['count'] = len(vehicles_data)
+    success_count = len(vehicles_data)
+    error_count = len(df) - success_count
     
     if vehicles_data:
         try:
-            insert_query = """
-                INSERT INTO vehicles (
-                    unit, department_code, bureau_code, vehicle_type, mission,
-                    engine_capacity, brand, license_plate, acquired_date,
-                    vehicle_age, status, remarks
-                ) VALUES %s
+            insert_query = f"""
+                INSERT INTO vehicles ({', '.join(VEHICLE_COLUMNS)}) VALUES %s
             """
             
-            execute_values(cur, insert_query, vehicles_data)
+            # ลบข้อมูลเก่าใน transaction เดียวกับการโหลด (change log เทียบก่อน/หลัง)
+            with audit.changes(cur):
+                with audit.step('truncate'):
+                    cur.execute("TRUNCATE TABLE vehicles RESTART IDENTITY CASCADE")
+                print("🗑️  ลบข้อมูลเก่าออกแล้ว")
+                with audit.step('load', rows=excel_rows(VEHICLES.header, len(df)), count=success_count):
+                    execute_values(cur, insert_query, vehicles_data)
+            audit.flush(cur)
             conn.commit()
+            record_throughput(VEHICLES.name, success_count, time.perf_counter() - start)
             
             print(f"\n✅ นำเข้าข้อมูลสำเร็จ!")
             print(f"   📊 สำเร็จ: {success_count} รายการ")
@@ -119,6 +161,12 @@ def import_vehicles(excel_file):
             total = cur.fetchone()[0]
             print(f"   💾 ข้อมูลทั้งหมดในฐานข้อมูล: {total} รายการ")
             
+            try:
+                refresh_search_index(conn, ['vehicles'])
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️  Search index not updated: {e}")
+            
             cur.close()
             conn.close()
             return True
@@ -136,12 +184,17 @@ def import_vehicles(excel_file):
         return False
 
 def main():
-    if len(sys.argv) < 2:
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    use_async = '--async' in sys.argv
+    plan = '--plan' in sys.argv
+    
+    if len(args) < 1:
         print("❌ กรุณาระบุไฟล์ Excel")
-        print(f"📖 วิธีใช้: python3 {sys.argv[0]} <excel_file>")
+        print(f"📖 วิธีใช้: python3 {sys.argv[0]} <excel_file> [--async] [--plan] [--swap] [--reader=auto|openpyxl|calamine|arrow]")
         sys.exit(1)
     
-    excel_file = sys.argv[1]
+    excel_file = args[0]
+    use_reader_option(sys.argv)
     
     if not os.path.exists(excel_file):
         print(f"❌ ไม่พบไฟล์: {excel_file}")
@@ -152,7 +205,7 @@ def main():
     print("="*60)
     print()
     
-    success = import_vehicles(excel_file)
+    success = import_vehicles(excel_file, use_async, plan, swap='--swap' in sys.argv)
     
     if success:
         print("\n✅ เสร็จสิ้นกระบวนการนำเข้าข้อมูล")
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Async Import Core
+แกนกลางการ import แบบ asyncio + asyncpg ให้การ parse และการส่งข้อมูลทำงานซ้อนกัน
+
+- producer: ดึง chunk จาก source แล้ว parse/clean ใน thread หรือ process executor
+- consumers: หลาย coroutine ดึง batch จาก queue แล้วส่งเข้า DB ผ่าน connection pool
+  (copy_records_to_table หรือ executemany หรือ loader ที่กำหนดเอง)
+
+ตัวอย่างการใช้กับ importer เดิม:
+    from async_import import run_import, publish_import, chunked
+    run_import('vehicles', columns, chunked(rows, 1000))
+    publish_import(conn, 'vehicles', columns, frame_chunks(df, 1000), transform=vehicle_rows, audit=audit)
+
+แทนที่ทั้งตารางใช้ publish_import: COPY ทุก batch เข้า <table>_staging แล้ว swap (swap_publish)
+batch ไหนล้มเหลว ตารางจริงยังเป็นชุดเดิมทั้งหมด (แต่ละ batch ของ pool commit แยกกัน จึง TRUNCATE ก่อนไม่ได้)
+"""
+
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import asyncpg
+
+from db_config import DB_CONFIG
+
+DEFAULT_BATCH_SIZE = 1000
+
+_DONE = object()
+
+
+def asyncpg_config(config=DB_CONFIG):
+    """แปลง DB_CONFIG แบบ psycopg2 เป็น arguments ของ asyncpg"""
+    kwargs = {
+        'host': config.get('host'),
+        'port': int(config.get('port', 5432)),
+        'database': config.get('database'),
+        'user': config.get('user'),
+        'password': config.get('password'),
+    }
+    if config.get('sslmode') and config['sslmode'] != 'disable':
+        kwargs['ssl'] = config['sslmode']
+    return kwargs
+
+
+def chunked(iterable, size=DEFAULT_BATCH_SIZE):
+    """แบ่ง iterable (เช่น list of tuples เดิมของ importer) เป็น list ละ size รายการ"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def frame_chunks(df, size=DEFAULT_BATCH_SIZE):
+    """แบ่ง DataFrame เป็นช่วงละ size แถว"""
+    for start in range(0, len(df), size):
+        yield df.iloc[start:start + size]
+
+
+# ============================================
+# Loaders - async (conn, records) -> จำนวนแถว
+# ============================================
+
+def copy_loader(table, columns):
+    """Bulk load ด้วย COPY (copy_records_to_table)"""
+    async def load(conn, records):
+        await conn.copy_records_to_table(table, records=records, columns=columns)
+        return len(records)
+    return load
+
+
+def executemany_loader(query):
+    """รัน statement เดียวกันกับทุก record (เช่น UPDATE ... WHERE key = $1)"""
+    async def load(conn, records):
+        await conn.executemany(query, records)
+        return len(records)
+    return load
+
+
+def status_count(status):
+    """ดึงจำนวนแถวจาก command status เช่น 'UPDATE 37' -> 37"""
+    try:
+        return int(status.rsplit(' ', 1)[-1])
+    except (ValueError, AttributeError):
+        return 0
+
+
+# ============================================
+# Pipeline
+# ============================================
+
+async def _produce(queue, chunks, transform, executor, parse_workers, consumer_count):
+    loop = asyncio.get_running_loop()
+    # source (generator) วนใน thread แยกเสมอ - generator ส่งข้าม process ไม่ได้
+    source_executor = ThreadPoolExecutor(max_workers=1)
+    iterator = iter(chunks)
+    pending = set()
+
+    async def drain(return_when):
+        nonlocal pending
+        done, pending = await asyncio.wait(pending, return_when=return_when)
+        for task in done:
+            records = task.result()
+            if records:
+                await queue.put(records)
+
+    try:
+        while True:
+            chunk = await loop.run_in_executor(source_executor, next, iterator, _DONE)
+            if chunk is _DONE:
+                break
+            if transform is None:
+                await queue.put(chunk)
+                continue
+            pending.add(loop.run_in_executor(executor, transform, chunk))
+            if len(pending) >= parse_workers:
+                await drain(asyncio.FIRST_COMPLETED)
+        if pending:
+            await drain(asyncio.ALL_COMPLETED)
+    finally:
+        source_executor.shutdown(wait=False)
+
+    for _ in range(consumer_count):
+        await queue.put(_DONE)
+
+
+async def _consume(queue, pool, load, stats):
+    while True:
+        records = await queue.get()
+        if records is _DONE:
+            return
+        async with pool.acquire() as conn:
+            stats['rows'] += await load(conn, records)
+        stats['batches'] += 1
+
+
+async def import_async(chunks, load, transform=None, *, before=None, pool_size=4,
+                       parse_workers=2, use_processes=False, queue_size=8, config=DB_CONFIG):
+    """
+    รัน pipeline: chunks -> transform (executor) -> queue -> load (connection pool)
+
+    before: async (conn) ที่รันครั้งเดียวก่อนเริ่มโหลด
+    transform: ฟังก์ชัน sync (chunk) -> list of records; ต้อง pickle ได้ถ้า use_processes=True
+    """
+    stats = {'rows': 0, 'batches': 0}
+    start = time.perf_counter()
+
+    pool = await asyncpg.create_pool(min_size=1, max_size=pool_size, **asyncpg_config(config))
+    executor = ProcessPoolExecutor(parse_workers) if use_processes else ThreadPoolExecutor(parse_workers)
+    try:
+        if before is not None:
+            async with pool.acquire() as conn:
+                await before(conn)
+
+        queue = asyncio.Queue(maxsize=queue_size)
+        tasks = [asyncio.ensure_future(_produce(queue, chunks, transform, executor, parse_workers, pool_size))]
+        tasks += [asyncio.ensure_future(_consume(queue, pool, load, stats)) for _ in range(pool_size)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+    finally:
+        executor.shutdown(wait=False)
+        await pool.close()
+
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def run_import(table, columns, chunks, transform=None, **options):
+    """Bulk load (append) เข้าตารางด้วย COPY แบบ pipelined (เรียกจาก code sync ได้)"""
+    stats = asyncio.run(import_async(chunks, copy_loader(table, columns), transform, **options))
+    print(f"⚡ {table}: {stats['rows']} rows in {stats['batches']} batches ({stats['seconds']:.2f}s)")
+    return stats
+
+
+def publish_import(conn, table, columns, chunks, transform=None, audit=None, rows=None, **options):
+    """
+    แทนที่ทั้งตาราง: pipelined COPY เข้า <table>_staging แล้ว swap -> stats (rows = แถวใน staging)
+    conn: psycopg2 connection ที่สร้าง/swap staging และ flush audit ใน transaction เดียวกับการ swap
+    rows: ช่วงแถวใน Excel สำหรับ audit (excel_rows) แบบเดียวกับ importer แบบ sync
+    """
+    from swap_publish import publish
+
+    stats = {}
+
+    def load(cur, staging):
+        # staging ต้อง commit ก่อน connection ใน pool ของ asyncpg จึงจะเห็น
+        cur.connection.commit()
+        stats.update(run_import(staging, columns, chunks, transform, **options))
+        cur.execute(f"SELECT COUNT(*) FROM {staging}")
+        stats['rows'] = cur.fetchone()[0]
+        event = {'count': stats['rows'], 'batches': stats['batches'], 'mode': 'async'}
+        if rows is not None:
+            event['rows'] = rows
+        return event
+
+    publish(conn, table, load, audit)
+    return stats
+
+
+def run_statements(load, chunks, transform=None, **options):
+    """รัน loader ที่กำหนดเอง (เช่น UPDATE แบบ batch) แบบ pipelined"""
+    stats = asyncio.run(import_async(chunks, load, transform, **options))
+    print(f"⚡ {stats['rows']} rows in {stats['batches']} batches ({stats['seconds']:.2f}s)")
+    return stats
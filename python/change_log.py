@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Import Change Log (change-data capture)
+บันทึกว่าการ import แต่ละครั้งเปลี่ยนอะไรในตาราง ลง import_changes (backend/db/add_import_changes.sql)
+
+- snapshot ตารางก่อนและหลังโหลด (ใน transaction เดียวกัน) ด้วย COPY ... TO STDOUT
+  ทุก column เป็น ::text -> เทียบค่าที่ฐานข้อมูลเก็บจริงทั้งสองฝั่ง ไม่ต้องสนใจชนิดข้อมูลใน pandas
+- diff แบบ vectorized: merge ตาม natural key (key ซ้ำจับคู่ตามลำดับ) แล้วเทียบทีละ column ทั้ง array
+- แถวละหนึ่งเหตุการณ์: insert / update (เฉพาะ column ที่เปลี่ยน ค่าเก่า/ใหม่) / delete
+- import_changes แบ่ง partition รายเดือนตาม changed_at และเขียนแบบ append-only
+  ลบประวัติเก่าด้วยการ DROP partition
+
+ImportAudit เป็นผู้ใช้หลัก (importer ส่ง dataset= แล้วครอบการโหลดด้วย audit.changes(cur)):
+
+    audit = ImportAudit(path, 'building', dataset=BUILDING)
+    with audit.changes(cur):
+        cur.execute("DELETE FROM building")
+        copy_frame(cur, 'building', frame, BUILDING.copy_columns)
+    audit.flush(cur)      # เขียน import_changes พร้อม activity_logs
+    conn.commit()
+
+Usage (ดูการเปลี่ยนแปลงย้อนหลัง):
+    python change_log.py personnel [--since 2025-09-01] [--run RUN_ID] [--limit 50]
+"""
+
+import argparse
+import io
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2 import sql
+
+from copy_stream import copy_frame
+from db_config import DB_CONFIG
+
+CHANGE_TABLE = 'import_changes'
+CHANGE_COLUMNS = ['run_id', 'table_name', 'change_type', 'row_key', 'changed_columns',
+                  'old_values', 'new_values', 'source_file', 'changed_at']
+
+# ปิดได้ด้วย IMPORT_CHANGE_LOG=0 (เช่นโหลดข้อมูลทดสอบขนาดใหญ่)
+ENABLED = os.getenv('IMPORT_CHANGE_LOG', '1') != '0'
+
+NULL = '\\N'
+ORDINAL = '_occurrence'
+
+
+# ============================================
+# Snapshot
+# ============================================
+
+def snapshot(cur, table, columns):
+    """ตารางทั้งตาราง (เฉพาะ columns) เป็นข้อความตามที่ PostgreSQL แสดง -> DataFrame (NULL = NaN)"""
+    query = sql.SQL("COPY (SELECT {} FROM {}) TO STDOUT WITH (FORMAT csv, HEADER, NULL {})").format(
+        sql.SQL(', ').join(sql.SQL("{}::text AS {}").format(sql.Identifier(c), sql.Identifier(c)) for c in columns),
+        sql.Identifier(table), sql.Literal(NULL))
+    buffer = io.BytesIO()
+    cur.copy_expert(query.as_string(cur), buffer)
+    buffer.seek(0)
+    return pd.read_csv(buffer, dtype=str, keep_default_na=False, na_values=[NULL], encoding='utf-8')
+
+
+# ============================================
+# Diff
+# ============================================
+
+def _with_ordinal(frame, key):
+    """ลำดับของแถวภายใน key เดียวกัน (key ซ้ำจับคู่แถวที่เหมือนกันก่อน)"""
+    frame = frame.sort_values(list(frame.columns), na_position='last', kind='stable')
+    return frame.assign(**{ORDINAL: frame.groupby(key, dropna=False).cumcount()})
+
+
+def _json_lines(frame):
+    """DataFrame -> list ของ JSON object ต่อแถว (NaN -> null)"""
+    if frame.empty:
+        return []
+    return frame.to_json(orient='records', lines=True, force_ascii=False).rstrip('\n').split('\n')
+
+
+def diff_snapshots(old, new, key, columns):
+    """
+    snapshot ก่อน/หลัง -> DataFrame: change_type, row_key, changed_columns, old_values, new_values
+    (JSON เป็นข้อความพร้อม COPY เข้า jsonb, changed_columns เป็น array literal ของ PostgreSQL)
+    """
+    key = list(key)
+    values = [c for c in columns if c not in key]
+    merged = _with_ordinal(old, key).merge(_with_ordinal(new, key), on=key + [ORDINAL], how='outer',
+                                           suffixes=('_old', '_new'), indicator=True)
+
+    before = merged[[f'{c}_old' for c in values]].to_numpy(dtype=object)
+    after = merged[[f'{c}_new' for c in values]].to_numpy(dtype=object)
+    missing_before, missing_after = pd.isna(before), pd.isna(after)
+    same = (missing_before & missing_after) | (~missing_before & ~missing_after & (before == after))
+
+    side = merged['_merge'].to_numpy()
+    inserted = side == 'right_only'
+    deleted = side == 'left_only'
+    updated = (side == 'both') & ~same.all(axis=1)
+
+    parts = []
+    for change, mask, suffix in (('insert', inserted, '_new'), ('delete', deleted, '_old')):
+        if not mask.any():
+            continue
+        rows = merged.loc[mask, [f'{c}{suffix}' for c in values]]
+        rows.columns = values
+        body = _json_lines(rows)
+        parts.append(pd.DataFrame({
+            'change_type': change,
+            'row_key': _json_lines(merged.loc[mask, key]),
+            'changed_columns': None,
+            'old_values': body if change == 'delete' else None,
+            'new_values': body if change == 'insert' else None,
+        }))
+
+    if updated.any():
+        rows = np.flatnonzero(updated)
+        changed = ~same[rows]
+        names = np.array(values, dtype=object)
+        old_json, new_json, column_lists = [], [], []
+        for position, flags in zip(rows, changed):
+            cols = np.flatnonzero(flags)
+            column_lists.append('{' + ','.join(names[cols]) + '}')
+            old_json.append(json.dumps({names[c]: _scalar(before[position, c]) for c in cols}, ensure_ascii=False))
+            new_json.append(json.dumps({names[c]: _scalar(after[position, c]) for c in cols}, ensure_ascii=False))
+        parts.append(pd.DataFrame({
+            'change_type': 'update',
+            'row_key': _json_lines(merged.loc[updated, key]),
+            'changed_columns': column_lists,
+            'old_values': old_json,
+            'new_values': new_json,
+        }))
+
+    if not parts:
+        return pd.DataFrame(columns=['change_type', 'row_key', 'changed_columns', 'old_values', 'new_values'])
+    return pd.concat(parts, ignore_index=True)
+
+
+def _scalar(value):
+    return None if pd.isna(value) else value
+
+
+def summarize(changes):
+    counts = changes['change_type'].value_counts()
+    return {kind: int(counts.get(kind, 0)) for kind in ('insert', 'update', 'delete')}
+
+
+# ============================================
+# Capture / write
+# ============================================
+
+def change_table_exists(cur):
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (CHANGE_TABLE,))
+    return cur.fetchone()[0]
+
+
+def ensure_partition(cur, when):
+    """partition รายเดือนของ changed_at (สร้างเมื่อยังไม่มี)"""
+    start = date(when.year, when.month, 1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    cur.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+        sql.Identifier(f"{CHANGE_TABLE}_{start:%Y_%m}"), sql.Identifier(CHANGE_TABLE)), (start, end))
+
+
+class ChangeLog:
+    """การเปลี่ยนแปลงของ dataset หนึ่งในการ import หนึ่งครั้ง - buffer ไว้จนถึง flush(cur)"""
+
+    def __init__(self, dataset, source_file=None, run_id=None):
+        self.dataset = dataset
+        self.columns = list(dict.fromkeys(list(dataset.natural_key) + list(dataset.copy_columns)))
+        self.source_file = source_file
+        self.run_id = run_id or f"{datetime.now():%Y%m%d%H%M%S}-{os.getpid()}"
+        self.pending = []
+        self.available = None
+
+    def before(self, cur):
+        """snapshot ตารางจริงก่อนโหลด -> None เมื่อยังไม่ได้สร้าง import_changes (ข้ามการบันทึก)"""
+        if self.available is None:
+            self.available = change_table_exists(cur)
+            if not self.available:
+                print(f"⚠️  {CHANGE_TABLE} not found - change log skipped (run backend/db/add_import_changes.sql)")
+        if not self.available:
+            return None
+        return snapshot(cur, self.dataset.table, self.columns)
+
+    def after(self, cur, old, table=None):
+        """snapshot หลังโหลด (table = ตาราง staging ถ้าโหลดผ่าน swap) แล้ว diff -> summary"""
+        new = snapshot(cur, table or self.dataset.table, self.columns)
+        changes = diff_snapshots(old, new, self.dataset.natural_key, self.columns)
+        self.pending.append((changes, datetime.now()))
+        return summarize(changes)
+
+    def flush(self, cur):
+        """COPY การเปลี่ยนแปลงที่ค้างอยู่เข้า import_changes (ยังไม่ commit) -> จำนวนแถว"""
+        written = 0
+        pending, self.pending = self.pending, []
+        for changes, changed_at in pending:
+            if changes.empty:
+                continue
+            ensure_partition(cur, changed_at)
+            frame = changes.assign(run_id=self.run_id, table_name=self.dataset.table,
+                                   source_file=self.source_file, changed_at=changed_at)
+            copy_frame(cur, CHANGE_TABLE, frame, CHANGE_COLUMNS)
+            written += len(frame)
+        return written
+
+
+# ============================================
+# Report
+# ============================================
+
+def print_changes(cur, table, since, run_id=None, limit=50):
+    where = sql.SQL("table_name = %s AND changed_at >= %s") + (sql.SQL(" AND run_id = %s") if run_id else sql.SQL(''))
+    params = [table, since] + ([run_id] if run_id else [])
+    source = sql.SQL("FROM {} WHERE ").format(sql.Identifier(CHANGE_TABLE)) + where
+
+    cur.execute(sql.SQL("SELECT change_type, COUNT(*), COUNT(DISTINCT run_id) ") + source
+                + sql.SQL(" GROUP BY change_type ORDER BY change_type"), params)
+    print(f"\n📝 {table} changes since {since}:")
+    for change, count, runs in cur.fetchall():
+        print(f"   {change:7s} {count:6d} rows ({runs} imports)")
+
+    cur.execute(sql.SQL("SELECT col, COUNT(*) FROM (SELECT unnest(changed_columns) AS col ") + source
+                + sql.SQL(") c GROUP BY col ORDER BY COUNT(*) DESC"), params)
+    columns = cur.fetchall()
+    if columns:
+        print(f"\n   Updated columns: " + ', '.join(f"{c} ({n})" for c, n in columns))
+
+    cur.execute(sql.SQL("SELECT changed_at, change_type, row_key, old_values, new_values ") + source
+                + sql.SQL(" ORDER BY changed_at DESC, change_type LIMIT %s"), params + [limit])
+    print()
+    for changed_at, change, key, old, new in cur.fetchall():
+        label = ' / '.join('-' if v is None else str(v) for v in key.values())
+        if change == 'update':
+            detail = ', '.join(f"{c}: {old[c]} -> {new[c]}" for c in new)
+        else:
+            detail = ''
+        print(f"   {changed_at:%Y-%m-%d %H:%M} {change:7s} {label}  {detail}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show rows changed by imports')
+    parser.add_argument('table', help='table name (personnel, equipment, vehicles, ...)')
+    parser.add_argument('--since', type=date.fromisoformat, default=date.today() - timedelta(days=30),
+                        help='first day to include (YYYY-MM-DD, default 30 days ago)')
+    parser.add_argument('--run', help='only changes from one import run')
+    parser.add_argument('--limit', type=int, default=50, help='number of rows to list')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        cur = conn.cursor()
+        print_changes(cur, args.table, args.since, args.run, args.limit)
+        cur.close()
+    finally:
+        conn.close()
+    print(f"\n⏱️  {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
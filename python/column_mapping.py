@@ -1,18 +1,12 @@
 """
 Column mapping สำหรับ Excel to Database
+(สร้างจาก dataset_registry - แก้ไขที่ DATASETS['personnel'] ที่เดียว)
 """
 
+from dataset_registry import get_dataset
+
 # Mapping จาก Excel columns -> Database columns
-COLUMN_MAPPING = {
-    'ยศ': 'rank',
-    'เพศ': 'gender',
-    'ชื่อ-นามสกุล': 'full_name',
-    'ชื่อ': 'first_name',
-    'นามสกุล': 'last_name',
-    'ชื่อตำแหน่ง': 'position',
-    'สังกัด': 'department',
-    'ว่าง': 'status'
-}
+COLUMN_MAPPING = get_dataset('personnel').source_mapping()
 
 # Columns ที่ database รองรับ
-ALLOWED_COLUMNS = list(COLUMN_MAPPING.values())
+ALLOWED_COLUMNS = list(dict.fromkeys(COLUMN_MAPPING.values()))
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Cross-dataset Consistency Check
+ตรวจว่าชื่อหน่วยในแต่ละตารางที่ import แยกกันยังตรงกัน
+
+หนึ่ง query ต่อตาราง: GROUP BY (หน่วย, natural key) พร้อมจำนวนแถว/ผลรวม
+แล้วเทียบกันใน memory (set / pandas merge) - ฐานข้อมูลทำงานแค่ aggregate ครั้งเดียวต่อตาราง
+
+รายงาน:
+    orphan units:  หน่วยที่มีในตารางหนึ่งแต่ไม่มีใน personnel (อ้างอิงหลัก)
+    spelling:      ชื่อที่ยังไม่ใช่ชื่อมาตรฐานของ unit_normalizer (ควรรัน --apply)
+    quota:         housing authorized_quota / current_occupants เทียบกับจำนวนคนครองต่อ บก.
+    duplicates:    natural key (ตาม dataset_registry) ซ้ำหลัง normalize ชื่อหน่วย
+
+Usage:
+    python consistency_check.py [--json report.json] [--strict]
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import pandas as pd
+import psycopg2
+
+from db_config import DB_CONFIG
+from dataset_registry import get_dataset
+from unit_normalizer import get_normalizer
+
+REFERENCE = 'personnel'
+
+# ตาราง -> column ชื่อหน่วยระดับ บก. + เงื่อนไข / ผลรวมที่ต้องใช้
+UNIT_TABLES = {
+    'personnel': {'unit': 'headquarters', 'where': "vacancy_status = 'คนครอง'"},
+    'housing': {'unit': 'division', 'measures': ('authorized_quota', 'current_occupants')},
+    'building': {'unit': 'division'},
+    'vehicles': {'unit': 'department_code'},
+    'equipment': {'unit': 'division'},
+    'budget': {'unit': 'division'},
+}
+
+
+# ============================================
+# Fetch (หนึ่ง round-trip ต่อตาราง)
+# ============================================
+
+def unit_query(table, spec):
+    # GROUP BY ใช้ชื่อ column จริง - personnel มี column ชื่อ unit อยู่แล้ว (alias จะชนกัน)
+    keys = [k for k in get_dataset(table).natural_key if k != spec['unit']]
+    measures = spec.get('measures', ())
+    select = [f"{spec['unit']} AS unit"] + keys + ['COUNT(*) AS row_count']
+    select += [f"COALESCE(SUM({m}), 0) AS {m}" for m in measures]
+    where = f"WHERE {spec['where']}" if 'where' in spec else ''
+    return f"""
+        SELECT {', '.join(select)}
+        FROM {table} {where}
+        GROUP BY {', '.join([spec['unit']] + keys)}
+    """, keys
+
+
+def fetch_units(cur, table, spec):
+    """-> DataFrame: unit, natural key..., row_count, measures..."""
+    query, _ = unit_query(table, spec)
+    cur.execute(query)
+    return pd.DataFrame(cur.fetchall(), columns=[d[0] for d in cur.description])
+
+
+def fetch_all(conn):
+    frames = {}
+    cur = conn.cursor()
+    try:
+        for table, spec in UNIT_TABLES.items():
+            start = time.perf_counter()
+            frames[table] = fetch_units(cur, table, spec)
+            print(f"📥 {table}: {len(frames[table]):,} groups ({time.perf_counter() - start:.2f}s)")
+    finally:
+        cur.close()
+    return frames
+
+
+# ============================================
+# Checks (ใน memory)
+# ============================================
+
+def canonical_units(frames):
+    """เพิ่ม column unit_key (ชื่อมาตรฐาน) ทุก frame"""
+    normalizer = get_normalizer()
+    for frame in frames.values():
+        frame['unit_key'] = normalizer.normalize(frame['unit'].astype('string'))
+    return frames
+
+
+def orphan_units(frames):
+    """หน่วยของแต่ละตารางที่ไม่มีใน personnel -> {table: [(หน่วย, จำนวนแถว)]}"""
+    reference = set(frames[REFERENCE]['unit_key'].dropna())
+    orphans = {}
+    for table, frame in frames.items():
+        if table == REFERENCE:
+            continue
+        rows = frame.groupby('unit_key', dropna=False)['row_count'].sum()
+        missing = rows[[u not in reference for u in rows.index]]
+        if not missing.empty:
+            orphans[table] = [(None if pd.isna(u) else u, int(n)) for u, n in missing.items()]
+    return orphans
+
+
+def missing_units(frames):
+    """หน่วยใน personnel ที่ไม่มีในตารางอื่น (ข้อมูลอาจยังไม่ได้ import) -> {table: [หน่วย]}"""
+    reference = set(frames[REFERENCE]['unit_key'].dropna())
+    return {table: sorted(reference - set(frame['unit_key'].dropna()))
+            for table, frame in frames.items() if table != REFERENCE}
+
+
+def spelling_drift(frames):
+    """ชื่อที่เก็บในตารางต่างจากชื่อมาตรฐาน -> {table: [(ชื่อที่เก็บ, ชื่อมาตรฐาน, จำนวนแถว)]}"""
+    drift = {}
+    for table, frame in frames.items():
+        differs = frame[frame['unit'].notna() & (frame['unit'] != frame['unit_key'])]
+        if differs.empty:
+            continue
+        rows = differs.groupby(['unit', 'unit_key'])['row_count'].sum()
+        drift[table] = [(unit, key, int(n)) for (unit, key), n in rows.items()]
+    return drift
+
+
+def quota_mismatches(frames):
+    """
+    housing ต่อ บก. join จำนวนคนครองใน personnel (hash join ด้วย merge)
+    -> DataFrame ของ บก. ที่ quota หรือผู้พักเกินจำนวนคนครอง หรือไม่มีคนใน personnel
+    """
+    housing = frames['housing'].groupby('unit_key')[['authorized_quota', 'current_occupants']].sum()
+    headcount = frames[REFERENCE].groupby('unit_key')['row_count'].sum().rename('headcount')
+    joined = housing.join(headcount, how='left')
+    joined['headcount'] = joined['headcount'].fillna(0).astype(int)
+    bad = ((joined['authorized_quota'] > joined['headcount'])
+           | (joined['current_occupants'] > joined['headcount']))
+    joined['quota_ratio'] = (joined['authorized_quota'] / joined['headcount'].where(joined['headcount'] > 0)).round(2)
+    return joined[bad].reset_index().rename(columns={'unit_key': 'unit'})
+
+
+def duplicate_entities(frames):
+    """natural key ซ้ำ (หลัง normalize หน่วย) -> {table: DataFrame ของ key ที่ซ้ำ + จำนวน}"""
+    duplicates = {}
+    for table, spec in UNIT_TABLES.items():
+        frame = frames[table]
+        keys = [k for k in get_dataset(table).natural_key if k != spec['unit']]
+        if not keys:
+            continue
+        group = (['unit_key'] if spec['unit'] in get_dataset(table).natural_key else []) + keys
+        present = frame[frame[keys].notna().any(axis=1)]
+        counts = present.groupby(group, dropna=False)['row_count'].sum()
+        dup = counts[counts > 1]
+        if not dup.empty:
+            duplicates[table] = dup.rename('rows').reset_index()
+    return duplicates
+
+
+def run_checks(frames):
+    canonical_units(frames)
+    return {
+        'orphans': orphan_units(frames),
+        'missing': missing_units(frames),
+        'spelling': spelling_drift(frames),
+        'quota': quota_mismatches(frames),
+        'duplicates': duplicate_entities(frames),
+    }
+
+
+# ============================================
+# Report
+# ============================================
+
+def problem_count(report):
+    return (sum(len(v) for v in report['orphans'].values())
+            + sum(len(v) for v in report['spelling'].values())
+            + len(report['quota'])
+            + sum(len(v) for v in report['duplicates'].values()))
+
+
+def print_report(report, limit=10):
+    print(f"\n🏷️  Orphan units (ไม่มีใน {REFERENCE}):")
+    for table, units in report['orphans'].items():
+        print(f"  {table}: " + ', '.join(f"{u} ({n})" for u, n in units[:limit])
+              + (f" ... อีก {len(units) - limit}" if len(units) > limit else ''))
+
+    print(f"\n✏️  Spelling drift:")
+    for table, names in report['spelling'].items():
+        for unit, key, n in names[:limit]:
+            print(f"  {table}: '{unit}' -> '{key}' ({n} rows)")
+
+    print(f"\n🏠 Housing quota vs headcount:")
+    if not report['quota'].empty:
+        print(report['quota'].to_string(index=False))
+
+    print(f"\n🔁 Duplicate entities:")
+    for table, dup in report['duplicates'].items():
+        print(f"  {table}: {len(dup)} keys ({int(dup['rows'].sum())} rows)")
+        print('    ' + dup.head(limit).to_string(index=False).replace('\n', '\n    '))
+
+    missing = {t: u for t, u in report['missing'].items() if u}
+    if missing:
+        print(f"\nℹ️  Units in {REFERENCE} without rows in:")
+        for table, units in missing.items():
+            print(f"  {table}: {', '.join(units)}")
+
+
+def to_json(report):
+    def convert(value):
+        if isinstance(value, pd.DataFrame):
+            return json.loads(value.to_json(orient='records', force_ascii=False))
+        if isinstance(value, dict):
+            return {k: convert(v) for k, v in value.items()}
+        return value
+    return convert(report)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cross-dataset unit consistency check')
+    parser.add_argument('--json', help='write the report as JSON')
+    parser.add_argument('--strict', action='store_true', help='exit 1 when problems are found')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        frames = fetch_all(conn)
+    finally:
+        conn.close()
+    report = run_checks(frames)
+    print_report(report)
+
+    problems = problem_count(report)
+    print(f"\n{'⚠️ ' if problems else '✅'} {problems} problems ({time.perf_counter() - start:.2f}s)")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(to_json(report), f, ensure_ascii=False, indent=2)
+        print(f"💾 {args.json}")
+    if args.strict and problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+COPY Streaming Loader
+ส่ง DataFrame / generator ของ rows เข้า PostgreSQL ด้วย COPY ... FROM STDIN
+โดยไม่สร้าง list of tuples หรือ dict ต่อแถว
+
+DataFrame ถูกแปลงเป็นข้อความ COPY ทีละช่วง (column-oriented ด้วย pandas string ops)
+แล้วป้อนผ่าน file-like object ที่อ่านจาก generator - หน่วยความจำสูงสุด
+จึงประมาณขนาดของ DataFrame บวกหนึ่งช่วง (chunk_size แถว)
+
+Usage:
+    copy_frame(cur, 'building', frame, BUILDING.copy_columns)
+    copy_frames(cur, 'building', (frame for frame, _ in BUILDING.iter_clean(csv_path)), BUILDING.copy_columns)
+    copy_rows(cur, 'secondment', columns, (tuple(...) for ...))
+
+Benchmark (ไม่ต้องต่อฐานข้อมูล):
+    python copy_stream.py --benchmark --rows 100000
+"""
+
+import argparse
+import io
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 5000
+
+NULL = '\\N'
+ESCAPES = [('\\', '\\\\'), ('\t', '\\t'), ('\n', '\\n'), ('\r', '\\r')]
+SPECIAL = r'[\\\t\n\r]'
+
+
+# ============================================
+# COPY text format
+# ============================================
+
+def _format_column(values):
+    """Series -> list ของข้อความตามรูปแบบ COPY text (escape แล้ว, null เป็น \\N)"""
+    missing = values.isna().to_numpy()
+    if pd.api.types.is_float_dtype(values):
+        text = values.to_numpy(dtype=float, na_value=np.nan).astype(str)
+    else:
+        text = values.astype(object).astype(str)
+        if not pd.api.types.is_numeric_dtype(values) and text.str.contains(SPECIAL).any():
+            for char, escaped in ESCAPES:
+                text = text.str.replace(char, escaped, regex=False)
+        text = text.to_numpy()
+    text[missing] = NULL
+    return text.tolist()
+
+
+def format_frame(frame):
+    """DataFrame ช่วงหนึ่ง -> bytes ของ COPY text (หนึ่งบรรทัดต่อแถว)"""
+    if frame.empty:
+        return b''
+    columns = [_format_column(frame[c]) for c in frame.columns]
+    return ('\n'.join(map('\t'.join, zip(*columns))) + '\n').encode('utf-8')
+
+
+def _format_value(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA:
+        return NULL
+    text = str(value)
+    if isinstance(value, str):
+        for char, escaped in ESCAPES:
+            text = text.replace(char, escaped)
+    return text
+
+
+def iter_frame_chunks(frame, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    frame = frame if columns is None else frame[columns]
+    for start in range(0, len(frame), chunk_size):
+        yield format_frame(frame.iloc[start:start + chunk_size])
+
+
+def iter_row_chunks(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """generator ของ tuple -> bytes ทีละ chunk_size แถว"""
+    lines = []
+    for row in rows:
+        lines.append('\t'.join(_format_value(v) for v in row))
+        if len(lines) >= chunk_size:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class IteratorFile(io.RawIOBase):
+    """file-like object ที่อ่านจาก generator ของ bytes (ให้ copy_expert ดึงทีละ block)"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = memoryview(b'')
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            try:
+                self._buffer = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        self.bytes_read += n
+        return n
+
+
+def _copy(cur, table, columns, chunks):
+    stream = IteratorFile(chunks)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", stream)
+    return stream.bytes_read
+
+
+def copy_frame(cur, table, frame, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    """COPY DataFrame เข้าตาราง -> จำนวน bytes ที่ส่ง"""
+    return _copy(cur, table, columns, iter_frame_chunks(frame, columns, chunk_size))
+
+
+def copy_frames(cur, table, frames, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    """COPY เดียวจาก iterable ของ DataFrame (เช่น CSV ที่ clean ทีละ chunk) -> จำนวน bytes ที่ส่ง"""
+    chunks = (chunk for frame in frames for chunk in iter_frame_chunks(frame, columns, chunk_size))
+    return _copy(cur, table, columns, chunks)
+
+
+def copy_rows(cur, table, columns, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """COPY จาก iterable ของ tuple (เช่น generator) -> จำนวน bytes ที่ส่ง"""
+    return _copy(cur, table, columns, iter_row_chunks(rows, chunk_size))
+
+
+# ============================================
+# Memory benchmark
+# ============================================
+
+def synthetic_frame(rows, seed=0):
+    """ข้อมูลจำลองรูปแบบเดียวกับตาราง building หลัง clean"""
+    rng = np.random.default_rng(seed)
+    divisions = np.array([f'ศพฐ.{i}' for i in range(1, 11)] + ['บก.อก.สพฐ.ตร.', 'พฐก.', 'ทว.', 'สฝจ.'])
+    provinces = np.array(['กรุงเทพมหานคร', 'ปทุมธานี', 'ชลบุรี', 'นครราชสีมา', 'ขอนแก่น', 'ลำปาง', 'สงขลา'])
+    ids = np.arange(rows)
+    return pd.DataFrame({
+        'bureau': pd.Series(['สพฐ.ตร.'] * rows, dtype='string'),
+        'division': pd.Series(divisions[rng.integers(0, len(divisions), rows)], dtype='string'),
+        'subdivision': pd.Series([f'พฐ.จว.{i % 77}' for i in ids], dtype='string'),
+        'building_name': pd.Series([f'อาคารที่ทำการ หน่วยที่ {i}' for i in ids], dtype='string'),
+        'building_count': pd.Series(rng.integers(1, 4, rows), dtype='Int64'),
+        'building_age': pd.Series(rng.integers(0, 60, rows), dtype='Int64').mask(ids % 7 == 0),
+        'province': pd.Series(provinces[rng.integers(0, len(provinces), rows)], dtype='string'),
+        'location_lat': rng.uniform(5.6, 20.4, rows),
+        'location_lng': rng.uniform(97.3, 105.6, rows),
+        'remarks': pd.Series(np.where(ids % 5 == 0, 'หมายเหตุ\tมีแท็บ\nและขึ้นบรรทัด', None), dtype='string'),
+    })
+
+
+def _tuple_path(frame):
+    """วิธีเดิม: DataFrame -> dict ต่อแถว -> list of tuples (ข้อมูลที่ execute_values ต้องการ)"""
+    records = frame.astype(object).where(frame.notna(), None).to_dict('records')
+    values = [tuple(r.values()) for r in records]
+    return len(values)
+
+
+def _stream_path(frame):
+    """วิธีใหม่: COPY text ทีละช่วงผ่าน IteratorFile (อ่านแบบเดียวกับ copy_expert)"""
+    stream = IteratorFile(iter_frame_chunks(frame))
+    while stream.read(8192):
+        pass
+    return stream.bytes_read
+
+
+def measure(func, frame):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(frame)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def run_benchmark(rows):
+    frame = synthetic_frame(rows)
+    frame_size = frame.memory_usage(deep=True).sum()
+    print(f"📋 Synthetic frame: {rows:,} rows, {frame_size / 1e6:.1f} MB")
+
+    for label, func in (('dict -> tuple list', _tuple_path), ('COPY stream', _stream_path)):
+        peak, elapsed = measure(func, frame)
+        print(f"   {label:20s} peak +{peak / 1e6:8.1f} MB ({peak / frame_size:5.2f}x frame)  {elapsed:6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='COPY streaming loader')
+    parser.add_argument('--benchmark', action='store_true', help='compare peak memory against tuple lists')
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        run_benchmark(args.rows)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+CSV / TSV Reader
+อ่านไฟล์ CSV/TSV ที่หน่วยส่งมาแทน .xlsx - ไม่ต้องแปลงเป็น Excel ก่อน
+
+- encoding: UTF-8 (มี/ไม่มี BOM) หรือ TIS-620 (อ่านด้วย cp874 ซึ่งครอบคลุม TIS-620)
+  ตรวจจาก SAMPLE_BYTES แรกของไฟล์
+- ตัวคั่น: .tsv = tab, .csv = comma, .txt = ตรวจด้วย csv.Sniffer
+- read_excel / sheet_names / scan_rows เรียกโมดูลนี้เมื่อไฟล์เป็น CSV/TSV
+  importer ทุกตัวที่อ่านผ่าน Dataset.read_raw จึงรับ CSV ได้ทันที (ไฟล์หนึ่ง = sheet เดียว)
+
+load_csv: COPY เข้าตารางโดยไม่อ่านทั้งไฟล์เข้า memory
+    direct: แถว header เป็นชื่อ column ในตารางอยู่แล้ว (เช่นไฟล์จาก table_exporter.py)
+            ส่งไฟล์เข้า COPY ... (FORMAT csv) ตรง ๆ - PostgreSQL parse และแปลง encoding เอง
+    clean:  อ่านทีละ chunk (pd.read_csv chunksize) -> Dataset.clean -> COPY เดียวกันทั้งไฟล์
+
+Usage:
+    python csv_reader.py <file.csv> [dataset]
+"""
+
+import codecs
+import csv
+import os
+import sys
+from functools import lru_cache
+from itertools import islice
+
+import pandas as pd
+
+DELIMITED_EXTENSIONS = {'.csv': ',', '.tsv': '\t', '.txt': None}
+SNIFF_DELIMITERS = ',\t;|'
+SAMPLE_BYTES = 64 * 1024
+CHUNK_ROWS = int(os.getenv('CSV_CHUNK_ROWS', 20000))
+
+# Python codec -> ชื่อ encoding ของ PostgreSQL (COPY ... ENCODING)
+PG_ENCODINGS = {'utf-8-sig': 'UTF8', 'utf-8': 'UTF8', 'cp874': 'WIN874'}
+
+
+# ============================================
+# Detection
+# ============================================
+
+def is_delimited(path):
+    if not isinstance(path, (str, os.PathLike)):
+        return False
+    return os.path.splitext(os.fspath(path))[1].lower() in DELIMITED_EXTENSIONS
+
+
+def detect_encoding(sample):
+    """bytes ต้นไฟล์ -> codec (utf-8-sig / utf-8 / cp874)"""
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # final=False: ตัวอักษรที่ถูกตัดครึ่งท้าย sample ไม่นับว่าผิด
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return 'cp874'
+    return 'utf-8'
+
+
+def detect_delimiter(path, text):
+    delimiter = DELIMITED_EXTENSIONS.get(os.path.splitext(os.fspath(path))[1].lower())
+    if delimiter is not None:
+        return delimiter
+    try:
+        return csv.Sniffer().sniff(text, delimiters=SNIFF_DELIMITERS).delimiter
+    except csv.Error:
+        return ','
+
+
+@lru_cache(maxsize=256)
+def _describe(path, mtime):
+    with open(path, 'rb') as f:
+        sample = f.read(SAMPLE_BYTES)
+    encoding = detect_encoding(sample)
+    text = sample.decode(encoding, errors='ignore')
+    # sniff เฉพาะบรรทัดที่ครบ
+    lines = text.splitlines()[:-1] or text.splitlines()
+    return encoding, detect_delimiter(path, '\n'.join(lines))
+
+
+def describe(path):
+    """-> (encoding, ตัวคั่น) ของไฟล์ (cache ตาม mtime)"""
+    return _describe(os.path.abspath(path), os.path.getmtime(path))
+
+
+# ============================================
+# Reading
+# ============================================
+
+def sheet_names(path):
+    """CSV มี sheet เดียว - ใช้ชื่อไฟล์เป็นชื่อ sheet"""
+    return [os.path.splitext(os.path.basename(path))[0]]
+
+
+def scan_rows(path, limit):
+    """limit แถวแรก -> list of tuples (ช่องว่างเป็น None เหมือน openpyxl)"""
+    encoding, delimiter = describe(path)
+    with open(path, newline='', encoding=encoding, errors='replace') as f:
+        return [tuple(v if v != '' else None for v in row)
+                for row in islice(csv.reader(f, delimiter=delimiter), limit)]
+
+
+def read_options(path, header=0, **kwargs):
+    """
+    option ของ pd.read_csv - ทุกค่าอ่านเป็นข้อความ (รหัสที่ขึ้นต้นด้วย 0 ไม่หาย)
+    converter ใน dataset_registry แปลงตัวเลข/วันที่จากข้อความอยู่แล้ว
+    """
+    encoding, delimiter = describe(path)
+    options = {'sep': delimiter, 'encoding': encoding, 'header': header, 'dtype': str,
+               'keep_default_na': False, 'na_values': [''], 'skip_blank_lines': False}
+    options.update(kwargs)
+    return options
+
+
+def read_csv(path, header=0, **kwargs):
+    """ทั้งไฟล์เป็น DataFrame เดียว (สำหรับ importer ที่ต้องใช้ทั้งชุด เช่น merge/dedupe)"""
+    return pd.read_csv(path, **read_options(path, header, **kwargs))
+
+
+def iter_csv(path, header=0, chunksize=CHUNK_ROWS, **kwargs):
+    """DataFrame ทีละ chunksize แถว - index ต่อเนื่องทั้งไฟล์ (เลขแถวใน audit ถูกต้อง)"""
+    with pd.read_csv(path, chunksize=chunksize, **read_options(path, header, **kwargs)) as reader:
+        yield from reader
+
+
+# ============================================
+# COPY
+# ============================================
+
+def table_columns(cur, table):
+    cur.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+    """, (table,))
+    return {row[0] for row in cur.fetchall()}
+
+
+def direct_header(cur, dataset, path, limit=20):
+    """
+    แถว header ที่ทุกช่องเป็นชื่อ column ของตาราง และครบ copy_columns
+    -> (แถว, [column]) หรือ None ถ้าต้อง clean ก่อน
+    """
+    existing = table_columns(cur, dataset.table)
+    for row, values in enumerate(scan_rows(path, limit)):
+        names = [str(v).strip() for v in values if v is not None]
+        if not names or len(names) != len(values) or len(set(names)) != len(names):
+            continue
+        if set(names) <= existing and set(dataset.copy_columns) <= set(names):
+            return row, names
+    return None
+
+
+def copy_csv(cur, table, path, columns, header=0):
+    """
+    ส่งไฟล์เข้า COPY ตรง ๆ (ไม่มีการจัดการต่อแถวใน Python) -> จำนวน bytes ที่ส่ง
+    header: แถวของ header (แถวก่อนหน้าเป็นชื่อเรื่อง - ข้ามก่อนเริ่ม COPY)
+    """
+    from psycopg2 import sql
+
+    encoding, delimiter = describe(path)
+    query = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, HEADER true, DELIMITER {}, ENCODING {})").format(
+        sql.Identifier(table),
+        sql.SQL(', ').join(map(sql.Identifier, columns)),
+        sql.Literal(delimiter),
+        sql.Literal(PG_ENCODINGS[encoding]),
+    )
+    with open(path, 'rb') as f:
+        for _ in range(header):
+            f.readline()
+        start = f.tell()
+        cur.copy_expert(query, f)
+        return f.tell() - start
+
+
+def sync_serial(cur, owner, table, columns):
+    """
+    COPY ที่ระบุ id เองไม่เลื่อน sequence - ตั้งค่าให้ต่อจาก id สูงสุดใน table
+    owner: ตารางที่เป็นเจ้าของ sequence (table อาจเป็น staging ที่ใช้ sequence เดียวกัน)
+    """
+    if 'id' not in columns:
+        return
+    cur.execute(f"""
+        SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)
+        WHERE pg_get_serial_sequence(%s, 'id') IS NOT NULL
+    """, (owner, owner))
+
+
+def load_csv(cur, dataset, path, table=None, chunksize=CHUNK_ROWS):
+    """
+    CSV/TSV -> table (None = dataset.table) ด้วย COPY เดียว
+    -> {'mode', 'count', 'bytes', 'issues'} (ใช้เป็น field ของ audit step ได้ตรง ๆ)
+    """
+    from copy_stream import copy_frames
+
+    table = table or dataset.table
+    found = direct_header(cur, dataset, path)
+    if found is not None:
+        row, columns = found
+        sent = copy_csv(cur, table, path, columns, header=row)
+        count = cur.rowcount
+        sync_serial(cur, dataset.table, table, columns)
+        return {'mode': 'direct', 'count': count, 'bytes': sent, 'issues': None}
+
+    issues = {}
+    counter = {'count': 0}
+
+    def frames():
+        for frame, chunk_issues in dataset.iter_clean(path, chunksize):
+            for message, count in chunk_issues.items():
+                issues[message] = issues.get(message, 0) + count
+            counter['count'] += len(frame)
+            yield frame
+
+    sent = copy_frames(cur, table, frames(), dataset.copy_columns)
+    return {'mode': 'clean', 'count': counter['count'], 'bytes': sent, 'issues': issues or None}
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if not args:
+        print(f"📖 วิธีใช้: python3 {sys.argv[0]} <file.csv> [dataset]")
+        sys.exit(1)
+    path = args[0]
+    encoding, delimiter = describe(path)
+    print(f"📄 {path}: encoding {encoding}, delimiter {delimiter!r}")
+
+    if len(args) > 1:
+        from dataset_registry import get_dataset, report_issues
+
+        dataset = get_dataset(args[1])
+        records = 0
+        issues = {}
+        for frame, chunk_issues in dataset.iter_clean(path):
+            records += len(frame)
+            for message, count in chunk_issues.items():
+                issues[message] = issues.get(message, 0) + count
+        print(f"✅ {dataset.name}: {records} records")
+        report_issues(issues)
+
+
+if __name__ == '__main__':
+    main()
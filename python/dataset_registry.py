@@ -0,0 +1,698 @@
+#!/usr/bin/env python3
+"""
+Dataset Registry
+นิยามชุดข้อมูล Excel ทุกชุดไว้ที่เดียว: sheet, แถว header, column ต้นทาง -> ปลายทาง,
+ชนิดข้อมูล, cleaner และ natural key
+
+นิยามใน DATASETS ถูก compile ตอน import module (cleaner แบบ vectorized,
+ลำดับ column สำหรับ COPY/INSERT, validation rules) importer แค่เรียก:
+
+    from dataset_registry import get_dataset
+    dataset = get_dataset('vehicles')
+    frame, issues = dataset.read(excel_path)
+    values = dataset.records(frame)     # list of tuples ตามลำดับ dataset.copy_columns
+
+dataset ใหม่เพิ่มแค่ entry ใน DATASETS ไม่ต้องเขียน loop ต่อแถว
+"""
+
+from datetime import date, datetime
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+
+from csv_reader import CHUNK_ROWS, iter_csv
+from equipment_codes import expand_equipment_codes
+from excel_reader import read_excel, sheet_names
+from header_detect import _header_key, detect_header, resolve_header
+from unit_normalizer import UNIT_COLUMNS, normalize_unit
+
+NULL_TOKENS = ['', '-', 'nan', 'NaN', 'NaT', 'None', 'none']
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d/%m/%y', '%Y-%m-%d %H:%M:%S']
+
+
+# ============================================
+# Vectorized converters (Series -> Series)
+# ============================================
+
+def to_text(s):
+    """ข้อความ trim แล้ว ค่าว่าง/'-'/'nan' เป็น null (เลขจำนวนเต็มที่อ่านมาเป็น float ไม่มี .0)"""
+    if pd.api.types.is_float_dtype(s) and (s.dropna() % 1 == 0).all():
+        s = s.astype('Int64')
+    text = s.astype('string').str.strip()
+    return text.mask(text.isin(NULL_TOKENS))
+
+
+def to_number(s):
+    if pd.api.types.is_bool_dtype(s) or not pd.api.types.is_numeric_dtype(s):
+        s = s.astype('string').str.replace(r'[,\s]', '', regex=True)
+    return pd.to_numeric(s, errors='coerce')
+
+
+def to_int(s):
+    return np.trunc(to_number(s).astype('float64')).astype('Int64')
+
+
+def to_float(s):
+    return to_number(s).astype('float64')
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        value = value.strip().replace('\n', '')
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                continue
+    return None
+
+
+def to_date(s):
+    """แปลงเป็น datetime.date - map ผ่านค่าไม่ซ้ำ (รองรับปี พ.ศ. ที่เกินช่วง datetime64[ns])"""
+    lookup = {value: _parse_date(value) for value in s.dropna().unique()}
+    return s.map(lookup).astype(object)
+
+
+CONVERTERS = {
+    'text': to_text,
+    'int': to_int,
+    'float': to_float,
+    'date': to_date,
+}
+
+
+# ============================================
+# Cleaners ที่ใช้ร่วมกัน
+# ============================================
+
+def single_line(s):
+    """รวมข้อความหลายบรรทัดเป็นบรรทัดเดียว"""
+    return s.str.replace('\n', ' ', regex=False).str.strip()
+
+
+def vacancy_label(s):
+    """ค่า 'ว่าง' ใน Excel -> 'ตำแหน่งว่าง' ตามที่ statistics/search ใช้"""
+    return s.replace({'ว่าง': 'ตำแหน่งว่าง'})
+
+
+# ============================================
+# Derived columns - (frame, raw) -> Series
+# frame = column ที่ clean แล้ว, raw = ค่าดิบจาก Excel (ตั้งชื่อตาม target แล้ว)
+# ============================================
+
+EQUIPMENT_CATEGORIES = {
+    'โต๊ะ': ['โต๊ะ'],
+    'เก้าอี้': ['เก้าอี้'],
+    'ตู้': ['ตู้'],
+    'เครื่องคอมพิวเตอร์': ['เครื่องคอมพิวเตอร์', 'คอมพิวเตอร์', 'Computer', 'PC'],
+    'เครื่องพิมพ์': ['เครื่องพิมพ์', 'Printer'],
+    'เครื่องปรับอากาศ': ['เครื่องปรับอากาศ', 'แอร์'],
+    'เครื่องสำรองไฟ': ['เครื่องสำรองไฟ', 'UPS'],
+    'เครื่องฟอกอากาศ': ['เครื่องฟอกอากาศ'],
+    'โทรทัศน์': ['โทรทัศน์', 'TV', 'ทีวี'],
+    'กล้อง': ['กล้อง', 'Camera'],
+    'โทรศัพท์': ['โทรศัพท์'],
+    'เครื่องถ่ายเอกสาร': ['เครื่องถ่ายเอกสาร'],
+    'เครื่องทำลายเอกสาร': ['เครื่องทำลายเอกสาร'],
+    'พัดลม': ['พัดลม'],
+    'ตู้เย็น': ['ตู้เย็น'],
+    'เครื่องดูดฝุ่น': ['เครื่องดูดฝุ่น'],
+}
+
+
+def get_category(item_name):
+    """หมวดหมู่ครุภัณฑ์จากชื่อรายการ (ไม่ตรง pattern ใช้คำแรก)"""
+    if not item_name or pd.isna(item_name):
+        return 'อื่นๆ'
+    item_name = str(item_name).strip()
+    for category, patterns in EQUIPMENT_CATEGORIES.items():
+        for pattern in patterns:
+            if pattern in item_name:
+                return category
+    words = item_name.split()
+    return words[0] if words else 'อื่นๆ'
+
+
+def equipment_category(frame, raw):
+    items = frame['item_name']
+    lookup = {item: get_category(item) for item in items.dropna().unique()}
+    return items.map(lookup).fillna('อื่นๆ')
+
+
+def housing_under_construction(frame, raw):
+    return (to_text(raw['total_rooms']) == 'อยู่ระหว่างก่อสร้าง').fillna(False).astype(int)
+
+
+def housing_vacant_rooms(frame, raw):
+    vacant = (frame['total_rooms'] - frame['entitled_stay']).clip(lower=0)
+    return vacant.where(frame['total_rooms'] > 0, 0)
+
+
+def housing_status(frame, raw):
+    damaged = frame['damaged_rooms']
+    return pd.Series(np.select(
+        [frame['under_construction'] > 0, (damaged > 0) & (damaged >= frame['total_rooms'])],
+        ['อยู่ระหว่างก่อสร้าง', 'ชำรุด'],
+        'ใช้งานได้'
+    ), index=frame.index)
+
+
+def building_land_doc_number(frame, raw):
+    return frame['land_type'].str.extract(r'เลขที่\s*([^\s]+)', expand=False)
+
+
+def building_ownership_status(frame, raw):
+    building_type = frame['building_type'].fillna('')
+    combined = (building_type + frame['land_type'].fillna('') + frame['remarks'].fillna('')).str.lower()
+    return pd.Series(np.select(
+        [
+            building_type.str.contains('ใช้ที่ทำการของหน่วย|ใช้พื้นที่'),
+            combined.str.contains('รองบประมาณ|ที่ดินพร้อมรองบ'),
+            combined.str.contains('จัดหาที่|ระหว่างจัดหา'),
+        ],
+        ['use_other', 'wait_budget', 'finding_land'],
+        'has_building'
+    ), index=frame.index)
+
+
+def _coordinate_parts(frame):
+    parts = frame['coordinates'].str.split(',', expand=True)
+    if parts.shape[1] != 2:
+        return None
+    return parts.apply(to_float)
+
+
+def building_lat(frame, raw):
+    parts = _coordinate_parts(frame)
+    return parts[0] if parts is not None else pd.Series(np.nan, index=frame.index)
+
+
+def building_lng(frame, raw):
+    parts = _coordinate_parts(frame)
+    return parts[1] if parts is not None else pd.Series(np.nan, index=frame.index)
+
+
+def budget_fiscal_years(frame):
+    return frame['fiscal_year'].str.extract(r'^(\d{4})(?:\s*-\s*(\d{4}))?')
+
+
+def budget_fiscal_year_start(frame, raw):
+    return to_int(budget_fiscal_years(frame)[0])
+
+
+def budget_fiscal_year_end(frame, raw):
+    years = budget_fiscal_years(frame)
+    return to_int(years[1].fillna(years[0]))
+
+
+def budget_status_group(frame, raw):
+    status = frame['status'].fillna('')
+    return pd.Series(np.select(
+        [
+            status == '',
+            status.str.contains('ลงนาม'),
+            status.str.contains('ผู้ชนะ'),
+            status.str.contains('อุทธรณ์'),
+            status.str.contains('เชิญชวน|ประกาศ'),
+            status.str.lower().str.contains('tor') | status.str.contains('ราคากลาง'),
+            status.str.contains('เผยแพร่|ร่าง'),
+        ],
+        ['pending', 'signed', 'winner_announced', 'appeal_period', 'announcement', 'tor_approval', 'draft'],
+        'in_progress'
+    ), index=frame.index)
+
+
+# ============================================
+# Row filters - raw -> boolean mask
+# ============================================
+
+def secondment_full_name(frame, raw):
+    """ยศ ชื่อ สกุล ต่อกันโดยข้ามส่วนที่ว่าง (ไม่มี 'nan')"""
+    parts = frame[['rank', 'first_name', 'last_name']].fillna('')
+    name = (parts['rank'] + ' ' + parts['first_name'] + ' ' + parts['last_name']).str.split().str.join(' ')
+    return name.mask(name == '')
+
+
+def has_sequence(raw):
+    """แถวข้อมูลจริงมีเลขลำดับ (ตัดแถวหัวตาราง/หมายเหตุ/แถวว่าง)"""
+    seq = to_number(raw['sequence'])
+    return (seq.notna() & (seq % 1 == 0) & (seq != 0)).fillna(False)
+
+
+# ============================================
+# Declarations
+# ============================================
+
+def column(*sources, dtype='text', cleaner=None, default=None, fill_from=None, required=False,
+           bounds=None, choices=None, store=True, prefix=False):
+    """
+    sources: ชื่อ column ใน Excel (ตรงตัว) หรือเลขตำแหน่ง - ใช้ตัวแรกที่พบ
+    prefix=True: ยอมรับ header ที่ขึ้นต้นด้วยชื่อ เช่น 'อายุรถ ใส่เฉพาะตัวเลข ...'
+      (ปิดไว้โดยปริยาย - 'ชื่อ' จะไปจับ 'ชื่อ-นามสกุล', 'จำนวน' จับ 'จำนวนเนื้อที่...')
+    fill_from: ค่าว่างใช้ค่าของ column อื่น (ก่อนใส่ default)
+    store=False: ใช้ระหว่าง clean เท่านั้น ไม่ส่งเข้า DB
+    """
+    return {'sources': sources, 'dtype': dtype, 'cleaner': cleaner, 'default': default,
+            'fill_from': fill_from, 'required': required, 'bounds': bounds, 'choices': choices,
+            'store': store, 'prefix': prefix}
+
+
+def derived(func, store=True):
+    return {'derived': func, 'store': store}
+
+
+DATASETS = {
+    'personnel': {
+        'table': 'personnel',
+        'sheet': 0,
+        'header': 0,
+        'natural_key': ('full_name', 'rank'),
+        'columns': {
+            'rank': column('ยศ'),
+            'gender': column('เพศ', choices=('ชาย', 'หญิง')),
+            'full_name': column('ชื่อ-นามสกุล'),
+            'first_name': column('ชื่อ'),
+            'last_name': column('นามสกุล'),
+            'position': column('ชื่อตำแหน่ง'),
+            'department': column('สังกัด'),
+            'vacancy_status': column('ว่าง', cleaner=vacancy_label),
+            'appointed_date': column('วันแต่งตั้งครั้งสุดท้าย', dtype='date'),
+            'level_date': column('ระดับนี้เมื่อ', dtype='date'),
+            'hire_date': column('วันบรรจุ', 'วันบรรจุสัญญาบัตร', dtype='date'),
+            'birth_date': column('วดป.เกิด', dtype='date'),
+            'education': column('คุณวุฒิ'),
+            'hometown': column('ภูมิลำเนา'),
+            'new_department_group': column('กลุ่มสายงาน', 'กลุ่มสายงานใหม่'),
+            'new_work_line': column('สายงาน', 'สายงานใหม่'),
+            'new_duty': column('ทำหน้าที่', 'ทำหน้าที่ใหม่'),
+            'appointment_order': column('คำสั่งแต่งตั้ง'),
+            'retirement_date': column('เกษียณ', dtype='date'),
+            'headquarters': column('บก.'),
+            'position_level': column('ระดับตำแหน่ง'),
+            'duty': column('หน้าที่', 'หน้าที่เดิม'),
+            'sequence_number': column('ลำดับ'),
+            'promotion_education': column('คุณวุฒิเลื่อนระดับ'),
+            'police_course': column('หลักสูตรเป็นตำรวจ'),
+            'created_by': column(dtype='int', default=1),
+            'rank_type': column(),  # สัญญาบัตร / ประทวน - กำหนดจากชื่อ sheet ตอน import
+        },
+    },
+    'equipment': {
+        'table': 'equipment',
+        'sheet': 0,
+        'header': 1,
+        'natural_key': ('equipment_code',),
+        'columns': {
+            'sequence_no': column('ลำดับ', dtype='int'),
+            'bureau': column('บช.'),
+            'division': column('บก.'),
+            'unit': column('กก./พฐ.จว.'),
+            'item_name': column('รายการ'),
+            'equipment_code': column('เลขครุภัณฑ์'),
+            'acquired_year': column('ปี พ.ศ.ที่ได้รับ', dtype='int', bounds=(2500, 2600)),
+            'quantity': column('จำนวน', dtype='int', default=1),
+            'photo_url': column('ภาพถ่าย'),
+            'remarks': column('หมายเหตุ'),
+            'status': column(default='ใช้งานได้'),
+            'category': derived(equipment_category),
+            # ส่วนของเลขครุภัณฑ์ - เติมโดย expand_equipment_codes
+            'code_type': column(),
+            'code_running': column(dtype='int'),
+            'code_method': column(dtype='int'),
+            'code_year': column(dtype='int'),
+        },
+        'expand': expand_equipment_codes,
+    },
+    'vehicles': {
+        'table': 'vehicles',
+        'sheet': 0,
+        'header': 1,
+        'natural_key': ('license_plate',),
+        'columns': {
+            'unit': column('หน่วยงาน'),
+            'department_code': column('บก.'),
+            'bureau_code': column('บช.'),
+            'vehicle_type': column('ประเภทรถ'),
+            'mission': column('ภารกิจ'),
+            'engine_capacity': column('ปริมาตรกระบอกสูบ', dtype='float'),
+            'brand': column('ยี่ห้อ'),
+            'license_plate': column('ทะเบียน'),
+            'acquired_date': column('วันที่รับมา', dtype='date'),
+            'vehicle_age': column('อายุรถ', prefix=True),
+            'status': column('สถานภาพ', default='ใช้งานได้'),
+            'remarks': column('หมายเหตุ'),
+        },
+    },
+    'housing': {
+        'table': 'housing',
+        'sheet': 0,
+        'header': 1,
+        'natural_key': ('division', 'subdivision', 'housing_type', 'housing_name'),
+        'row_filter': has_sequence,
+        'columns': {
+            'sequence': column('ลำดับ', 0, dtype='int', store=False),
+            'bureau': column('บช.', 1, default='สพฐ.ตร.'),
+            'division': column('บก.', 2),
+            'subdivision': column('พฐ.จว.', 3),
+            'housing_type': column('ประเภทที่พัก', 8),
+            'housing_name': column('ชื่อหน่วยงานที่พักอาศัย', 14),
+            'under_construction': derived(housing_under_construction),
+            'total_rooms': column('ที่พักอาศัยทั้งหมด', 6, dtype='int', default=0),
+            'damaged_rooms': column('ชำรุด', 7, dtype='int', default=0),
+            'authorized_quota': column('อัตราอนุญาต', 4, dtype='int', default=0),
+            'current_occupants': column('อัตราคนครอง', 5, dtype='int', default=0),
+            'entitled_stay': column('ได้รับสิทธิเข้าพัก', 11, dtype='int', default=0),
+            'private_housing': column('พักบ้านส่วนตัว', 12, dtype='int', default=0),
+            'rent_allowance': column('เบิกค่าเช่า', 13, dtype='int', default=0),
+            'other_agency': column('จำนวน (นาย)', 15, dtype='int', default=0),
+            'shortage': column('ขาดแคลน', 16, dtype='int', default=0),
+            'budget_year': column('ปี พ.ศ.ที่ได้รับงบ', 9, dtype='int', bounds=(2001, None)),
+            'operation_year': column('ปี พ.ศ.ที่ใช้งาน', 10, dtype='int', bounds=(2001, None)),
+            'remarks': column('หมายเหตุ', 17),
+            'occupied_rooms': derived(lambda frame, raw: frame['entitled_stay']),
+            'vacant_rooms': derived(housing_vacant_rooms),
+            'status': derived(housing_status),
+        },
+    },
+    'building': {
+        'table': 'building',
+        'sheet': 0,
+        'header': 1,
+        'natural_key': ('division', 'subdivision', 'building_name'),
+        'row_filter': has_sequence,
+        'columns': {
+            'sequence': column('ลำดับ', 0, dtype='int', store=False),
+            'bureau': column('บช.', default='สพฐ.ตร.'),
+            'division': column('บก.', fill_from='bureau'),
+            'subdivision': column('พฐ.จว.'),
+            'building_name': column('ชื่อ'),
+            'building_count': column('จำนวน', dtype='int', default=1),
+            'building_size': column('ขนาด'),
+            'building_type': column('ประเภทอาคาร'),
+            'budget_year': column('ปี พ.ศ.ที่ได้รับงบ'),
+            'operation_year': column('ปี พ.ศ.ที่ใช้งาน'),
+            'building_age': column('อายุอาคาร', dtype='int'),
+            'status': column('สถานภาพ'),
+            'land_type': column('ประเภทที่ดินที่ก่อสร้าง'),
+            'land_area': column('จำนวนเนื้อที่ทั้งหมด', prefix=True),
+            'subdistrict': column('สถานที่ก่อสร้าง (ตำบล)'),
+            'district': column('สถานที่ก่อสร้าง (อำเภอ)'),
+            'province': column('สถานที่ก่อสร้าง (จังหวัด)'),
+            'coordinates': column('พิกัด', store=False),
+            'master_plan_url': column(),
+            'remarks': column('หมายเหตุ'),
+            'ownership_status': derived(building_ownership_status),
+            'land_doc_number': derived(building_land_doc_number),
+            'location_lat': derived(building_lat),
+            'location_lng': derived(building_lng),
+        },
+    },
+    'budget': {
+        'table': 'budget',
+        'sheet': 0,
+        'header': 0,
+        'natural_key': ('division', 'project_name', 'fiscal_year'),
+        'row_filter': has_sequence,
+        'columns': {
+            'sequence': column('ลำดับ', 0, dtype='int', store=False),
+            'division': column('หน่วยที่จัดหา'),
+            'category': column('Unnamed: 2'),
+            'project_name': column('รายการ'),
+            'project_type': column('ลักษณะ'),
+            'status': column('สถานะ', cleaner=single_line),
+            'contract_amount': column('วงเงินสัญญา', dtype='float'),
+            'fiscal_year': column('ปีงบประมาณ'),
+            'budget_type': column('ประเภท'),
+            'contract_date': column('วันที่ลงนามสัญญา', dtype='date', prefix=True),
+            'end_date': column('วันที่สิ้นสุดสัญญา', dtype='date', prefix=True),
+            'installments': column('งวดเงิน', dtype='int'),
+            'contractor': column('คู่สัญญา', cleaner=single_line),
+            'progress': column('ความคืบหน้า', dtype='float', prefix=True),
+            'remarks': column('หมายเหตุ'),
+            'status_group': derived(budget_status_group),
+            'fiscal_year_start': derived(budget_fiscal_year_start),
+            'fiscal_year_end': derived(budget_fiscal_year_end),
+        },
+    },
+    'secondment': {
+        'table': 'secondment',
+        'sheet': 0,
+        'header': 1,
+        'natural_key': ('full_name', 'destination_unit'),
+        'row_filter': has_sequence,
+        'columns': {
+            'sequence': column('ลำดับ', 0, dtype='int', store=False),
+            # 'ยศ ชื่อ สกุล' เป็น cell ผสาน 4 column: ยศ | เพศ | ชื่อ | สกุล
+            'rank': column('ยศ ชื่อ สกุล', 1),
+            'gender': column(2, default='ชาย'),
+            'first_name': column(3),
+            'last_name': column(4),
+            'full_name': derived(secondment_full_name),
+            'position': column('ตำแหน่ง', 5),
+            'origin_unit': column('หน่วยที่สังกัด', 6),
+            'destination_unit': column('ไปปฏิบัติราชการ', 7),
+            'period': column('ระยะเวลา', 8, cleaner=single_line),
+            'note': column('หมายเหตุ', 9),
+        },
+    },
+}
+
+
+# ============================================
+# Compiled dataset
+# ============================================
+
+# string[pyarrow] ส่งข้าม process เป็น buffer ก้อนเดียว (ไม่ pickle ทีละ string)
+ARROW_STRINGS = find_spec('pyarrow') is not None
+
+class Dataset:
+    """ชุดข้อมูลที่ compile แล้ว - สร้างครั้งเดียวตอน import module"""
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.table = spec['table']
+        self.sheet = spec.get('sheet', 0)
+        self.header = spec.get('header', 0)
+        self.natural_key = tuple(spec.get('natural_key', ()))
+        self.row_filter = spec.get('row_filter')
+        self.expand = spec.get('expand')
+
+        self.columns = []
+        self.derived = []
+        for target, col in spec['columns'].items():
+            if 'derived' in col:
+                self.derived.append((target, col['derived']))
+                continue
+            sources = tuple(s if isinstance(s, int) else _header_key(s) for s in col['sources'])
+            pipeline = [CONVERTERS[col['dtype']]]
+            if col['cleaner'] is not None:
+                pipeline.append(col['cleaner'])
+            # ชื่อหน่วยทุก dataset -> ชื่อมาตรฐานเดียวกัน (unit_normalizer)
+            if target in UNIT_COLUMNS and col['dtype'] == 'text':
+                pipeline.append(normalize_unit)
+            self.columns.append((target, sources, pipeline, col))
+
+        self.copy_columns = [t for t, c in spec['columns'].items() if c['store']]
+        self.rules = self._compile_rules()
+
+    def _compile_rules(self):
+        """validation rules: (target, ชนิด, เงื่อนไข) ใช้ตรวจหลังแปลงชนิดข้อมูล"""
+        rules = []
+        for target, _, _, col in self.columns:
+            if col['bounds'] is not None:
+                rules.append((target, 'bounds', col['bounds']))
+            if col['choices'] is not None:
+                rules.append((target, 'choices', frozenset(col['choices'])))
+            if col['required']:
+                rules.append((target, 'required', None))
+        if self.natural_key:
+            rules.append((self.natural_key, 'key', None))
+        return rules
+
+    def locate(self, headers):
+        """หา column ใน Excel ของแต่ละ target -> {target: ชื่อ column จริง}"""
+        keys = {_header_key(h): h for h in headers}
+        positions = list(headers)
+        found = {}
+        for target, sources, _, col in self.columns:
+            for source in sources:
+                if isinstance(source, int):
+                    if source < len(positions):
+                        found[target] = positions[source]
+                        break
+                    continue
+                if source in keys:
+                    found[target] = keys[source]
+                    break
+                if not col['prefix']:
+                    continue
+                prefix = next((h for k, h in keys.items() if k.startswith(source)), None)
+                if prefix is not None:
+                    found[target] = prefix
+                    break
+        return found
+
+    def read_raw(self, path, sheet=None, backend=None, header=None, **kwargs):
+        """
+        backend: openpyxl / calamine / arrow (None = --reader, EXCEL_READER หรือ auto)
+        header: แถว header (None = หาจากชื่อ column ด้วย header_detect)
+        """
+        sheet = self.sheet if sheet is None else sheet
+        header = resolve_header(self, path, sheet) if header is None else header
+        return read_excel(path, sheet_name=sheet, header=header, backend=backend, **kwargs)
+
+    def iter_clean(self, path, chunksize=None):
+        """
+        CSV/TSV ทีละ chunk -> (frame, issues) ต่อ chunk โดยไม่อ่านทั้งไฟล์
+        (natural key ซ้ำข้าม chunk ไม่ถูกตรวจ - importer ที่ต้อง dedupe ใช้ read_raw)
+        """
+        header = resolve_header(self, path)
+        for df in iter_csv(path, header=header, chunksize=chunksize or CHUNK_ROWS):
+            yield self.clean(df)
+
+    def find_header(self, path, sheet=None):
+        """-> (แถว header, คะแนน 0-1, {target: เลข column})"""
+        return detect_header(self, path, sheet)
+
+    def is_data_sheet(self, found, min_score=0.5):
+        """sheet ของ dataset นี้: พบ natural key (ที่อ้างด้วยชื่อ) และคะแนนอย่างน้อย min_score"""
+        _, score, columns = found
+        named_key = set(self.natural_key) & {t for t, sources, _, _ in self.columns
+                                             if any(isinstance(s, str) for s in sources)}
+        return score >= min_score and named_key <= columns.keys()
+
+    def data_sheets(self, path):
+        """sheet ทั้งหมดในไฟล์ที่เป็นข้อมูลของ dataset นี้ -> ([(sheet, แถว header)], [sheet ที่ข้าม])"""
+        sheets, skipped = [], []
+        for sheet in sheet_names(path):
+            found = self.find_header(path, sheet)
+            if self.is_data_sheet(found):
+                sheets.append((sheet, found[0]))
+            else:
+                skipped.append(sheet)
+        return sheets, skipped
+
+    def read(self, path, sheet=None):
+        return self.clean(self.read_raw(path, sheet))
+
+    def clean(self, df):
+        """
+        DataFrame ดิบจาก Excel -> (frame ตาม copy_columns, issues)
+        issues: {ข้อความ: จำนวนแถว} จาก validation rules
+        """
+        located = self.locate(df.columns)
+        empty = pd.Series(pd.NA, index=df.index, dtype=object)
+        raw = pd.DataFrame({t: df[located[t]] if t in located else empty for t, _, _, _ in self.columns},
+                           index=df.index)
+
+        # ตัดแถวว่างทั้งแถว และแถวที่ไม่ใช่ข้อมูล
+        mapped = [located[t] for t, _, _, _ in self.columns if t in located]
+        keep = df[mapped].notna().any(axis=1) if mapped else pd.Series(False, index=df.index)
+        if self.row_filter is not None:
+            keep &= self.row_filter(raw)
+        raw = raw[keep]
+
+        frame = pd.DataFrame(index=raw.index)
+        for target, _, pipeline, _ in self.columns:
+            value = raw[target]
+            for step in pipeline:
+                value = step(value)
+            frame[target] = value
+
+        issues = self._apply_rules(frame)
+
+        for target, _, _, col in self.columns:
+            if col['fill_from'] is not None:
+                frame[target] = frame[target].fillna(frame[col['fill_from']])
+        for target, _, _, col in self.columns:
+            if col['default'] is not None:
+                frame[target] = frame[target].fillna(col['default'])
+
+        for target, func in self.derived:
+            frame[target] = func(frame, raw)
+
+        # ขั้นตอนที่เปลี่ยนจำนวนแถว (เช่นแตกช่วงเลขครุภัณฑ์) -> (frame, issues)
+        if self.expand is not None:
+            frame, expand_issues = self.expand(frame)
+            issues.update(expand_issues)
+
+        # natural key ตรวจหลัง default/derived (key อาจเป็น column ที่คำนวณ)
+        for target, kind, _ in self.rules:
+            if kind == 'key':
+                missing = frame[list(target)].isna().all(axis=1)
+                if missing.any():
+                    issues[f"{'/'.join(target)}: natural key missing"] = int(missing.sum())
+
+        for target, kind, _ in self.rules:
+            if kind == 'required':
+                missing = frame[target].isna()
+                if missing.any():
+                    issues[f"{target}: missing (row dropped)"] = int(missing.sum())
+                    frame = frame[~missing]
+
+        return frame[self.copy_columns].reset_index(drop=True), issues
+
+    def _apply_rules(self, frame):
+        issues = {}
+        for target, kind, arg in self.rules:
+            if kind == 'key':
+                continue
+            value = frame[target]
+            if kind == 'bounds':
+                low, high = arg
+                bad = pd.Series(False, index=value.index)
+                if low is not None:
+                    bad |= (value < low).fillna(False)
+                if high is not None:
+                    bad |= (value > high).fillna(False)
+                if bad.any():
+                    issues[f"{target}: out of range {low}-{high} (set to null)"] = int(bad.sum())
+                    frame[target] = value.mask(bad)
+            elif kind == 'choices':
+                bad = value.notna() & ~value.isin(arg)
+                if bad.any():
+                    issues[f"{target}: not in {sorted(arg)} (set to null)"] = int(bad.sum())
+                    frame[target] = value.mask(bad)
+        return issues
+
+    def to_python(self, frame):
+        """NA -> None และ numpy scalar -> Python type (พร้อมส่งให้ psycopg2/asyncpg)"""
+        out = frame.astype(object)
+        return out.where(frame.notna(), None)
+
+    def records(self, frame):
+        return list(self.to_python(frame[self.copy_columns]).itertuples(index=False, name=None))
+
+    def dicts(self, frame):
+        return self.to_python(frame).to_dict('records')
+
+    def source_mapping(self):
+        """{ชื่อ column ใน Excel: column ใน DB} (เฉพาะ column ที่อ้างด้วยชื่อ)"""
+        return {source: target for target, sources, _, col in self.columns if col['store']
+                for source in sources if isinstance(source, str)}
+
+
+def compact(frame):
+    """string column -> Arrow-backed (เล็กกว่าและ pickle เร็วกว่าตอนส่งกลับจาก worker process)"""
+    if not ARROW_STRINGS:
+        return frame
+    strings = [c for c in frame.columns
+               if isinstance(frame[c].dtype, pd.StringDtype) and frame[c].dtype.storage == 'python']
+    return frame.astype({c: 'string[pyarrow]' for c in strings}) if strings else frame
+
+
+def report_issues(issues, label=''):
+    for message, count in issues.items():
+        print(f"⚠️  {label}{message}: {count} rows")
+
+
+REGISTRY = {name: Dataset(name, spec) for name, spec in DATASETS.items()}
+
+
+def get_dataset(name):
+    return REGISTRY[name]
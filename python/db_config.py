@@ -0,0 +1,24 @@
+"""
+Database configuration สำหรับ Python tools ใน python/
+อ่านค่าจาก environment (.env) แบบเดียวกับ backend/db/connection.js
+"""
+
+import os
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': os.getenv('DB_PORT', '5432'),
+    'database': os.getenv('DB_NAME', 'forensic_hr'),
+    'user': os.getenv('DB_USER', 'postgres'),
+    'password': os.getenv('DB_PASSWORD', 'postgres')
+}
+
+# Azure Flexible Server ต้องใช้ SSL
+if os.getenv('DB_SSLMODE'):
+    DB_CONFIG['sslmode'] = os.getenv('DB_SSLMODE')
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Equipment Code Parsing
+เลขครุภัณฑ์รูปแบบ  ประเภท-ชนิด-ลำดับ-วิธีได้มา-ปี พ.ศ.   เช่น 7110-0626-0069-3-2567
+
+- แยกส่วนด้วย str.extract ครั้งเดียวทั้ง column (ช่องว่าง/– ใช้แทน - ได้)
+- เขียนเลขใหม่ในรูปแบบมาตรฐาน (ลำดับ 4 หลัก คั่นด้วย -) เพื่อให้ค้นด้วย = ได้ตรงตัว
+- ช่วงเลข (quantity > 1) แตกเป็นแถวละหนึ่งชิ้น quantity = 1:
+      7110-0713-(0003-18)-2-2557              -> ลำดับ 3 ถึง 18
+      4460-0102-(0023-26,28,34,37)-3-2564     -> 23-26, 28, 34, 37
+      7440-0101-0001-3-2566 ถึง 7440-0101-0010-3-2566
+  จำนวนในช่วงไม่ตรงกับ quantity -> คงเป็นแถวเดียวและรายงานใน issues
+- แถวที่ไม่ตรงรูปแบบทั้งช่อง (เช่น '... พร้อมจอ 7440-...', '... (1)') คงเลขเดิมไว้และรายงานใน issues
+- เลขซ้ำ (หลังแตกช่วง ข้ามทุกหน่วย) รายงานใน issues
+
+dataset_registry เรียก expand_equipment_codes เป็นขั้นตอน 'expand' ของ dataset equipment
+
+Usage:
+    python equipment_codes.py "7110-0713-(0003-18)-2-2557" ...
+"""
+
+import sys
+
+import pandas as pd
+
+CODE_PATTERN = (
+    r'^(?P<type_class>\d{4})-(?P<type_group>\d{2,4})-'
+    r'(?:(?P<running>\d{1,5})|\((?P<ranges>[\d,-]+)\))-'
+    r'(?P<method>\d{1,2})-(?P<year>\d{4})$'
+)
+THROUGH = 'ถึง'
+
+
+def _normalize_separators(codes):
+    text = codes.astype('string').str.strip()
+    text = text.str.replace(r'\s*[-–—]\s*', '-', regex=True)
+    return text.str.replace(r'\s+', '-', regex=True)
+
+
+def parse_codes(codes):
+    """
+    Series ของเลขครุภัณฑ์ -> DataFrame (index เดิม):
+        type_class, type_group, running, ranges, method, year (ข้อความ, ไม่ตรงรูปแบบทั้งช่อง = NA)
+        through: เขียนแบบ 'A ถึง B'
+    'A ถึง B' -> ranges = 'ลำดับของ A-ลำดับของ B' เมื่อส่วนอื่นตรงกัน, ไม่ตรงกัน -> ทุกส่วนเป็น NA
+    """
+    text = _normalize_separators(codes)
+    through = text.str.extract(rf'^(?P<first>.+?)-?{THROUGH}-?(?P<last>.+)$')
+    first = through['first'].fillna(text)
+    parts = first.str.extract(CODE_PATTERN)
+
+    if through['last'].notna().any():
+        last = through['last'].str.extract(CODE_PATTERN)
+        same = ((parts[['type_class', 'type_group', 'method', 'year']] == last[['type_class', 'type_group', 'method', 'year']])
+                .all(axis=1) & parts['running'].notna() & last['running'].notna())
+        parts.loc[same, 'ranges'] = parts.loc[same, 'running'] + '-' + last.loc[same, 'running']
+        parts.loc[same, 'running'] = pd.NA
+        parts.loc[through['last'].notna() & ~same] = pd.NA
+    parts['through'] = through['last'].notna()
+    return parts
+
+
+def expand_ranges(ranges):
+    """'0023-26,28' -> [23, 24, 25, 26, 28] (ปลายช่วงเป็นเลขเต็ม ไม่ใช่หลักท้าย)"""
+    numbers = []
+    for piece in filter(None, ranges.split(',')):
+        start, _, end = piece.partition('-')
+        if not start:
+            return []
+        start = int(start)
+        end = int(end) if end else start
+        if end < start:
+            return []
+        numbers.extend(range(start, end + 1))
+    return numbers
+
+
+def format_code(type_class, type_group, running, method, year):
+    return f"{type_class}-{type_group}-{int(running):04d}-{method}-{year}"
+
+
+def expand_equipment_codes(frame):
+    """
+    frame ที่ clean แล้ว -> (frame ที่แตกช่วงเลข + code_type/code_running/code_method/code_year, issues)
+    """
+    issues = {}
+    parts = parse_codes(frame['equipment_code'])
+    quantity = frame['quantity'].fillna(1)
+
+    running = pd.to_numeric(parts['running'], errors='coerce').astype('Int64')
+    single = running.notna()
+    canonical = (parts['type_class'] + '-' + parts['type_group'] + '-' + running.astype('string').str.zfill(4)
+                 + '-' + parts['method'] + '-' + parts['year'])
+    out = frame.copy()
+    out.loc[single, 'equipment_code'] = canonical[single]
+    out['code_type'] = (parts['type_class'] + '-' + parts['type_group']).astype('string')
+    out['code_running'] = running
+    out['code_method'] = pd.to_numeric(parts['method'], errors='coerce').astype('Int64')
+    out['code_year'] = pd.to_numeric(parts['year'], errors='coerce').astype('Int64')
+
+    unparsed = frame['equipment_code'].notna() & parts['type_class'].isna() & ~parts['through']
+    if unparsed.any():
+        issues['equipment_code: not in ####-####-####-#-#### format'] = int(unparsed.sum())
+
+    # ช่วงเลข - มีไม่กี่แถว แตกทีละแถว
+    expanded = []
+    # 'A ถึง B' ที่ประเภท/วิธี/ปีของ A กับ B ไม่ตรงกัน
+    mismatched = int((parts['through'] & parts['ranges'].isna()).sum())
+    for index in parts.index[parts['ranges'].notna()]:
+        row = parts.loc[index]
+        numbers = expand_ranges(row['ranges'])
+        if not numbers or len(numbers) != quantity[index]:
+            mismatched += 1
+            continue
+        copies = out.loc[[index] * len(numbers)].copy()
+        copies['equipment_code'] = [format_code(row['type_class'], row['type_group'], n, row['method'], row['year'])
+                                    for n in numbers]
+        copies['code_running'] = pd.array(numbers, dtype='Int64')
+        copies['quantity'] = 1
+        expanded.append((index, copies))
+    if mismatched:
+        issues['equipment_code: range does not match quantity (kept as one row)'] = mismatched
+
+    if expanded:
+        issues['equipment_code: ranges expanded'] = len(expanded)
+        keep = out.drop(index=[i for i, _ in expanded])
+        out = pd.concat([keep] + [copies for _, copies in expanded]).sort_index(kind='stable')
+
+    issues.update(duplicate_codes(out))
+    return out.reset_index(drop=True), issues
+
+
+def duplicate_codes(frame):
+    """เลขครุภัณฑ์ที่ซ้ำกัน -> issues (ใช้ซ้ำหลังรวมทุก sheet เพื่อหาเลขซ้ำข้ามหน่วย)"""
+    codes = frame['equipment_code']
+    duplicated = codes.notna() & codes.duplicated(keep=False)
+    if not duplicated.any():
+        return {}
+    return {f"equipment_code: duplicate ({codes[duplicated].nunique()} codes)": int(duplicated.sum())}
+
+
+def main():
+    codes = pd.Series(sys.argv[1:], dtype='string')
+    if codes.empty:
+        print(f"📖 วิธีใช้: python3 {sys.argv[0]} <เลขครุภัณฑ์> ...")
+        sys.exit(1)
+    parts = parse_codes(codes)
+    for code, (_, row) in zip(codes, parts.iterrows()):
+        numbers = expand_ranges(row['ranges']) if pd.notna(row['ranges']) else None
+        print(f"{code}: {row.to_dict()}" + (f" -> {len(numbers)} items" if numbers is not None else ''))
+
+
+if __name__ == '__main__':
+    main()
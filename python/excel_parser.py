@@ -7,8 +7,19 @@ Excel to PostgreSQL Importer
 import sys
 import pandas as pd
 import psycopg2
-from datetime import datetime
+from psycopg2.extras import execute_values
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from dataset_registry import get_dataset, report_issues
+from excel_reader import sheet_names, use_reader_option
+from import_audit import ImportAudit, excel_rows
+from import_plan import record_throughput, run_plan
+from retirement_forecast import refresh_retirement_forecast
+from search_index import refresh_search_index
+from table_snapshot import pre_import_snapshot
 
 # Database configuration
 DB_CONFIG = {
@@ -19,127 +30,122 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD', 'postgres')
 }
 
-# Column mapping - ใช้ทุก columns ที่ database มี
-COLUMN_MAPPING = {
-    'ยศ': 'rank',
-    'เพศ': 'gender',
-    'ชื่อ-นามสกุล': 'full_name',
-    'ชื่อ': 'first_name',
-    'นามสกุล': 'last_name',
-    'ชื่อตำแหน่ง': 'position',
-    'สังกัด': 'department',
-    'ว่าง': 'vacancy_status',  # แก้จาก status -> vacancy_status
-    'วันแต่งตั้งครั้งสุดท้าย': 'appointed_date',
-    'ระดับนี้เมื่อ': 'level_date',
-    'วันบรรจุ': 'hire_date',
-    'วันบรรจุสัญญาบัตร': 'hire_date',
-    'วดป.เกิด': 'birth_date',
-    'คุณวุฒิ': 'education',
-    'ภูมิลำเนา': 'hometown',
-    'กลุ่มสายงาน': 'new_department_group',
-    'กลุ่มสายงานใหม่': 'new_department_group',
-    'สายงาน': 'new_work_line',
-    'สายงานใหม่': 'new_work_line',
-    'ทำหน้าที่': 'new_duty',
-    'ทำหน้าที่ใหม่': 'new_duty',
-    'คำสั่งแต่งตั้ง': 'appointment_order',
-    'เกษียณ': 'retirement_date',
-    'บก.': 'headquarters',
-    'ระดับตำแหน่ง': 'position_level',
-    'หน้าที่': 'duty',
-    'หน้าที่เดิม': 'duty',
-    'ลำดับ': 'sequence_number',
-    'คุณวุฒิเลื่อนระดับ': 'promotion_education',
-    'หลักสูตรเป็นตำรวจ': 'police_course'
-}
+PERSONNEL = get_dataset('personnel')
 
-def clean_data(value):
-    """ทำความสะอาดข้อมูล"""
-    if pd.isna(value) or value == '' or str(value).lower() in ['nan', 'nat', 'none']:
-        return None
-    return str(value).strip()
+# Column mapping - สร้างจาก dataset_registry (ว่าง -> vacancy_status)
+COLUMN_MAPPING = PERSONNEL.source_mapping()
 
-def parse_date(date_str):
-    """แปลงวันที่"""
-    if pd.isna(date_str) or date_str == '' or str(date_str) == 'NaT':
-        return None
+RANK_TYPES = ('สัญญาบัตร', 'ประทวน')
+
+def personnel_sheets(excel_file):
+    """
+    หา sheet ของแต่ละ rank_type -> [(sheet, rank_type)]
+    ใช้ 'สัญญาบัตร (2)' ก่อน 'สัญญาบัตร' เหมือน backend/import_excel.js
+    """
+    names = sheet_names(excel_file)
     
-    try:
-        if isinstance(date_str, datetime):
-            return date_str.strftime('%Y-%m-%d')
-        
-        date_str = str(date_str)
-        formats = ['%Y-%m-%d', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S']
-        for fmt in formats:
-            try:
-                dt = datetime.strptime(date_str, fmt)
-                return dt.strftime('%Y-%m-%d')
-            except:
-                continue
-        
-        return None
-    except:
-        return None
+    sheets = []
+    for rank_type in RANK_TYPES:
+        candidates = [name for name in names if rank_type in name]
+        if candidates:
+            preferred = f'{rank_type} (2)'
+            sheets.append((preferred if preferred in candidates else candidates[0], rank_type))
+    
+    if not sheets:
+        # ไฟล์ sheet เดียว (เช่น test_10rows.xlsx) - เดา rank_type จากชื่อไฟล์
+        rank_type = next((rt for rt in RANK_TYPES if rt in os.path.basename(excel_file)), None)
+        sheets.append((names[0], rank_type))
+    return sheets
+
+def parse_sheet(excel_file, sheet, rank_type):
+    """อ่านและ clean sheet เดียว (ทำงานใน worker process)"""
+    start = time.perf_counter()
+    df = PERSONNEL.read_raw(excel_file, sheet)
+    frame, issues = PERSONNEL.clean(df)
+    frame['rank_type'] = rank_type
+    return sheet, len(df), frame, issues, time.perf_counter() - start
+
+def parse_workbook(excel_file, jobs=None, audit=None):
+    """parse ทุก sheet ที่เกี่ยวข้องพร้อมกัน -> (DataFrame รวม, จำนวนแถวใน Excel)"""
+    sheets = personnel_sheets(excel_file)
+    
+    if len(sheets) == 1 or jobs == 1:
+        results = [parse_sheet(excel_file, sheet, rank_type) for sheet, rank_type in sheets]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs or len(sheets)) as pool:
+            results = list(pool.map(parse_sheet, repeat(excel_file),
+                                    [s for s, _ in sheets], [rt for _, rt in sheets]))
+    
+    frames = []
+    total_rows = 0
+    for (sheet, rank_type), (_, rows, frame, issues, elapsed) in zip(sheets, results):
+        print(f"📄 {sheet}: {rows} rows -> {len(frame)} records ({rank_type or '-'})")
+        report_issues(issues, f"[{sheet}] ")
+        if audit is not None:
+            audit.record('parse', sheet=sheet, rows=excel_rows(PERSONNEL.header, rows), count=len(frame),
+                         duration=elapsed, rank_type=rank_type, issues=issues or None)
+        frames.append(frame)
+        total_rows += rows
+    
+    return pd.concat(frames, ignore_index=True), total_rows
 
-def import_excel_to_db(excel_file):
-    """นำเข้าข้อมูลจาก Excel เข้า PostgreSQL"""
+def import_excel_to_db(excel_file, replace=False, jobs=None, plan=False):
+    """
+    นำเข้าข้อมูลจาก Excel เข้า PostgreSQL
+    replace=True: ลบข้อมูลเดิมแล้วโหลดใหม่ใน transaction เดียว
+    plan=True: แสดงผลที่คาดว่าจะเกิดขึ้นโดยไม่เขียนฐานข้อมูล
+    """
     
+    conn = None
     try:
         print(f"📂 Reading Excel file: {excel_file}")
-        df = pd.read_excel(excel_file)
-        print(f"✅ Loaded {len(df)} rows from Excel")
-        print(f"📋 Columns: {list(df.columns)}")
+        audit = ImportAudit(excel_file, PERSONNEL.table, dataset=PERSONNEL)
+        frame, total_rows = parse_workbook(excel_file, jobs, audit)
+        print(f"✅ Loaded {len(frame)} records from Excel")
+        
+        if plan:
+            run_plan(PERSONNEL, frame, DB_CONFIG, 'replace' if replace else 'append')
+            return True
+        
+        if replace:
+            pre_import_snapshot(PERSONNEL.table, excel_file, DB_CONFIG, audit)
         
         print(f"🔌 Connecting to database...")
         conn = psycopg2.connect(**DB_CONFIG)
         cursor = conn.cursor()
         print(f"✅ Database connected")
         
-        insert_count = 0
-        error_count = 0
-        
-        # เริ่ม transaction
+        # ทุก sheet โหลดใน transaction เดียว
         conn.autocommit = False
         
-        for index, row in df.iterrows():
+        sql = f"INSERT INTO personnel ({', '.join(PERSONNEL.copy_columns)}) VALUES %s"
+        start = time.perf_counter()
+        try:
+            with audit.changes(cursor):
+                if replace:
+                    with audit.step('delete') as event:
+                        cursor.execute("DELETE FROM personnel")
+                        event['count'] = cursor.rowcount
+                    print("🗑️  Old data cleared")
+                with audit.step('load', rows=excel_rows(PERSONNEL.header, total_rows), count=len(frame)):
+                    execute_values(cursor, sql, PERSONNEL.records(frame), page_size=1000)
+            # audit log อยู่ใน transaction เดียวกับข้อมูล
+            audit.flush(cursor)
+            conn.commit()
+            insert_count = len(frame)
+            record_throughput(PERSONNEL.name, insert_count, time.perf_counter() - start)
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"⚠️  Insert failed: {e}")
+            insert_count = 0
+            # บันทึกความล้มเหลวแยก transaction (ข้อมูลถูก rollback แล้ว)
+            audit.record('failed', error=str(e)[:500])
             try:
-                data = {}
-                for excel_col, db_col in COLUMN_MAPPING.items():
-                    if excel_col in df.columns:
-                        value = row[excel_col]
-                        
-                        if db_col in ['appointed_date', 'hire_date', 'birth_date', 'retirement_date']:
-                            data[db_col] = parse_date(value)
-                        elif db_col == 'level_date':
-                            date_val = parse_date(value)
-                            data[db_col] = date_val if date_val else None
-                        else:
-                            data[db_col] = clean_data(value)
-                
-                # เพิ่ม created_by
-                data['created_by'] = 1
-                
-                columns = list(data.keys())
-                values = list(data.values())
-                placeholders = ', '.join(['%s'] * len(values))
-                columns_str = ', '.join(columns)
-                
-                sql = f"INSERT INTO personnel ({columns_str}) VALUES ({placeholders})"
-                cursor.execute(sql, values)
-                
-                insert_count += 1
-                
-                if (insert_count % 100 == 0):
-                    conn.commit()
-                    print(f"⏳ Imported {insert_count} rows...")
-                    
-            except Exception as e:
-                error_count += 1
-                print(f"⚠️  Error at row {index + 1}: {str(e)}")
+                audit.flush(cursor)
+                conn.commit()
+            except psycopg2.Error:
                 conn.rollback()
-                continue
-        
-        conn.commit()
+        error_count = total_rows - insert_count
         
         print(f"""
 ╔══════════════════════════════════════════════════════════════╗
@@ -148,28 +154,46 @@ def import_excel_to_db(excel_file):
 
 ✅ Successfully imported: {insert_count} rows
 ⚠️  Errors: {error_count} rows
-📈 Total rows processed: {len(df)} rows
+📈 Total rows processed: {total_rows} rows
         """)
         
+        # ข้อมูล commit แล้ว - refresh ล้มเหลวแค่เตือน ไม่ทำให้การ import ล้มเหลว
+        if insert_count > 0:
+            try:
+                refresh_search_index(conn, ['personnel'])
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️  Search index not updated: {e}")
+            
+            try:
+                refresh_retirement_forecast(conn)
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️  Retirement forecast not updated: {e}")
+        
         cursor.close()
-        conn.close()
         
-        return True
+        return insert_count > 0
         
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         return False
+    finally:
+        if conn is not None:
+            conn.close()
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python excel_parser.py <excel_file>")
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if len(args) < 1:
+        print("Usage: python excel_parser.py <excel_file> [--replace] [--plan] [--reader=auto|openpyxl|calamine|arrow]")
         sys.exit(1)
     
-    excel_file = sys.argv[1]
+    excel_file = args[0]
+    use_reader_option(sys.argv)
     
     if not os.path.exists(excel_file):
         print(f"❌ File not found: {excel_file}")
         sys.exit(1)
     
-    success = import_excel_to_db(excel_file)
+    success = import_excel_to_db(excel_file, replace='--replace' in sys.argv, plan='--plan' in sys.argv)
     sys.exit(0 if success else 1)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Excel Reader Backends
+อ่าน .xlsx ผ่าน backend ที่เลือกได้ - importer ทุกตัวอ่านผ่าน Dataset.read_raw -> read_excel
+
+- openpyxl: pd.read_excel engine openpyxl (read-only, data_only) - มีเสมอ
+- calamine: python-calamine (Rust) เร็วกว่ามากและไม่ประมวลผล style
+- arrow:    อ่านครั้งแรกด้วย backend ที่เร็วที่สุดแล้ว cache เป็น Arrow (Feather)
+            ครั้งต่อไปอ่านจาก cache (key = path + mtime + size + sheet + header)
+
+ไฟล์ .csv / .tsv / .txt อ่านผ่าน csv_reader (ไม่ใช้ backend ข้างต้น - ไฟล์หนึ่งเป็น sheet เดียว)
+
+เลือก backend: --reader=<name> หรือ EXCEL_READER=<name> (auto = เลือกตามกฎด้านล่าง)
+    auto: ไฟล์ >= CACHE_MIN_BYTES และมี pyarrow -> arrow
+          มี python-calamine -> calamine
+          ไม่เช่นนั้น -> openpyxl
+
+Benchmark:
+    python excel_reader.py --benchmark [file.xlsx ...]
+"""
+
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time as dt_time
+from glob import glob
+from importlib.util import find_spec
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+import csv_reader
+
+BACKENDS = ('openpyxl', 'calamine', 'arrow')
+
+CACHE_DIR = os.getenv(
+    'EXCEL_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.excel_cache')
+)
+CACHE_MIN_BYTES = int(os.getenv('EXCEL_CACHE_MIN_BYTES', 512 * 1024))
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ============================================
+# Backend selection
+# ============================================
+
+def available_backends():
+    installed = {
+        'openpyxl': find_spec('openpyxl') is not None,
+        'calamine': find_spec('python_calamine') is not None,
+        'arrow': find_spec('pyarrow') is not None,
+    }
+    return [name for name in BACKENDS if installed[name]]
+
+
+def _parse_engine():
+    """engine ของ pd.read_excel ที่เร็วที่สุดที่ติดตั้งไว้"""
+    return 'calamine' if 'calamine' in available_backends() else 'openpyxl'
+
+
+def choose_backend(path, backend=None):
+    """backend ที่จะใช้กับไฟล์นี้ (ระบุเอง > EXCEL_READER > auto)"""
+    backend = backend or os.getenv('EXCEL_READER') or 'auto'
+    if backend != 'auto':
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown Excel reader '{backend}' (choose from {', '.join(BACKENDS)}, auto)")
+        if backend in available_backends():
+            return backend
+        print(f"⚠️  Excel reader '{backend}' is not installed - falling back to auto")
+
+    try:
+        size = os.path.getsize(path)
+    except (OSError, TypeError):
+        size = 0
+    if size >= CACHE_MIN_BYTES and 'arrow' in available_backends():
+        return 'arrow'
+    return _parse_engine()
+
+
+def use_reader_option(argv):
+    """
+    อ่าน --reader=<name> จาก command line แล้วตั้ง EXCEL_READER
+    (ผ่าน environment เพื่อให้ worker process เห็นค่าเดียวกัน)
+    """
+    for arg in argv:
+        if arg.startswith('--reader='):
+            backend = arg.split('=', 1)[1]
+            if backend != 'auto' and backend not in BACKENDS:
+                raise SystemExit(f"❌ Unknown --reader '{backend}' (choose from {', '.join(BACKENDS)}, auto)")
+            os.environ['EXCEL_READER'] = backend
+            return backend
+    return os.getenv('EXCEL_READER', 'auto')
+
+
+# ============================================
+# Arrow cache
+# ============================================
+
+def _cache_path(path, sheet_name, header, kwargs):
+    stat = os.stat(path)
+    key = repr((os.path.abspath(path), stat.st_mtime_ns, stat.st_size, sheet_name, header, sorted(kwargs.items())))
+    return os.path.join(CACHE_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.feather')
+
+
+# column ที่มีค่าหลายชนิดปนกัน (ตัวเลข/ข้อความ/วันที่ ในคอลัมน์เดียว - เกือบทุก sheet จริง)
+# เก็บเป็น struct: kind + ช่องของแต่ละชนิด แล้วประกอบกลับเป็น object column เดิม
+MIXED_KINDS = (
+    ('str', str), ('bool', bool), ('int', int), ('float', float),
+    ('datetime', datetime), ('date', date), ('time', dt_time),
+)
+
+
+def _mixed_types():
+    import pyarrow as pa
+    return {
+        'str': pa.string(), 'bool': pa.bool_(), 'int': pa.int64(), 'float': pa.float64(),
+        'datetime': pa.timestamp('us'), 'date': pa.date32(), 'time': pa.time64('us'),
+    }
+
+
+def _encode_mixed(values):
+    import pyarrow as pa
+
+    n = len(values)
+    kinds = np.full(n, -1, dtype=np.int8)
+    slots = {name: [None] * n for name, _ in MIXED_KINDS}
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        for kind, (name, kind_type) in enumerate(MIXED_KINDS):
+            if isinstance(value, kind_type):
+                kinds[i] = kind
+                slots[name][i] = value
+                break
+        else:
+            raise TypeError(f"cannot cache value of type {type(value).__name__}")
+
+    types = _mixed_types()
+    arrays = [pa.array(kinds)] + [pa.array(slots[name], type=types[name]) for name, _ in MIXED_KINDS]
+    return pa.StructArray.from_arrays(arrays, names=['kind'] + [name for name, _ in MIXED_KINDS])
+
+
+def _decode_mixed(column):
+    struct = column.combine_chunks()
+    kinds = struct.field('kind').to_numpy(zero_copy_only=False)
+    out = np.full(len(kinds), None, dtype=object)
+    for kind, (name, _) in enumerate(MIXED_KINDS):
+        mask = kinds == kind
+        if mask.any():
+            out[mask] = np.array(struct.field(name).to_pylist(), dtype=object)[mask]
+    return out
+
+
+def _write_cache(cache_file, df):
+    """เขียน Feather - คืน False ถ้าเก็บไม่ได้ (ชื่อ column ไม่ใช่ข้อความ/ชนิดค่าที่ไม่รองรับ)"""
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    if df.columns.empty or df.columns.has_duplicates or not all(isinstance(n, str) for n in df.columns):
+        return False
+    try:
+        arrays = {}
+        for name in df.columns:
+            values = df[name]
+            try:
+                arrays[name] = pa.Array.from_pandas(values)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                arrays[name] = _encode_mixed(values)
+        table = pa.table(arrays)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, TypeError):
+        return False
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_file = f"{cache_file}.tmp"
+    feather.write_feather(table, tmp_file, compression='lz4')
+    os.replace(tmp_file, cache_file)
+    return True
+
+
+def _read_cache(cache_file):
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    table = feather.read_table(cache_file)
+    data = {}
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_struct(column.type):
+            data[name] = pd.Series(_decode_mixed(column), dtype=object)
+        else:
+            data[name] = column.to_pandas()
+    return pd.DataFrame(data, columns=table.column_names)
+
+
+def _read_arrow(path, sheet_name, header, kwargs):
+    sheets = sheet_names(path) if sheet_name is None else None
+    if sheets is not None:
+        return {name: _read_arrow(path, name, header, kwargs) for name in sheets}
+
+    cache_file = _cache_path(path, sheet_name, header, kwargs)
+    if os.path.exists(cache_file):
+        return _read_cache(cache_file)
+
+    df = pd.read_excel(path, sheet_name=sheet_name, header=header, engine=_parse_engine(), **kwargs)
+    _write_cache(cache_file, df)
+    return df
+
+
+# ============================================
+# Public API
+# ============================================
+
+def read_excel(path, sheet_name=0, header=0, backend=None, **kwargs):
+    """pd.read_excel ผ่าน backend ที่เลือก (sheet_name=None -> dict ทุก sheet)"""
+    if csv_reader.is_delimited(path):
+        df = csv_reader.read_csv(path, header=header, **kwargs)
+        return {csv_reader.sheet_names(path)[0]: df} if sheet_name is None else df
+    backend = choose_backend(path, backend)
+    if backend == 'arrow':
+        return _read_arrow(path, sheet_name, header, kwargs)
+    return pd.read_excel(path, sheet_name=sheet_name, header=header, engine=backend, **kwargs)
+
+
+def sheet_names(path, backend=None):
+    if csv_reader.is_delimited(path):
+        return csv_reader.sheet_names(path)
+    backend = choose_backend(path, backend)
+    engine = _parse_engine() if backend == 'arrow' else backend
+    with pd.ExcelFile(path, engine=engine) as xls:
+        return xls.sheet_names
+
+
+def clear_cache():
+    removed = 0
+    for cache_file in glob(os.path.join(CACHE_DIR, '*.feather')):
+        os.remove(cache_file)
+        removed += 1
+    return removed
+
+
+# ============================================
+# Benchmark
+# ============================================
+
+def committed_workbooks():
+    files = [os.path.join(REPO_ROOT, 'T1.xlsx'), os.path.join(REPO_ROOT, '25681001-3.xlsx')]
+    files += sorted(glob(os.path.join(REPO_ROOT, 'backend', 'excel', '*.xlsx')))
+    return [f for f in files if os.path.exists(f)]
+
+
+def _peak_rss():
+    """peak RSS ของ process นี้ (bytes) - None บน Windows (ไม่มี resource)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _measure_child(path, backend):
+    """
+    รันใน process ใหม่: เวลาอ่าน และ peak RSS ของทั้ง process (รวมหน่วยความจำ native ของ calamine/Arrow)
+    path=None: ไม่อ่านไฟล์ -> peak RSS พื้นฐานของ python + pandas ไว้เทียบ
+    """
+    start = time.perf_counter()
+    if path is not None:
+        read_excel(path, sheet_name=None, backend=backend)
+    return time.perf_counter() - start, _peak_rss()
+
+
+def _measure(path=None, backend=None):
+    # process แยกต่อการวัด - peak RSS ไม่ลดลงหลังวัด backend ก่อนหน้า
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+        return pool.submit(_measure_child, path, backend).result()
+
+
+def run_benchmark(files):
+    """อ่านทุก sheet ของแต่ละไฟล์ด้วยทุก backend ที่ติดตั้ง -> เวลาและ peak RSS (process แยกต่อการวัด)"""
+    backends = available_backends()
+    print(f"📋 Backends installed: {', '.join(backends)}")
+    _, baseline = _measure()
+    if baseline is not None:
+        print(f"📏 Peak RSS per read (process without reading: {baseline / 1e6:.1f}MB)")
+    print(f"\n{'file':32s} {'size':>8s}  " + '  '.join(f"{b:>18s}" for b in backends))
+
+    totals = {b: 0.0 for b in backends}
+    for path in files:
+        cells = []
+        for backend in backends:
+            if backend == 'arrow':
+                # อ่านครั้งแรกเพื่อสร้าง cache - วัดเฉพาะการอ่านจาก cache
+                read_excel(path, sheet_name=None, backend='arrow')
+            elapsed, peak = _measure(path, backend)
+            totals[backend] += elapsed
+            memory = f"{peak / 1e6:7.1f}MB" if peak is not None else f"{'-':>9s}"
+            cells.append(f"{elapsed:6.2f}s {memory}")
+        name = os.path.basename(path)
+        print(f"{name[:32]:32s} {os.path.getsize(path) / 1024:7.0f}K  " + '  '.join(f"{c:>18s}" for c in cells))
+
+    print(f"\n{'total':32s} {'':8s}  " + '  '.join(f"{totals[b]:17.2f}s" for b in backends))
+    auto = {os.path.basename(f): choose_backend(f, 'auto') for f in files}
+    print(f"\n🤖 auto: " + ', '.join(f"{name} -> {backend}" for name, backend in auto.items()))
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if '--clear-cache' in sys.argv:
+        print(f"🗑️  Removed {clear_cache()} cached frames")
+    if '--benchmark' in sys.argv:
+        run_benchmark(args or committed_workbooks())
+    elif '--clear-cache' not in sys.argv:
+        print(f"📖 วิธีใช้: python3 {sys.argv[0]} --benchmark [file.xlsx ...] | --clear-cache")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Header Row Detection
+หาแถว header ของ sheet จากชื่อ column ภาษาไทยที่ dataset รู้จัก
+
+อ่านแบบ streaming เฉพาะ SCAN_ROWS แถวแรก (calamine หรือ openpyxl read-only)
+ไม่ต้อง parse ทั้ง sheet - Dataset.read_raw เรียกก่อน parse จริงทุกครั้ง
+ไฟล์ที่มีแถวชื่อเรื่องเพิ่มมาจึง import ได้โดยไม่ต้องแก้ header offset
+
+คะแนนของแถว = (ชื่อตรงตัว 1.0 / ขึ้นต้นด้วย 0.5) ต่อ column ที่อ้างด้วยชื่อ หารด้วยจำนวน column เหล่านั้น
+แต่ละ cell จับคู่ได้ column เดียว (ลำดับตาม DATASETS เหมือน Dataset.locate)
+
+Usage:
+    python header_detect.py <excel_file> [dataset]
+"""
+
+import os
+import re
+import sys
+from functools import lru_cache
+from importlib.util import find_spec
+
+import csv_reader
+
+SCAN_ROWS = 20
+MIN_SCORE = 0.3
+PREFIX_WEIGHT = 0.5
+
+
+def _header_key(name):
+    return re.sub(r'\s+', ' ', str(name)).strip()
+
+
+# ============================================
+# Streaming scan
+# ============================================
+
+def _calamine_rows(path, sheet, limit):
+    from python_calamine import CalamineWorkbook
+
+    workbook = CalamineWorkbook.from_path(path)
+    try:
+        ws = workbook.get_sheet_by_index(sheet) if isinstance(sheet, int) else workbook.get_sheet_by_name(sheet)
+        # skip_empty_area=False: เลขแถวตรงกับ header= ของ pd.read_excel
+        return [tuple(row) for row in ws.to_python(skip_empty_area=False, nrows=limit)]
+    finally:
+        workbook.close()
+
+
+def _openpyxl_rows(path, sheet, limit):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = workbook.worksheets[sheet] if isinstance(sheet, int) else workbook[sheet]
+        return list(ws.iter_rows(max_row=limit, values_only=True))
+    finally:
+        workbook.close()
+
+
+def scan_rows(path, sheet=0, limit=SCAN_ROWS):
+    """limit แถวแรกของ sheet -> list of tuples (ไม่ parse ส่วนที่เหลือ)"""
+    if csv_reader.is_delimited(path):
+        return csv_reader.scan_rows(path, limit)
+    if find_spec('python_calamine') is not None:
+        return _calamine_rows(path, sheet, limit)
+    return _openpyxl_rows(path, sheet, limit)
+
+
+# ============================================
+# Scoring
+# ============================================
+
+def named_sources(dataset):
+    """[(target, (ชื่อ column, ...), prefix)] เฉพาะ column ที่อ้าง Excel ด้วยชื่อ"""
+    return [(target, tuple(s for s in sources if isinstance(s, str)), col['prefix'])
+            for target, sources, _, col in dataset.columns
+            if any(isinstance(s, str) for s in sources)]
+
+
+def score_row(dataset, values):
+    """
+    คะแนนของแถวหนึ่ง -> (คะแนน 0-1, {target: เลข column})
+    """
+    cells = {i: _header_key(v) for i, v in enumerate(values) if isinstance(v, str) and v.strip()}
+    targets = named_sources(dataset)
+    if not cells or not targets:
+        return 0.0, {}
+
+    claimed = set()
+    columns = {}
+    total = 0.0
+    for target, sources, prefix in targets:
+        match = None
+        for source in sources:
+            match = next((i for i, cell in cells.items() if i not in claimed and cell == source), None)
+            if match is not None:
+                total += 1.0
+                break
+            if not prefix:
+                continue
+            match = next((i for i, cell in cells.items() if i not in claimed and cell.startswith(source)), None)
+            if match is not None:
+                total += PREFIX_WEIGHT
+                break
+        if match is not None:
+            claimed.add(match)
+            columns[target] = match
+    return total / len(targets), columns
+
+
+def best_header(dataset, rows):
+    """แถวที่คะแนนสูงสุดจาก rows ที่ scan มา -> (แถว, คะแนน, column map) หรือ None"""
+    best = None
+    for row, values in enumerate(rows):
+        score, columns = score_row(dataset, values)
+        if score > 0 and (best is None or score > best[1]):
+            best = (row, score, columns)
+    return best
+
+
+@lru_cache(maxsize=256)
+def _detect(dataset, path, mtime, sheet, limit):
+    return best_header(dataset, scan_rows(path, sheet, limit))
+
+
+def detect_header(dataset, path, sheet=None, limit=SCAN_ROWS):
+    """
+    หาแถว header ของ dataset ใน sheet -> (แถว, คะแนน, {target: เลข column})
+    ไม่พบแถวที่จับคู่ได้เลย -> (dataset.header, 0.0, {})
+    """
+    sheet = dataset.sheet if sheet is None else sheet
+    try:
+        found = _detect(dataset, os.path.abspath(path), os.path.getmtime(path), sheet, limit)
+    except (OSError, TypeError, ValueError):
+        # file-like object หรือไฟล์ที่ไม่ใช่ .xlsx/.csv - ใช้ค่าใน DATASETS
+        found = None
+    return found or (dataset.header, 0.0, {})
+
+
+def resolve_header(dataset, path, sheet=None, min_score=MIN_SCORE):
+    """แถว header ที่ใช้ parse จริง - คะแนนต่ำกว่า min_score ใช้ค่าใน DATASETS"""
+    row, score, _ = detect_header(dataset, path, sheet)
+    if score < min_score:
+        return dataset.header
+    if row != dataset.header:
+        label = f" [{sheet}]" if isinstance(sheet, str) else ''
+        print(f"🔎 {dataset.name}{label}: header found on row {row + 1} (expected row {dataset.header + 1})")
+    return row
+
+
+def column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord('A') + rem) + letters
+    return letters
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if not args:
+        print(f"📖 วิธีใช้: python3 {sys.argv[0]} <excel_file> [dataset]")
+        sys.exit(1)
+
+    from dataset_registry import REGISTRY
+    from excel_reader import sheet_names
+
+    path = args[0]
+    datasets = [REGISTRY[args[1]]] if len(args) > 1 else list(REGISTRY.values())
+    for sheet in sheet_names(path):
+        rows = scan_rows(path, sheet)
+        results = sorted(((best_header(d, rows), d) for d in datasets), key=lambda r: -(r[0] or (0, 0))[1])
+        found, dataset = results[0]
+        if found is None or found[1] < MIN_SCORE:
+            print(f"📄 {sheet}: no known header")
+            continue
+        row, score, columns = found
+        print(f"📄 {sheet}: {dataset.name} header on row {row + 1} (score {score:.2f})")
+        for target, index in columns.items():
+            print(f"   {column_letter(index):>3s} -> {target}")
+
+
+if __name__ == '__main__':
+    main()
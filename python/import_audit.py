@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Import Audit Trail
+บันทึกการ import ลง activity_logs (action = 'import')
+
+เหตุการณ์ (ไฟล์, sheet, ช่วงแถว, จำนวน, เวลา, ผู้ใช้) ถูกเก็บใน memory
+แล้วเขียนทีละ batch ด้วย execute_values - เรียก flush(cur) ก่อน commit
+เพื่อให้ log อยู่ใน transaction เดียวกับข้อมูล (rollback ก็หายไปด้วยกัน)
+
+    audit = ImportAudit(excel_file, 'equipment')
+    with audit.step('parse', sheet=sheet) as event:
+        ...
+        event['count'] = len(frame)
+    audit.flush(cur)
+    conn.commit()
+
+dataset= เปิดการบันทึก change log (change_log.py): ครอบการลบ/โหลดด้วย audit.changes(cur)
+แล้ว flush(cur) เขียน import_changes ใน transaction เดียวกัน
+"""
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from psycopg2.extras import execute_values
+
+from change_log import ENABLED as CHANGE_LOG_ENABLED, ChangeLog
+
+FLUSH_SIZE = 500
+
+INSERT_LOGS = """
+    INSERT INTO activity_logs (user_id, action, target_type, details, user_agent, created_at)
+    VALUES %s
+"""
+INSERT_TEMPLATE = "(%s, 'import', %s, %s::jsonb, %s, %s)"
+
+
+def default_user_id():
+    """ผู้ใช้ที่สั่ง import (IMPORT_USER_ID) - ไม่ระบุเป็น NULL"""
+    value = os.getenv('IMPORT_USER_ID')
+    return int(value) if value and value.isdigit() else None
+
+
+class ImportAudit:
+    """buffer เหตุการณ์ของการ import หนึ่งครั้ง"""
+
+    def __init__(self, source_file, target_type, user_id=None, flush_size=FLUSH_SIZE, dataset=None):
+        self.source_path = str(source_file)
+        self.source_file = os.path.basename(self.source_path)
+        self.target_type = target_type
+        self.user_id = default_user_id() if user_id is None else user_id
+        self.user_agent = f"python/{os.path.basename(sys.argv[0]) or 'import'}"
+        self.flush_size = flush_size
+        self.run_id = f"{datetime.now():%Y%m%d%H%M%S}-{os.getpid()}"
+        self.events = []
+        self.cursor = None
+        self.written = 0
+        self.change_log = (ChangeLog(dataset, self.source_file, self.run_id)
+                           if dataset is not None and CHANGE_LOG_ENABLED else None)
+
+    def bind(self, cursor):
+        """ผูก cursor ของ transaction ที่โหลดข้อมูล - buffer เต็มจะ flush อัตโนมัติ"""
+        self.cursor = cursor
+        return self
+
+    def record(self, event, sheet=None, rows=None, count=None, duration=None, target_type=None, **details):
+        """
+        rows: (แถวแรก, แถวสุดท้าย) ตามเลขแถวใน Excel
+        duration: วินาที
+        """
+        payload = {'run': self.run_id, 'event': event, 'file': self.source_file}
+        if sheet is not None:
+            payload['sheet'] = sheet
+        if rows is not None:
+            payload['rows'] = [int(rows[0]), int(rows[1])]
+        if count is not None:
+            payload['count'] = int(count)
+        if duration is not None:
+            payload['duration_ms'] = round(duration * 1000, 1)
+        payload.update({k: v for k, v in details.items() if v is not None})
+
+        self.events.append((target_type or self.target_type, payload, datetime.now()))
+        if self.cursor is not None and len(self.events) >= self.flush_size:
+            self.flush(self.cursor)
+
+    @contextmanager
+    def step(self, event, **fields):
+        """จับเวลาช่วงงาน - ใส่ count/rows/รายละเอียดเพิ่มใน dict ที่ได้"""
+        start = time.perf_counter()
+        info = dict(fields)
+        try:
+            yield info
+        except Exception as e:
+            info['error'] = str(e)[:500]
+            raise
+        finally:
+            self.record(event, duration=time.perf_counter() - start, **info)
+
+    @contextmanager
+    def _capture(self, cur, table):
+        start = time.perf_counter()
+        old = self.change_log.before(cur)
+        yield
+        if old is not None:
+            summary = self.change_log.after(cur, old, table)
+            self.record('changes', duration=time.perf_counter() - start, **summary)
+
+    def changes(self, cur, table=None):
+        """
+        ครอบการลบ/โหลด: snapshot ก่อนและหลังแล้ว diff ตาม natural key (change_log.py)
+        table: ตารางที่โหลดเข้า ถ้าไม่ใช่ตารางจริง (เช่น <table>_staging ของ swap_publish)
+        """
+        if self.change_log is None:
+            return nullcontext()
+        return self._capture(cur, table)
+
+    def flush(self, cur):
+        """เขียนเหตุการณ์ (และ change log) ที่ค้างอยู่ในคำสั่งเดียว (ยังไม่ commit)"""
+        if self.change_log is not None:
+            self.change_log.flush(cur)
+        if not self.events:
+            return 0
+        values = [
+            (self.user_id, target_type, json.dumps(payload, ensure_ascii=False, default=str),
+             self.user_agent, created_at)
+            for target_type, payload, created_at in self.events
+        ]
+        execute_values(cur, INSERT_LOGS, values, template=INSERT_TEMPLATE, page_size=FLUSH_SIZE)
+        self.written += len(values)
+        self.events = []
+        return len(values)
+
+
+def excel_rows(header_row, count):
+    """ช่วงแถวใน Excel (1-based) ของข้อมูล count แถวที่อยู่ใต้ header"""
+    first = header_row + 2
+    return (first, first + max(count, 1) - 1)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Import Planner (dry-run)
+ประเมินผลของการ import ก่อนเขียนจริง - importer ทุกตัวเรียกผ่าน --plan
+
+- ดึง natural key ของข้อมูลปัจจุบันด้วย SELECT เดียว แล้ว diff กับข้อมูลที่ parse แล้ว
+  (insert / update / delete ตาม key)
+- ประเมินขนาดข้อมูลที่ส่ง, จำนวน index entry ที่ต้องเขียน
+- คาดการณ์เวลาจาก throughput ของการ import ครั้งก่อน ๆ (บันทึกโดย record_throughput)
+
+ไม่มีการเขียนใดๆ ลงฐานข้อมูล (transaction เป็น READ ONLY และ rollback เสมอ)
+"""
+
+import json
+import os
+import statistics
+import time
+from collections import Counter
+
+import psycopg2
+from psycopg2 import sql
+
+HISTORY_FILE = os.getenv(
+    'IMPORT_HISTORY_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.import_throughput.json')
+)
+HISTORY_LIMIT = 20
+
+# rows/sec เมื่อยังไม่เคยบันทึก (INSERT ... VALUES แบบ batch ผ่าน Azure)
+DEFAULT_THROUGHPUT = 2000
+
+FIXED_WIDTH = {'int': 4, 'float': 8, 'date': 4}
+
+
+# ============================================
+# Throughput history
+# ============================================
+
+def load_history():
+    try:
+        with open(HISTORY_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def record_throughput(dataset, rows, seconds):
+    """บันทึกความเร็วของการ import จริง (เรียกหลัง commit)"""
+    if rows <= 0 or seconds <= 0:
+        return
+    history = load_history()
+    runs = history.setdefault(dataset, [])
+    runs.append({'rows': rows, 'seconds': round(seconds, 3), 'at': time.strftime('%Y-%m-%dT%H:%M:%S')})
+    history[dataset] = runs[-HISTORY_LIMIT:]
+    tmp_path = f"{HISTORY_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, HISTORY_FILE)
+
+
+def throughput(dataset):
+    """rows/sec (median ของ 5 ครั้งล่าสุด) และจำนวนครั้งที่ใช้คำนวณ"""
+    runs = load_history().get(dataset, [])[-5:]
+    if not runs:
+        return DEFAULT_THROUGHPUT, 0
+    return statistics.median(r['rows'] / r['seconds'] for r in runs), len(runs)
+
+
+# ============================================
+# Diff
+# ============================================
+
+def _key(values):
+    return tuple(None if v is None else str(v).strip() for v in values)
+
+
+def fetch_keys(conn, table, key_columns):
+    """natural key ทั้งตารางด้วย SELECT เดียว -> Counter ของ tuple"""
+    cur = conn.cursor(name=f'plan_keys_{table}')
+    cur.itersize = 10000
+    cur.execute(sql.SQL("SELECT {} FROM {}").format(
+        sql.SQL(', ').join(map(sql.Identifier, key_columns)), sql.Identifier(table)))
+    keys = Counter(_key(row) for row in cur)
+    cur.close()
+    return keys
+
+
+def frame_keys(dataset, frame):
+    rows = dataset.to_python(frame[list(dataset.natural_key)]).itertuples(index=False, name=None)
+    return Counter(_key(row) for row in rows)
+
+
+def diff_keys(current, incoming):
+    """นับ insert / update / delete ตาม key (key ซ้ำนับตามจำนวน)"""
+    inserts = updates = deletes = 0
+    for key in current.keys() | incoming.keys():
+        old, new = current.get(key, 0), incoming.get(key, 0)
+        updates += min(old, new)
+        inserts += max(0, new - old)
+        deletes += max(0, old - new)
+    return inserts, updates, deletes
+
+
+# ============================================
+# Size / index estimates
+# ============================================
+
+def estimate_bytes(dataset, frame):
+    """ขนาดข้อมูลที่ส่ง (ข้อความนับ byte แบบ UTF-8 - อักษรไทย 3 byte)"""
+    dtypes = {target: col['dtype'] for target, _, _, col in dataset.columns}
+    total = 0
+    for column in dataset.copy_columns:
+        values = frame[column].dropna()
+        width = FIXED_WIDTH.get(dtypes.get(column))
+        if width:
+            total += width * len(values)
+        else:
+            total += int(values.astype(str).str.encode('utf-8').str.len().sum())
+    return total
+
+
+def table_info(conn, table):
+    """จำนวนแถวปัจจุบัน, ขนาดตาราง และ indexes [(ชื่อ, ขนาด)]"""
+    cur = conn.cursor()
+    cur.execute(sql.SQL("SELECT COUNT(*), pg_total_relation_size(%s::regclass) FROM {}").format(
+        sql.Identifier(table)), (table,))
+    row_count, total_size = cur.fetchone()
+    cur.execute("""
+        SELECT i.indexrelid::regclass::text, pg_relation_size(i.indexrelid)
+        FROM pg_index i
+        WHERE i.indrelid = %s::regclass
+        ORDER BY 1
+    """, (table,))
+    indexes = cur.fetchall()
+    cur.close()
+    return row_count, total_size, indexes
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:,.0f} {unit}" if unit == 'B' else f"{size:,.1f} {unit}"
+        size /= 1024
+
+
+# ============================================
+# Plan
+# ============================================
+
+def build_plan(conn, dataset, frame, mode='replace'):
+    """
+    mode: 'replace' = ลบทั้งตารางแล้วโหลดใหม่ (DELETE/TRUNCATE), 'append' = INSERT เพิ่ม,
+          'merge' = insert/update/delete เฉพาะแถวที่ต่างกันตาม natural key
+    """
+    row_count, table_size, indexes = table_info(conn, dataset.table)
+    current = fetch_keys(conn, dataset.table, dataset.natural_key)
+    incoming = frame_keys(dataset, frame)
+    inserts, updates, deletes = diff_keys(current, incoming)
+
+    if mode == 'merge':
+        # update นับเป็นการเขียนเต็มแถว (ไม่รู้ว่าแถวใดเปลี่ยนจริงจนกว่าจะเทียบค่า)
+        rows_written, rows_deleted = inserts + updates, deletes
+    else:
+        rows_written = len(frame)
+        rows_deleted = row_count if mode == 'replace' else 0
+    rate, samples = throughput(dataset.name)
+
+    index_size = sum(size for _, size in indexes)
+    bytes_per_entry = index_size / (row_count * len(indexes)) if row_count and indexes else 0
+
+    return {
+        'dataset': dataset.name,
+        'table': dataset.table,
+        'mode': mode,
+        'natural_key': dataset.natural_key,
+        'current_rows': row_count,
+        'table_size': table_size,
+        'incoming_rows': len(frame),
+        'inserts': inserts,
+        'updates': updates,
+        'deletes': deletes,
+        'duplicates_after_append': updates if mode == 'append' else 0,
+        'rows_written': rows_written,
+        'rows_deleted': rows_deleted,
+        'bytes': estimate_bytes(dataset, frame),
+        'indexes': indexes,
+        'index_entries': rows_written * len(indexes),
+        'index_growth': rows_written * len(indexes) * bytes_per_entry,
+        'throughput': rate,
+        'throughput_samples': samples,
+        'projected_seconds': (rows_written + rows_deleted) / rate if rate else None,
+    }
+
+
+def print_plan(plan):
+    samples = plan['throughput_samples']
+    basis = f"median of last {samples} imports" if samples else 'default - no recorded imports yet'
+    print(f"""
+╔══════════════════════════════════════════════════════════════╗
+║  🧮 Import Plan (dry-run - nothing written)                  ║
+╚══════════════════════════════════════════════════════════════╝
+
+📋 {plan['dataset']} -> {plan['table']} ({plan['mode']})
+   Current rows:     {plan['current_rows']:,} ({format_bytes(plan['table_size'])})
+   Incoming rows:    {plan['incoming_rows']:,}
+
+🔑 Diff by {' + '.join(plan['natural_key'])}:
+   ➕ Inserts:       {plan['inserts']:,}
+   ✏️  Updates:       {plan['updates']:,}
+   ➖ Deletes:       {plan['deletes']:,}
+
+💾 Writes:
+   Rows deleted:     {plan['rows_deleted']:,}
+   Rows written:     {plan['rows_written']:,}
+   Data to transfer: {format_bytes(plan['bytes'])}
+   Index entries:    {plan['index_entries']:,} across {len(plan['indexes'])} indexes (~{format_bytes(plan['index_growth'])})
+
+⏱️  Projected duration: {plan['projected_seconds']:.1f}s at {plan['throughput']:,.0f} rows/s ({basis})""")
+
+    if plan['duplicates_after_append']:
+        print(f"\n⚠️  Append would duplicate {plan['duplicates_after_append']:,} rows that already exist")
+    for name, size in plan['indexes']:
+        print(f"   • {name} ({format_bytes(size)})")
+
+
+def run_plan(dataset, frame, config, mode='replace'):
+    """เปิด connection แบบ read-only สร้างและแสดง plan"""
+    conn = psycopg2.connect(**config)
+    try:
+        conn.set_session(readonly=True)
+        plan = build_plan(conn, dataset, frame, mode)
+        print_plan(plan)
+        return plan
+    finally:
+        conn.rollback()
+        conn.close()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Index Advisor
+เสนอ/สร้าง index ตามเงื่อนไขที่ importer และ updater ใช้ค้นหาแถวจริง
+
+- MATCH_PREDICATES: เงื่อนไข WHERE ของแต่ละสคริปต์ (ตาราง, columns ที่เทียบเท่ากัน, partial condition)
+- scan_sources(): อ่าน SQL ใน source ของ importer/updater เพื่อหาเงื่อนไขที่ยังไม่อยู่ในรายการ
+- เทียบกับ index ที่มีอยู่ (pg_index) และสถิติการใช้ (pg_stat_user_indexes, pg_stat_statements)
+- --apply: CREATE INDEX CONCURRENTLY เฉพาะที่ขาด (localhost เท่านั้น) แล้ววัดเวลาค้นหาก่อน/หลัง
+
+การวัดเวลาใช้ lookup แบบเดียวกับที่ updater ทำต่อแถว Excel (ค่าตัวอย่างจากข้อมูลจริงในตาราง)
+เพราะสคริปต์ update เองเขียนลงฐานข้อมูลที่ตั้งค่าไว้โดยตรง
+
+Usage:
+    python index_advisor.py                 # รายงาน + DDL ที่เสนอ
+    python index_advisor.py --measure       # วัดเวลา lookup ของแต่ละเงื่อนไข
+    python index_advisor.py --apply         # สร้าง index ที่ขาด แล้ววัดก่อน/หลัง
+"""
+
+import argparse
+import ast
+import os
+import re
+import statistics
+import time
+from glob import glob
+
+import psycopg2
+from psycopg2 import sql
+
+from db_config import DB_CONFIG
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1', '')
+SAMPLE_SIZE = 200
+
+# เงื่อนไขที่ใช้หาแถวเป้าหมาย - partial ต้องเป็นข้อความเดียวกับใน query เพื่อให้ planner ใช้ partial index ได้
+MATCH_PREDICATES = [
+    {
+        'name': 'idx_secondment_key',
+        'table': 'secondment',
+        'columns': ('full_name', 'destination_unit'),
+        'sources': ['import_secondment.py'],
+    },
+    {
+        'name': 'idx_secondment_history_open_name',
+        'table': 'secondment_history',
+        'columns': ('full_name',),
+        'partial': 'valid_to IS NULL',
+        'sources': ['import_secondment.py'],
+    },
+    {
+        'name': 'idx_search_tokens_gram',
+        'table': 'search_tokens',
+        'columns': ('entity',),
+        'sources': ['python/search_index.py'],
+    },
+]
+
+
+# ============================================
+# Source scan
+# ============================================
+
+SOURCE_GLOBS = ['python/*.py', 'import_*.py', 'backend/import_*.py']
+
+TABLE_RE = re.compile(
+    r'\b(?:UPDATE|DELETE\s+FROM|(?<!DISTINCT\s)FROM|JOIN)\s+(\w+)'
+    r'(?:\s+(?:AS\s+)?(?!(?:WHERE|SET|SELECT|ON|JOIN|GROUP|ORDER|LIMIT|WITH)\b)(\w+))?',
+    re.IGNORECASE
+)
+TEMP_TABLE_RE = re.compile(r'CREATE\s+TEMP(?:ORARY)?\s+TABLE\s+(\w+)', re.IGNORECASE)
+EQUALS_RE = re.compile(
+    r'(?:\b(\w+)\.)?(\w+)\s*(?:=|IS NOT DISTINCT FROM)\s*(?:%s|\$\d+|%\(\w+\)s|(\w+)\.(\w+))',
+    re.IGNORECASE
+)
+
+
+def _string_literals(tree):
+    """ข้อความ SQL ทุกก้อนใน source (f-string ใช้เฉพาะส่วนที่เป็นข้อความคงที่)"""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.JoinedStr):
+            yield ''.join(v.value for v in node.values if isinstance(v, ast.Constant) and isinstance(v.value, str))
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+            yield node.value
+
+
+def statement_predicates(text):
+    """
+    SQL หนึ่งก้อน -> {ตาราง: (columns ที่เทียบเท่า...)}
+    column ที่มี alias นำหน้าเป็นของตารางตาม alias, ไม่มี alias เป็นของตารางแรก
+    """
+    where = re.search(r'\bWHERE\b', text, re.IGNORECASE)
+    if not where:
+        return {}
+    tables = TABLE_RE.findall(text)
+    if not tables:
+        return {}
+    aliases = {}
+    for table, alias in tables:
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+
+    columns = {}
+    for alias, column, other_alias, other_column in EQUALS_RE.findall(text[where.start():]):
+        for owner, name in ((alias, column), (other_alias, other_column)):
+            if not name:
+                continue
+            table = aliases.get(owner) if owner else tables[0][0]
+            if table:
+                columns.setdefault(table, []).append(name)
+    return {t: tuple(dict.fromkeys(c)) for t, c in columns.items()}
+
+
+def scan_sources(patterns=SOURCE_GLOBS):
+    """(ไฟล์, ตาราง, columns ที่เทียบเท่า) ของทุก statement ที่มี WHERE แบบเทียบค่า"""
+    found = []
+    for pattern in patterns:
+        for path in sorted(glob(os.path.join(REPO_ROOT, pattern))):
+            if os.path.basename(path) in ('index_advisor.py', 'plan_harness.py'):
+                continue
+            with open(path, encoding='utf-8') as f:
+                source = f.read()
+            try:
+                tree = ast.parse(source)
+            except SyntaxError:
+                continue
+            temp_tables = set(TEMP_TABLE_RE.findall(source))
+            for text in _string_literals(tree):
+                for table, columns in statement_predicates(text).items():
+                    if table in temp_tables or table.startswith('pg_'):
+                        continue
+                    found.append((os.path.relpath(path, REPO_ROOT), table, columns))
+    return list(dict.fromkeys(found))
+
+
+def uncatalogued(found):
+    """เงื่อนไขที่ไม่มี predicate ใน MATCH_PREDICATES ครอบคลุม (columns ของ predicate เป็นส่วนหนึ่งของเงื่อนไข)"""
+    return [(path, table, columns) for path, table, columns in found
+            if 'id' not in columns  # primary key มี index อยู่แล้ว
+            and not any(p['table'] == table and set(p['columns']) <= set(columns) for p in MATCH_PREDICATES)]
+
+
+# ============================================
+# Catalog
+# ============================================
+
+def existing_indexes(cur, table):
+    """[(ชื่อ, (columns นำหน้า...), partial หรือ None, unique, idx_scan)]"""
+    cur.execute("""
+        SELECT c.relname,
+               ARRAY(SELECT pg_get_indexdef(i.indexrelid, k, true)
+                     FROM generate_series(1, i.indnkeyatts) AS k ORDER BY k),
+               pg_get_expr(i.indpred, i.indrelid),
+               i.indisunique,
+               COALESCE(s.idx_scan, 0)
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = i.indexrelid
+        WHERE i.indrelid = to_regclass(%s)
+        ORDER BY c.relname
+    """, (table,))
+    return [(name, tuple(columns), partial, unique, scans) for name, columns, partial, unique, scans in cur.fetchall()]
+
+
+def _normalize(expr):
+    return re.sub(r'[\s()]+', '', expr or '').lower()
+
+
+def covering_index(predicate, indexes):
+    """index ที่ใช้กับเงื่อนไขได้เต็มที่: columns นำหน้าครบทุกตัว และ partial ตรงกัน (หรือไม่มี partial)"""
+    width = len(predicate['columns'])
+    for name, columns, partial, _, _ in indexes:
+        if set(columns[:width]) != set(predicate['columns']):
+            continue
+        if partial is None or _normalize(partial).replace('::text', '') == _normalize(predicate.get('partial')):
+            return name
+    return None
+
+
+def create_statement(predicate):
+    statement = sql.SQL("CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} ({})").format(
+        sql.Identifier(predicate['name']),
+        sql.Identifier(predicate['table']),
+        sql.SQL(', ').join(map(sql.Identifier, predicate['columns'])),
+    )
+    if predicate.get('partial'):
+        statement += sql.SQL(' WHERE ') + sql.SQL(predicate['partial'])
+    return statement
+
+
+def statement_stats(cur, tables):
+    """statement ที่เขียน/อ่านตารางเหล่านี้จาก pg_stat_statements (ไม่มี extension -> [])"""
+    cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")
+    if cur.fetchone() is None:
+        return []
+    cur.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_name = 'pg_stat_statements' AND column_name IN ('mean_exec_time', 'mean_time')
+    """)
+    mean_column = cur.fetchone()[0]
+    pattern = '|'.join(re.escape(t) for t in tables)
+    cur.execute(sql.SQL("""
+        SELECT query, calls, {mean}, rows
+        FROM pg_stat_statements
+        WHERE query ~* %s AND query ~* '\\m(update|delete|where)\\M'
+        ORDER BY calls * {mean} DESC
+        LIMIT 10
+    """).format(mean=sql.Identifier(mean_column)), (rf'\m({pattern})\M',))
+    return cur.fetchall()
+
+
+# ============================================
+# Measure
+# ============================================
+
+def sample_keys(cur, predicate, limit=SAMPLE_SIZE):
+    columns = sql.SQL(', ').join(map(sql.Identifier, predicate['columns']))
+    conditions = [sql.SQL('{} IS NOT NULL').format(sql.Identifier(c)) for c in predicate['columns']]
+    if predicate.get('partial'):
+        conditions.append(sql.SQL(predicate['partial']))
+    where = sql.SQL(' AND ').join(conditions)
+    cur.execute(sql.SQL("""
+        SELECT {columns} FROM (SELECT DISTINCT {columns} FROM {table} WHERE {where}) keys
+        ORDER BY random() LIMIT %s
+    """).format(columns=columns, table=sql.Identifier(predicate['table']), where=where), (limit,))
+    return cur.fetchall()
+
+
+def lookup_statement(predicate):
+    # updater เพิ่มเงื่อนไขเฉพาะค่าที่ไม่ว่าง - ใช้ = เหมือนกัน (IS NOT DISTINCT FROM ใช้ btree ไม่ได้)
+    conditions = [sql.SQL('{} = %s').format(sql.Identifier(c)) for c in predicate['columns']]
+    if predicate.get('partial'):
+        conditions.append(sql.SQL(predicate['partial']))
+    return sql.SQL("SELECT ctid FROM {} WHERE {}").format(
+        sql.Identifier(predicate['table']), sql.SQL(' AND ').join(conditions))
+
+
+def measure(cur, predicate, keys):
+    """เวลารวม (ms) ของ lookup ทุก key และ median ต่อครั้ง"""
+    statement = lookup_statement(predicate)
+    timings = []
+    for key in keys:
+        start = time.perf_counter()
+        cur.execute(statement, key)
+        cur.fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return (sum(timings), statistics.median(timings)) if timings else (0.0, 0.0)
+
+
+# ============================================
+# Report
+# ============================================
+
+def advise(conn, run_measure=False):
+    """-> [(predicate, index ที่ครอบคลุมหรือ None, keys)]"""
+    cur = conn.cursor()
+    results = []
+    tables = sorted({p['table'] for p in MATCH_PREDICATES})
+    indexes = {t: existing_indexes(cur, t) for t in tables}
+
+    print("📋 Match predicates")
+    for predicate in MATCH_PREDICATES:
+        table = predicate['table']
+        cur.execute("SELECT to_regclass(%s)", (table,))
+        if cur.fetchone()[0] is None:
+            print(f"   ⏭️  {table}: table not found")
+            continue
+        covered = covering_index(predicate, indexes[table])
+        label = f"{table}({', '.join(predicate['columns'])})"
+        if predicate.get('partial'):
+            label += f" WHERE {predicate['partial']}"
+        print(f"   {'✅' if covered else '❌'} {label}")
+        print(f"      used by: {', '.join(predicate['sources'])}" + (f" - index {covered}" if covered else ''))
+
+        keys = sample_keys(cur, predicate) if run_measure else []
+        if keys:
+            total, median = measure(cur, predicate, keys)
+            print(f"      {len(keys)} lookups: {total:.1f}ms total, {median:.3f}ms median")
+        results.append((predicate, covered, keys))
+
+    print("\n📊 Index usage (pg_stat_user_indexes)")
+    for table in tables:
+        for name, columns, partial, unique, scans in indexes[table]:
+            flag = '  ⚠️  never used' if scans == 0 and not unique else ''
+            print(f"   {table:20s} {name:40s} {scans:10,d} scans{flag}")
+
+    statements = statement_stats(cur, tables)
+    if statements:
+        print("\n⏱️  Top statements (pg_stat_statements)")
+        for query, calls, mean, rows in statements:
+            print(f"   {calls:8,d} calls {mean:9.2f}ms {rows:10,d} rows  {' '.join(query.split())[:90]}")
+    else:
+        print("\nℹ️  pg_stat_statements is not installed - statement timings skipped")
+
+    missing = [p for p, covered, _ in results if not covered]
+    if missing:
+        print("\n💡 Proposed indexes")
+        for predicate in missing:
+            print(f"   {create_statement(predicate).as_string(conn)};")
+    cur.close()
+    conn.rollback()
+    return results
+
+
+def apply(conn, results):
+    """สร้าง index ที่ขาดแล้ววัด lookup เดิมซ้ำ"""
+    missing = [(p, keys) for p, covered, keys in results if not covered]
+    if not missing:
+        print("\n✅ Nothing to create")
+        return
+
+    before = {p['name']: measure(conn.cursor(), p, keys) for p, keys in missing}
+    conn.rollback()
+
+    conn.autocommit = True
+    cur = conn.cursor()
+    for predicate, _ in missing:
+        start = time.perf_counter()
+        cur.execute(create_statement(predicate))
+        cur.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(predicate['table'])))
+        print(f"🛠️  Created {predicate['name']} ({time.perf_counter() - start:.1f}s)")
+    conn.autocommit = False
+
+    print(f"\n{'index':36s} {'before':>12s} {'after':>12s}")
+    for predicate, keys in missing:
+        after = measure(cur, predicate, keys)
+        speedup = before[predicate['name']][0] / after[0] if after[0] else 0
+        print(f"{predicate['name']:36s} {before[predicate['name']][0]:10.1f}ms {after[0]:10.1f}ms  x{speedup:.1f}")
+    cur.close()
+    conn.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Index advisor for importer/updater predicates')
+    parser.add_argument('--measure', action='store_true', help='time the lookups of each predicate')
+    parser.add_argument('--apply', action='store_true', help='create missing indexes (localhost only)')
+    args = parser.parse_args()
+
+    found = uncatalogued(scan_sources())
+    for path, table, columns in found:
+        print(f"🔍 {path}: {table}({', '.join(columns)}) is not in MATCH_PREDICATES")
+
+    if args.apply and DB_CONFIG['host'] not in LOCAL_HOSTS:
+        raise SystemExit(f"❌ --apply only runs against a local instance (DB_HOST={DB_CONFIG['host']})")
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        results = advise(conn, run_measure=args.measure or args.apply)
+        if args.apply:
+            apply(conn, results)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
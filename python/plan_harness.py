@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""
+Query Plan Regression Harness
+ตรวจว่า query หลักของ API (backend/routes/*.js) ยังใช้ index อยู่หลังแก้ schema หรือ importer
+
+1. --load: สร้างฐานข้อมูลทดสอบ (HARNESS_DB_NAME) จากไฟล์ schema จริงของ repo
+   แล้วเติมข้อมูลจำลองที่กระจายตัวแบบข้อมูลจริง (บก. ใหญ่/เล็ก, ตำแหน่งว่าง ~20%)
+2. รัน QUERIES ทุกตัวด้วย EXPLAIN (ANALYZE, BUFFERS) -> เวลา, buffers, รูปแบบ plan
+3. --save เก็บผลเป็น baseline / --compare เทียบกับ baseline
+   index scan ที่กลายเป็น seq scan = regression (exit 1), ช้าลงเกิน --slowdown เท่า = คำเตือน
+
+ใช้ฐานข้อมูลแยก (ค่าเริ่มต้น forensic_hr_plan_harness บน localhost) เท่านั้น
+--load ลบ schema public ของฐานข้อมูลนั้นทิ้งทั้งหมด
+
+Usage:
+    python plan_harness.py --load --rows 50000 --save
+    python plan_harness.py --compare
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from copy_stream import copy_frame
+from db_config import DB_CONFIG
+from search_index import TOKEN_QUERY, ngrams, normalize_text, refresh_search_index
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HARNESS_CONFIG = {
+    **{k: v for k, v in DB_CONFIG.items() if k != 'sslmode'},
+    'host': os.getenv('HARNESS_DB_HOST', 'localhost'),
+    'port': os.getenv('HARNESS_DB_PORT', DB_CONFIG['port']),
+    'database': os.getenv('HARNESS_DB_NAME', 'forensic_hr_plan_harness'),
+}
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plan_baseline.json')
+
+# ลำดับเดียวกับที่ติดตั้งบน server จริง
+SCHEMA_FILES = [
+    'backend/db/schema.sql',
+    'backend/db/add_rank_type.sql',
+    'equipment_migration.sql',
+    'vehicles_migration.sql',
+    'secondment_migration.sql',
+    'backend/db/add_secondment_history.sql',
+    'backend/db/add_match_indexes.sql',
+    'backend/db/add_equipment_code_parts.sql',
+]
+
+INDEX_ACCESS = {'Index Scan', 'Index Only Scan', 'Bitmap Heap Scan'}
+SLOWDOWN = 2.0
+MIN_SLOWDOWN_MS = 1.0
+
+
+# ============================================
+# Query catalogue (คัดจาก backend/routes/*.js - parameter เป็น %s)
+# ============================================
+
+VACANT_HQ = 'ศพฐ.1'
+SMALL_HQ = 'สฝจ.'
+
+QUERIES = {
+    'stats_overview': {
+        'route': 'statistics.js GET /overview',
+        'sql': """
+            SELECT COUNT(*),
+                   COUNT(*) FILTER (WHERE vacancy_status = 'คนครอง'),
+                   COUNT(*) FILTER (WHERE vacancy_status = 'ตำแหน่งว่าง'),
+                   COUNT(*) FILTER (WHERE rank_type = 'สัญญาบัตร'),
+                   COUNT(*) FILTER (WHERE rank_type = 'ประทวน')
+            FROM personnel
+            WHERE headquarters != 'ไม่ระบุ'
+        """,
+    },
+    'stats_by_headquarters': {
+        'route': 'statistics.js GET /by-department',
+        'sql': """
+            SELECT headquarters, COUNT(*),
+                   COUNT(*) FILTER (WHERE vacancy_status = 'ตำแหน่งว่าง'),
+                   COUNT(*) FILTER (WHERE gender = 'ชาย' AND vacancy_status = 'คนครอง')
+            FROM personnel
+            WHERE headquarters IS NOT NULL AND headquarters != 'ไม่ระบุ'
+            GROUP BY headquarters
+        """,
+    },
+    'stats_special_departments': {
+        'route': 'statistics.js GET /by-department',
+        'sql': """
+            SELECT department, COUNT(*)
+            FROM personnel
+            WHERE headquarters = 'ส่วนบังคับบัญชา'
+              AND department IN ('กพอ.', 'ศขบ.')
+            GROUP BY department
+            ORDER BY department
+        """,
+    },
+    'stats_department_detail': {
+        'route': 'statistics.js GET /department/:name',
+        'sql': """
+            SELECT COUNT(*),
+                   COUNT(*) FILTER (WHERE vacancy_status = 'ตำแหน่งว่าง'),
+                   COUNT(*) FILTER (WHERE rank_type = 'ประทวน')
+            FROM personnel
+            WHERE department = %s
+        """,
+        'params': ['กก.3 สฝจ.'],
+    },
+    'stats_headquarters_detail': {
+        'route': 'statistics.js GET /department/:name',
+        'sql': """
+            SELECT department, COUNT(*),
+                   COUNT(*) FILTER (WHERE vacancy_status = 'ตำแหน่งว่าง')
+            FROM personnel
+            WHERE headquarters = %s AND department IS NOT NULL
+            GROUP BY department
+            ORDER BY department
+        """,
+        'params': [SMALL_HQ],
+    },
+    'stats_vacant_positions': {
+        'route': 'statistics.js GET /vacant/:name',
+        'sql': """
+            SELECT rank, position, department, full_name, headquarters
+            FROM personnel
+            WHERE headquarters = %s
+              AND vacancy_status = 'ตำแหน่งว่าง'
+            ORDER BY department, position
+            LIMIT 100
+        """,
+        'params': [VACANT_HQ],
+    },
+    'stats_organization': {
+        'route': 'statistics.js GET /organization',
+        'sql': """
+            SELECT headquarters, COUNT(DISTINCT department), COUNT(*)
+            FROM personnel
+            WHERE headquarters IS NOT NULL AND headquarters != 'ไม่ระบุ'
+            GROUP BY headquarters
+        """,
+    },
+    'search_name': {
+        'route': 'search.js GET /',
+        'sql': """
+            SELECT full_name, rank, position, headquarters, department, gender, vacancy_status
+            FROM personnel
+            WHERE (full_name ILIKE %s OR position ILIKE %s OR rank ILIKE %s)
+            ORDER BY full_name
+            LIMIT 100
+        """,
+        'params': ['%ศรีสุข%'] * 3,
+    },
+    'search_filters': {
+        'route': 'search.js GET /',
+        'sql': """
+            SELECT full_name, rank, position, headquarters, department, gender, vacancy_status
+            FROM personnel
+            WHERE headquarters = %s AND gender = %s AND vacancy_status = %s
+            ORDER BY full_name
+            LIMIT 100
+        """,
+        'params': [SMALL_HQ, 'หญิง', 'คนครอง'],
+    },
+    'search_tokens': {
+        'route': 'search.js GET / (search_tokens prefilter)',
+        'sql': TOKEN_QUERY,
+        'params': {
+            'pattern': '%ศรีสุข%',
+            'grams': sorted(ngrams(normalize_text('ศรีสุข'))),
+            'gram_count': len(ngrams(normalize_text('ศรีสุข'))),
+        },
+    },
+    'personnel_departments': {
+        'route': 'personnel.js GET /departments/list',
+        'sql': """
+            SELECT DISTINCT department
+            FROM personnel
+            WHERE department IS NOT NULL AND department != ''
+            ORDER BY department
+        """,
+    },
+    'equipment_years': {
+        'route': 'equipment.routes.js GET /years',
+        'sql': """
+            SELECT DISTINCT acquired_year
+            FROM equipment
+            WHERE acquired_year IS NOT NULL
+            ORDER BY acquired_year DESC
+        """,
+    },
+    'equipment_stats_year': {
+        'route': 'equipment.routes.js GET /stats?year=',
+        'sql': """
+            SELECT category, COUNT(*), COALESCE(SUM(quantity), COUNT(*))
+            FROM equipment
+            WHERE acquired_year = %s AND category IS NOT NULL
+            GROUP BY category
+            ORDER BY 2 DESC
+        """,
+        'params': [2545],
+    },
+    'equipment_by_code': {
+        'route': 'equipment.routes.js GET /code/:code',
+        'sql': """
+            SELECT * FROM equipment
+            WHERE code_type = %s AND code_year = %s AND code_running = %s AND code_method = %s
+            ORDER BY id
+        """,
+        'params': ['7440-0101', 2560, 42, 3],
+    },
+    'vehicles_by_department': {
+        'route': 'vehicles.routes.js GET /stats',
+        'sql': """
+            SELECT department_code, COUNT(*)
+            FROM vehicles
+            GROUP BY department_code
+            ORDER BY 2 DESC
+        """,
+    },
+    'secondment_list': {
+        'route': 'secondment.routes.js GET /',
+        'sql': "SELECT * FROM secondment ORDER BY id",
+    },
+    'secondment_open_history': {
+        'route': 'import_secondment.py (merge)',
+        'sql': """
+            SELECT destination_unit, COUNT(*)
+            FROM secondment_history
+            WHERE valid_to IS NULL AND full_name = %s
+            GROUP BY destination_unit
+        """,
+        'params': ['ร.ต.อ. สมชาย ศรีสุข'],
+    },
+}
+
+
+# ============================================
+# Synthetic data
+# ============================================
+
+# (บก., น้ำหนัก) - ศพฐ. ใหญ่, สฝจ./ส่วนบังคับบัญชา เล็ก, มีแถว 'ไม่ระบุ' และ NULL ปน
+HEADQUARTERS = (
+    [(f'ศพฐ.{i}', 7.0) for i in range(1, 11)]
+    + [('บก.อก.', 5.0), ('พฐก.', 8.0), ('ทว.', 3.0), ('ส่วนบังคับบัญชา', 2.0),
+       ('สฝจ.', 1.0), ('ไม่ระบุ', 3.0), (None, 1.0)]
+)
+RANKS = [('ร.ต.อ.', 'สัญญาบัตร'), ('พ.ต.ต.', 'สัญญาบัตร'), ('พ.ต.ท.', 'สัญญาบัตร'),
+         ('ด.ต.', 'ประทวน'), ('จ.ส.ต.', 'ประทวน'), ('ส.ต.อ.', 'ประทวน')]
+FIRST_NAMES = ['สมชาย', 'สมศักดิ์', 'วิชัย', 'ประเสริฐ', 'สุภาพร', 'กนกวรรณ', 'ณัฐพล', 'ธนพร', 'อรุณี', 'ปิยะ']
+LAST_NAMES = ['ศรีสุข', 'ใจดี', 'วงศ์สวัสดิ์', 'แสงทอง', 'บุญมา', 'ทองคำ', 'พรหมมา', 'สุขเจริญ', 'มีสุข', 'รักไทย']
+POSITIONS = ['พนักงานตรวจพิสูจน์', 'สารวัตร', 'ผู้กำกับการ', 'รองผู้กำกับการ', 'ผู้บังคับหมู่']
+EQUIPMENT = [('กล้องถ่ายภาพ', 'กล้อง'), ('เครื่องคอมพิวเตอร์', 'คอมพิวเตอร์'),
+             ('ชุดตรวจลายนิ้วมือ', 'ตรวจพิสูจน์'), ('เครื่องปรับอากาศ', 'สำนักงาน')]
+
+
+def _departments(headquarters):
+    if headquarters == 'ส่วนบังคับบัญชา':
+        return ['กพอ.', 'ศขบ.', 'ฝอ.1', 'ฝอ.2']
+    if headquarters in (None, 'ไม่ระบุ'):
+        return [None]
+    return [f'กก.{k} {headquarters}' for k in range(1, 7)]
+
+
+def synthetic_personnel(rows, rng):
+    weights = np.array([w for _, w in HEADQUARTERS])
+    hq_index = rng.choice(len(HEADQUARTERS), rows, p=weights / weights.sum())
+    headquarters = [HEADQUARTERS[i][0] for i in hq_index]
+    department = [rng.choice(_departments(h)) for h in headquarters]
+    rank = rng.integers(0, len(RANKS), rows)
+    vacant = rng.random(rows) < 0.2
+    first = np.array(FIRST_NAMES)[rng.integers(0, len(FIRST_NAMES), rows)]
+    last = np.array(LAST_NAMES)[rng.integers(0, len(LAST_NAMES), rows)]
+    names = [f'{RANKS[r][0]} {f} {l}' for r, f, l in zip(rank, first, last)]
+
+    return pd.DataFrame({
+        'rank': [RANKS[r][0] for r in rank],
+        'rank_type': [RANKS[r][1] for r in rank],
+        'gender': np.where(rng.random(rows) < 0.7, 'ชาย', 'หญิง'),
+        'full_name': np.where(vacant, 'ตำแหน่งว่าง', names),
+        'first_name': np.where(vacant, None, first),
+        'last_name': np.where(vacant, None, last),
+        'position': np.array(POSITIONS)[rng.integers(0, len(POSITIONS), rows)],
+        'department': department,
+        'headquarters': headquarters,
+        'status': np.where(vacant, 'ตำแหน่งว่าง', 'คนครอง'),
+        'vacancy_status': np.where(vacant, 'ตำแหน่งว่าง', 'คนครอง'),
+    })
+
+
+def synthetic_equipment(rows, rng):
+    item = rng.integers(0, len(EQUIPMENT), rows)
+    divisions = [h for h, _ in HEADQUARTERS if h not in (None, 'ไม่ระบุ')]
+    return pd.DataFrame({
+        'bureau': 'สพฐ.ตร.',
+        'division': np.array(divisions)[rng.integers(0, len(divisions), rows)],
+        'unit': [f'พฐ.จว.{i % 77}' for i in range(rows)],
+        'item_name': [EQUIPMENT[i][0] for i in item],
+        'equipment_code': [f'7440-0101-{n % 10000:04d}-3-{2530 + n // 10000}' for n in range(rows)],
+        'acquired_year': rng.integers(2530, 2568, rows),
+        'code_type': '7440-0101',
+        'code_running': np.arange(rows) % 10000,
+        'code_method': 3,
+        'code_year': 2530 + np.arange(rows) // 10000,
+        'quantity': rng.integers(1, 5, rows),
+        'status': np.where(rng.random(rows) < 0.9, 'ใช้งานได้', 'ชำรุด'),
+        'category': [EQUIPMENT[i][1] for i in item],
+    })
+
+
+def synthetic_vehicles(rows, rng):
+    divisions = [h for h, _ in HEADQUARTERS if h not in (None, 'ไม่ระบุ')]
+    return pd.DataFrame({
+        'department_code': np.array(divisions)[rng.integers(0, len(divisions), rows)],
+        'vehicle_type': np.array(['รถยนต์กระบะ', 'รถตู้', 'รถเก๋ง', 'รถจักรยานยนต์'])[rng.integers(0, 4, rows)],
+        'brand': np.array(['TOYOTA', 'ISUZU', 'NISSAN', 'HONDA'])[rng.integers(0, 4, rows)],
+        'license_plate': [f'{n % 90 + 10}-{n:04d}' for n in range(rows)],
+        'status': np.where(rng.random(rows) < 0.85, 'ใช้งานได้', 'รอจำหน่าย'),
+    })
+
+
+def synthetic_secondment(personnel, rows, rng):
+    people = personnel[personnel['vacancy_status'] == 'คนครอง'].sample(min(rows, len(personnel)), random_state=0)
+    return pd.DataFrame({
+        'rank': people['rank'].to_numpy(),
+        'gender': people['gender'].to_numpy(),
+        'full_name': people['full_name'].to_numpy(),
+        'position': people['position'].to_numpy(),
+        'origin_unit': people['headquarters'].to_numpy(),
+        'destination_unit': np.array(['ตร.', 'สพฐ.ตร.', 'บช.น.', 'ศพฐ.1'])[rng.integers(0, 4, len(people))],
+        'period': '1 ต.ค. 67 - 30 ก.ย. 68',
+    })
+
+
+# ============================================
+# Harness database
+# ============================================
+
+def connect():
+    if HARNESS_CONFIG['database'] == DB_CONFIG['database'] and HARNESS_CONFIG['host'] == DB_CONFIG['host']:
+        raise SystemExit("❌ HARNESS_DB_NAME must not be the application database")
+    return psycopg2.connect(**HARNESS_CONFIG)
+
+
+def ensure_database():
+    """สร้างฐานข้อมูลทดสอบถ้ายังไม่มี"""
+    conn = psycopg2.connect(**{**HARNESS_CONFIG, 'database': 'postgres'})
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (HARNESS_CONFIG['database'],))
+    if cur.fetchone() is None:
+        cur.execute(f'CREATE DATABASE "{HARNESS_CONFIG["database"]}"')
+        print(f"🆕 Created database {HARNESS_CONFIG['database']}")
+    cur.close()
+    conn.close()
+
+
+def apply_schema(conn):
+    """สร้าง schema ใหม่จากไฟล์ SQL ของ repo (การแก้ schema จึงสะท้อนใน plan ทันที)"""
+    cur = conn.cursor()
+    cur.execute("DROP SCHEMA public CASCADE")
+    cur.execute("CREATE SCHEMA public")
+    conn.commit()
+    for name in SCHEMA_FILES:
+        with open(os.path.join(REPO_ROOT, name), encoding='utf-8') as f:
+            cur.execute(f.read())
+        conn.commit()
+        print(f"📐 {name}")
+    cur.close()
+
+
+def load_synthetic(conn, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    personnel = synthetic_personnel(rows, rng)
+    frames = {
+        'personnel': personnel,
+        'equipment': synthetic_equipment(rows // 2, rng),
+        'vehicles': synthetic_vehicles(max(rows // 20, 1), rng),
+        'secondment': synthetic_secondment(personnel, max(rows // 100, 1), rng),
+    }
+
+    cur = conn.cursor()
+    for table, frame in frames.items():
+        copy_frame(cur, table, frame, list(frame.columns))
+        print(f"📥 {table}: {len(frame):,} rows")
+    cur.execute("""
+        INSERT INTO secondment_history (full_name, rank, origin_unit, destination_unit, period)
+        SELECT DISTINCT ON (full_name, destination_unit) full_name, rank, origin_unit, destination_unit, period
+        FROM secondment
+    """)
+    conn.commit()
+
+    try:
+        refresh_search_index(conn, ['personnel'])
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"⚠️  Search index skipped: {e}")
+
+    conn.autocommit = True
+    cur.execute("VACUUM ANALYZE")
+    conn.autocommit = False
+    cur.close()
+
+
+# ============================================
+# EXPLAIN
+# ============================================
+
+def walk(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from walk(child)
+
+
+def plan_shape(plan):
+    """
+    สรุป plan -> (รายการ node, {ตาราง: [วิธีอ่าน]})
+    Bitmap Heap Scan นับเป็นการใช้ index (ชื่อ index อยู่ใน Bitmap Index Scan ลูก)
+    """
+    nodes = []
+    access = {}
+    for node in walk(plan):
+        label = node['Node Type']
+        relation = node.get('Relation Name')
+        if relation:
+            label += f" on {relation}"
+            methods = access.setdefault(relation, [])
+            if node['Node Type'] not in methods:
+                methods.append(node['Node Type'])
+        if node.get('Index Name'):
+            label += f" using {node['Index Name']}"
+        nodes.append(label)
+    return nodes, access
+
+
+def explain(cur, sql, params=None, repeat=3):
+    """EXPLAIN (ANALYZE, BUFFERS) repeat ครั้ง -> dict ของเวลา median, buffers และ plan ครั้งสุดท้าย"""
+    timings = []
+    for _ in range(repeat):
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+        result = cur.fetchone()[0][0]
+        timings.append(result['Execution Time'])
+
+    plan = result['Plan']
+    nodes, access = plan_shape(plan)
+    return {
+        'execution_ms': round(statistics.median(timings), 3),
+        'planning_ms': round(result['Planning Time'], 3),
+        'shared_hit': plan.get('Shared Hit Blocks', 0),
+        'shared_read': plan.get('Shared Read Blocks', 0),
+        'rows': plan.get('Actual Rows'),
+        'shape': nodes,
+        'access': access,
+    }
+
+
+def run_catalogue(conn, repeat=3):
+    cur = conn.cursor()
+    results = {}
+    for name, spec in QUERIES.items():
+        try:
+            results[name] = {'route': spec['route'], **explain(cur, spec['sql'], spec.get('params'), repeat)}
+        except psycopg2.Error as e:
+            conn.rollback()
+            results[name] = {'route': spec['route'], 'error': (e.pgerror or str(e)).strip()}
+    cur.close()
+    conn.rollback()
+    return results
+
+
+def print_results(results):
+    print(f"\n{'query':28s} {'ms':>9s} {'hit':>7s} {'read':>7s}  plan")
+    for name, r in results.items():
+        if 'error' in r:
+            print(f"{name:28s} ❌ {r['error']}")
+            continue
+        scans = ', '.join(f"{rel}: {'/'.join(m)}" for rel, m in r['access'].items())
+        print(f"{name:28s} {r['execution_ms']:9.2f} {r['shared_hit']:7d} {r['shared_read']:7d}  {scans}")
+
+
+# ============================================
+# Baseline
+# ============================================
+
+def save_baseline(results, path, rows):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'rows': rows,
+            'queries': results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Baseline saved: {path}")
+
+
+def compare(baseline, results, slowdown=SLOWDOWN):
+    """-> (regressions, warnings) เป็น list ของข้อความ"""
+    regressions, warnings = [], []
+    for name, base in baseline['queries'].items():
+        now = results.get(name)
+        if now is None or 'error' in base:
+            continue
+        if 'error' in now:
+            regressions.append(f"{name}: query fails ({now['error']})")
+            continue
+
+        lost_index = False
+        for relation, methods in base['access'].items():
+            current = now['access'].get(relation, [])
+            if INDEX_ACCESS & set(methods) and not INDEX_ACCESS & set(current):
+                lost_index = True
+                regressions.append(f"{name}: {relation} {'/'.join(methods)} -> {'/'.join(current) or 'not scanned'}")
+
+        if now['shape'] != base['shape'] and not lost_index:
+            warnings.append(f"{name}: plan changed ({' > '.join(now['shape'][:4])})")
+        if (now['execution_ms'] > base['execution_ms'] * slowdown
+                and now['execution_ms'] - base['execution_ms'] > MIN_SLOWDOWN_MS):
+            warnings.append(f"{name}: {base['execution_ms']:.2f}ms -> {now['execution_ms']:.2f}ms")
+    return regressions, warnings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query plan regression harness')
+    parser.add_argument('--load', action='store_true', help='recreate schema and load synthetic data')
+    parser.add_argument('--rows', type=int, default=50000, help='synthetic personnel rows (with --load)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', nargs='?', const=BASELINE_FILE, help='save results as baseline')
+    parser.add_argument('--compare', nargs='?', const=BASELINE_FILE, help='compare against baseline')
+    parser.add_argument('--slowdown', type=float, default=SLOWDOWN, help='warn when this many times slower')
+    args = parser.parse_args()
+
+    print(f"🔗 {HARNESS_CONFIG['host']}/{HARNESS_CONFIG['database']}")
+    if args.load:
+        ensure_database()
+    conn = connect()
+    try:
+        if args.load:
+            apply_schema(conn)
+            load_synthetic(conn, args.rows)
+
+        results = run_catalogue(conn, args.repeat)
+        print_results(results)
+
+        if args.save:
+            save_baseline(results, args.save, args.rows)
+        if args.compare:
+            with open(args.compare, encoding='utf-8') as f:
+                baseline = json.load(f)
+            regressions, warnings = compare(baseline, results, args.slowdown)
+            for message in warnings:
+                print(f"⚠️  {message}")
+            for message in regressions:
+                print(f"❌ {message}")
+            if regressions:
+                sys.exit(1)
+            print(f"\n✅ No plan regressions against {os.path.basename(args.compare)}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
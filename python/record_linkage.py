@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Record Linkage: แถวใน Excel -> personnel.id
+จับคู่ชื่อที่เขียนต่างกันเล็กน้อย (ยศติดหน้าชื่อ, ช่องว่างหาย/เกิน, พิมพ์ผิดหนึ่งตัว) โดยไม่เทียบทุกคู่
+
+1. exact:  hash join ด้วยชื่อที่ normalize แล้ว (ตัดคำนำหน้า/ยศ, ช่องว่าง, ำ) + ยศ
+           ยศต่างกัน (เลื่อนยศ) รับเมื่อชื่อนั้นมีคนเดียวในฐานข้อมูลและ บก. ตรงกัน
+2. blocking: เทียบเฉพาะคู่ที่ block key ตรงกัน (merge) - หลายรอบเพื่อไม่พลาดเพราะ key เดียว
+           (บก., พยัญชนะต้นของชื่อ) / (บก., พยัญชนะต้นของนามสกุล) / (พยัญชนะต้นชื่อ, นามสกุล) - ย้าย บก.
+3. scoring: Levenshtein similarity ของทุกคู่พร้อมกันเป็น NumPy array (loop ตามตำแหน่งตัวอักษร ไม่ใช่ตามคู่)
+4. ตัดสิน: คะแนน >= AUTO_THRESHOLD, ยศตรง และห่างจากอันดับสองอย่างน้อย AUTO_MARGIN -> จับคู่อัตโนมัติ
+           คะแนน >= REVIEW_THRESHOLD -> review queue (ให้คนตรวจ), id หนึ่งจับคู่ได้แถวเดียว
+
+    result = link_records(sheet, people)   # DataFrame: row/full_name/rank/headquarters, id/full_name/rank/headquarters
+    result.matches  # row, id, score, method
+    result.review   # row, candidate id, คะแนน, เหตุผล
+"""
+
+import re
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from unit_normalizer import get_normalizer
+
+AUTO_THRESHOLD = 0.85
+AUTO_MARGIN = 0.05
+REVIEW_THRESHOLD = 0.70
+REVIEW_CANDIDATES = 3
+
+# คำนำหน้า / ยศที่พิมพ์ติดมากับชื่อ เช่น 'ด.ต.สมชาย', 'ว่าที่ ร.ต.อ.หญิง ...', 'นางสาว ...'
+# นาย/นาง/นางสาว ต้องตามด้วยช่องว่าง ไม่งั้นกินต้นชื่อจริง ('นายิกา', 'นางฟ้า')
+NAME_PREFIX = re.compile(
+    r'^(?:(?:ว่าที่\s*)?(?:[ก-ฮ]{1,2}\.\s*){1,3}(?:หญิง)?|(?:นางสาว|นาง|นาย)(?=\s)|น\.ส\.)\s*'
+)
+LEADING_VOWELS = 'เแโใไ'
+# พยัญชนะควบกล้ำ: ก ข ค ต ป พ ผ บ ด + ร ล ว
+CLUSTER_HEADS = set('กขคตปพผบด')
+CLUSTER_TAILS = set('รลว')
+THAI_CONSONANT = re.compile(r'[ก-ฮ]')
+
+BLOCK_PASSES = (
+    ('hq_key', 'first_block'),
+    ('hq_key', 'last_block'),
+    ('first_block', 'last_block'),
+)
+
+LinkResult = namedtuple('LinkResult', ['matches', 'review', 'unmatched', 'stats'])
+
+
+# ============================================
+# Keys
+# ============================================
+
+def name_key(names):
+    """Series ของชื่อ -> ชื่อสำหรับเทียบ: ตัดคำนำหน้า/ยศ, ํา -> ำ, ไม่มีช่องว่าง"""
+    text = names.astype('string').str.strip().str.replace('ํา', 'ำ', regex=False)
+    text = text.str.replace('\u200b', '', regex=False).str.replace(NAME_PREFIX, '', regex=True)
+    return text.str.replace(r'\s+', '', regex=True).replace('', pd.NA)
+
+
+def rank_key(ranks):
+    """ยศสำหรับเทียบ: ไม่สน '.', ช่องว่าง, 'ว่าที่', 'หญิง' (ร.ต.อ. = ว่าที่ ร.ต.อ. = รตอ)"""
+    text = ranks.astype('string').str.replace(r'ว่าที่|หญิง|[\s.]', '', regex=True)
+    return text.replace('', pd.NA)
+
+
+def consonant_cluster(word):
+    """พยัญชนะต้น (รวมควบกล้ำ) ของคำ: 'เกรียงไกร' -> 'กร', 'ประภัสรา' -> 'ปร', 'สมชาย' -> 'ส'"""
+    if not isinstance(word, str):
+        return None
+    word = word.lstrip(LEADING_VOWELS)
+    match = THAI_CONSONANT.search(word)
+    if match is None:
+        return word[:1] or None
+    start = match.start()
+    head = word[start]
+    if head in CLUSTER_HEADS and start + 1 < len(word) and word[start + 1] in CLUSTER_TAILS:
+        return word[start:start + 2]
+    return head
+
+
+def prepare(frame):
+    """เพิ่ม column สำหรับจับคู่: name_key, rank_key, hq_key, first_block, last_block"""
+    normalizer = get_normalizer()
+    out = frame.copy()
+    out['name_key'] = name_key(frame['full_name'])
+    out['rank_key'] = rank_key(frame['rank'])
+    out['hq_key'] = normalizer.normalize(frame['headquarters'].astype('string'))
+    parts = (frame['full_name'].astype('string').str.strip()
+             .str.replace(NAME_PREFIX, '', regex=True).str.split(r'\s+', n=1, regex=True))
+    out['first_block'] = parts.str[0].map(consonant_cluster, na_action='ignore')
+    out['last_block'] = parts.str[1].map(consonant_cluster, na_action='ignore')
+    return out
+
+
+# ============================================
+# Similarity (batched)
+# ============================================
+
+def _codes(strings):
+    """list ของข้อความ -> (array ของ code point เติม -1 ให้ยาวเท่ากัน, ความยาว)"""
+    lengths = np.fromiter((len(s) for s in strings), dtype=np.int64, count=len(strings))
+    width = int(lengths.max()) if len(strings) else 0
+    codes = np.full((len(strings), width), -1, dtype=np.int64)
+    for i, s in enumerate(strings):
+        codes[i, :len(s)] = np.frombuffer(s.encode('utf-32-le'), dtype=np.uint32)
+    return codes, lengths
+
+
+def levenshtein_similarity(left, right):
+    """
+    1 - ระยะ Levenshtein / ความยาวที่มากกว่า ของคู่ left[i], right[i] ทุกคู่พร้อมกัน
+    DP หนึ่งแถวต่อตัวอักษรของ left ทำทั้ง array (n คู่) - ไม่มี loop ตามคู่
+    """
+    n = len(left)
+    if n == 0:
+        return np.empty(0)
+    a, la = _codes(left)
+    b, lb = _codes(right)
+    width = b.shape[1]
+    distance = lb.copy()                                   # left ว่าง: ระยะ = ความยาว right
+    previous = np.tile(np.arange(width + 1), (n, 1))
+    rows = np.arange(n)
+    for i in range(1, a.shape[1] + 1):
+        current = np.empty_like(previous)
+        current[:, 0] = i
+        substitute = previous[:, :-1] + (a[:, i - 1:i] != b)
+        delete = previous[:, 1:] + 1
+        best = np.minimum(substitute, delete)
+        for j in range(1, width + 1):
+            current[:, j] = np.minimum(best[:, j - 1], current[:, j - 1] + 1)
+        done = la == i
+        distance[done] = current[rows[done], lb[done]]
+        previous = current
+    longest = np.maximum(np.maximum(la, lb), 1)
+    return 1.0 - distance / longest
+
+
+# ============================================
+# Linkage
+# ============================================
+
+def _exact(sheet, people):
+    """ชื่อ normalize ตรงกัน -> (matches, ambiguous rows -> candidates)"""
+    joined = sheet[['row', 'name_key', 'rank_key', 'hq_key']].merge(
+        people[['id', 'name_key', 'rank_key', 'hq_key']], on='name_key', suffixes=('', '_p'))
+    joined['same_rank'] = (joined['rank_key'] == joined['rank_key_p']).fillna(False)
+    joined['same_hq'] = (joined['hq_key'] == joined['hq_key_p']).fillna(False)
+
+    # ยศตรง: มีคนเดียว หรือมีคนเดียวที่ บก. ตรงด้วย
+    ranked = joined[joined['same_rank']]
+    counts = ranked.groupby('row')['id'].transform('size')
+    hq_counts = ranked[ranked['same_hq']].groupby('row')['id'].transform('size').reindex(ranked.index)
+    exact = ranked[(counts == 1) | (ranked['same_hq'] & (hq_counts == 1))]
+
+    # ยศต่าง (เลื่อนยศ): ชื่อนี้มีคนเดียวในฐานข้อมูลและ บก. ตรง
+    unique_names = people['name_key'].value_counts()
+    promoted = joined[~joined['row'].isin(ranked['row']) & joined['same_hq']
+                      & joined['name_key'].map(unique_names).eq(1)]
+
+    matches = pd.concat([exact.assign(method='exact'), promoted.assign(method='rank_changed')])
+    matches = matches[['row', 'id', 'method']].assign(score=1.0)
+    unresolved = joined[~joined['row'].isin(matches['row'])]
+    return matches, unresolved
+
+
+def candidate_pairs(sheet, people):
+    """คู่ (row, id) ที่ block key ตรงกันอย่างน้อยหนึ่งรอบ (hash join ต่อรอบ ไม่เทียบทุกคู่)"""
+    pairs = []
+    for keys in BLOCK_PASSES:
+        left = sheet.dropna(subset=list(keys))[['row'] + list(keys)]
+        right = people.dropna(subset=list(keys))[['id'] + list(keys)]
+        pairs.append(left.merge(right, on=list(keys))[['row', 'id']])
+    return pd.concat(pairs).drop_duplicates(ignore_index=True)
+
+
+def score_pairs(pairs, sheet, people):
+    """คะแนนของทุกคู่ + ยศ/บก. ตรงหรือไม่"""
+    s = sheet.set_index('row').loc[pairs['row']]
+    p = people.set_index('id').loc[pairs['id']]
+    scored = pairs.copy()
+    scored['score'] = levenshtein_similarity(s['name_key'].tolist(), p['name_key'].tolist()).round(3)
+    scored['same_rank'] = _equal(s['rank_key'], p['rank_key'])
+    scored['same_hq'] = _equal(s['hq_key'], p['hq_key'])
+    return scored
+
+
+def _equal(left, right):
+    """เทียบทีละคู่ตามตำแหน่ง (NA = ไม่ตรง) -> bool array"""
+    same = left.reset_index(drop=True) == right.reset_index(drop=True)
+    return same.fillna(False).to_numpy(dtype=bool)
+
+
+def _claim(matches):
+    """id หนึ่งใช้ได้แถวเดียว: คะแนนสูงสุดได้ไป ที่เหลือ -> review"""
+    matches = matches.sort_values(['score', 'row'], ascending=[False, True], kind='stable')
+    taken = matches.duplicated('id', keep='first')
+    return matches[~taken], matches[taken]
+
+
+def link_records(sheet, people, auto=AUTO_THRESHOLD, margin=AUTO_MARGIN, review=REVIEW_THRESHOLD):
+    """
+    sheet: row, full_name, rank, headquarters    people: id, full_name, rank, headquarters
+    -> LinkResult(matches, review, unmatched, stats)
+    """
+    start = time.perf_counter()
+    sheet = prepare(sheet)
+    people = prepare(people)
+
+    exact, unresolved = _exact(sheet.dropna(subset=['name_key']), people.dropna(subset=['name_key']))
+    exact, exact_conflicts = _claim(exact)
+
+    # ชื่อเขียนต่าง: เทียบกับคนที่ยังไม่ถูกจับคู่เท่านั้น
+    pending = sheet[~sheet['row'].isin(exact['row']) & sheet['name_key'].notna()]
+    available = people[~people['id'].isin(exact['id']) & people['name_key'].notna()]
+    pairs = candidate_pairs(pending, available)
+    scored = score_pairs(pairs, pending, available)
+    scored = scored.sort_values(['row', 'score', 'same_rank', 'same_hq'], ascending=[True, False, False, False])
+
+    ranked = scored.groupby('row', sort=False)
+    best = ranked.head(1).set_index('row')
+    second = ranked['score'].nth(1)
+    second.index = scored.loc[second.index, 'row'].to_numpy()
+    runner_up = second.reindex(best.index).fillna(0)
+    confident = (best['score'] >= auto) & best['same_rank'] & (best['score'] - runner_up >= margin)
+    fuzzy, fuzzy_conflicts = _claim(best[confident].reset_index()[['row', 'id', 'score']].assign(method='fuzzy'))
+
+    matches = pd.concat([exact, fuzzy], ignore_index=True)[['row', 'id', 'score', 'method']]
+
+    # review queue: แถวที่ยังไม่จับคู่ + candidate ไม่เกิน REVIEW_CANDIDATES ที่คะแนนผ่าน
+    conflicted = set(exact_conflicts['row']) | set(fuzzy_conflicts['row'])
+    queue = scored[~scored['row'].isin(matches['row']) & (scored['score'] >= review)]
+    queue = queue.groupby('row', sort=False).head(REVIEW_CANDIDATES)
+    ambiguous = unresolved[~unresolved['row'].isin(matches['row'])][['row', 'id']].assign(
+        score=1.0, same_rank=unresolved['same_rank'], same_hq=unresolved['same_hq'])
+    queue = pd.concat([ambiguous, queue], ignore_index=True).drop_duplicates(['row', 'id'])
+    queue['reason'] = np.select(
+        [queue['row'].isin(conflicted), ~queue['same_rank'].astype(bool), queue['score'] >= 1.0,
+         queue['score'] >= auto],
+        ['id already matched', 'rank differs', 'same name, several people', 'close runner-up'],
+        'low score')
+    queue = _review_details(queue, sheet, people)
+
+    unmatched = sheet.loc[~sheet['row'].isin(matches['row']) & ~sheet['row'].isin(queue['row']), 'row'].tolist()
+    stats = {
+        'rows': len(sheet),
+        'exact': int((matches['method'] == 'exact').sum()),
+        'rank_changed': int((matches['method'] == 'rank_changed').sum()),
+        'fuzzy': int((matches['method'] == 'fuzzy').sum()),
+        'review': int(queue['row'].nunique()),
+        'unmatched': len(unmatched),
+        'pairs_scored': len(pairs),
+        'seconds': round(time.perf_counter() - start, 2),
+    }
+    return LinkResult(matches, queue, unmatched, stats)
+
+
+def _review_details(queue, sheet, people):
+    """ชื่อ/ยศ/บก. ของทั้งสองฝั่งสำหรับคนตรวจ"""
+    fields = ['full_name', 'rank', 'headquarters']
+    left = sheet.set_index('row')[fields].add_prefix('sheet_')
+    right = people.set_index('id')[fields].add_prefix('db_')
+    out = queue.join(left, on='row').join(right, on='id')
+    columns = ['row', 'sheet_full_name', 'sheet_rank', 'sheet_headquarters',
+               'id', 'db_full_name', 'db_rank', 'db_headquarters', 'score', 'reason']
+    return out.sort_values(['row', 'score'], ascending=[True, False])[columns].reset_index(drop=True)
+
+
+def print_stats(stats):
+    print(f"🔗 Linked {stats['rows']} rows: exact {stats['exact']}, rank changed {stats['rank_changed']}, "
+          f"fuzzy {stats['fuzzy']}, review {stats['review']}, unmatched {stats['unmatched']} "
+          f"({stats['pairs_scored']:,} pairs scored, {stats['seconds']:.2f}s)")
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Retirement & Tenure Projections
+คำนวณอายุ อายุราชการ และปีงบประมาณที่เกษียณของทุกคนครั้งเดียวหลัง import
+แล้วเก็บใน personnel_tenure / retirement_forecast (backend/db/add_retirement_forecast.sql)
+
+- อ่าน birth_date / hire_date / appointed_date / retirement_date ด้วย SELECT เดียว
+  เป็น NumPy datetime64[D] แล้วคำนวณทั้ง column พร้อมกัน (ไม่มี loop ต่อแถว)
+- ปีที่เป็น พ.ศ. (> 2400) แปลงเป็น ค.ศ. ก่อนคำนวณ
+- ปีงบประมาณไทย: 1 ต.ค. - 30 ก.ย. (ปีงบ = ปีที่สิ้นสุด) เก็บเป็น พ.ศ.
+- เกษียณ: ใช้ retirement_date จาก Excel ถ้ามี ไม่เช่นนั้นคำนวณจากวันเกิด
+  ครบ 60 ปีบริบูรณ์ (วันก่อนวันเกิด) ในปีงบใด เกษียณสิ้นปีงบนั้น (retirement_date = 1 ต.ค. ถัดไป
+  ตามรูปแบบในไฟล์ Excel) - เกิด 1 ต.ค. เกษียณพร้อมรุ่นก่อนหน้า, เกิด 2 ต.ค. เกษียณปีถัดไป
+- retirement_forecast: จำนวนผู้เกษียณต่อ บก. ต่อปีงบ สำหรับ FORECAST_YEARS ปีข้างหน้า
+
+Usage:
+    python retirement_forecast.py [--years 10] [--as-of 2025-10-01] [--plan]
+"""
+
+import argparse
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from copy_stream import copy_frame
+from db_config import DB_CONFIG
+
+RETIREMENT_AGE = 60
+FORECAST_YEARS = 10
+BUDDHIST_OFFSET = 543
+FISCAL_YEAR_START_MONTH = 10
+
+DATE_COLUMNS = ('birth_date', 'hire_date', 'appointed_date', 'retirement_date')
+
+SELECT_PERSONNEL = """
+    SELECT id, headquarters, rank_type, birth_date, hire_date, appointed_date, retirement_date
+    FROM personnel
+    WHERE vacancy_status IS DISTINCT FROM 'ตำแหน่งว่าง'
+"""
+
+TENURE_COLUMNS = ['personnel_id', 'age_years', 'service_years', 'years_in_position',
+                  'retirement_date', 'retirement_fiscal_year', 'retirement_projected']
+FORECAST_COLUMNS = ['headquarters', 'fiscal_year', 'retirees', 'commissioned',
+                    'non_commissioned', 'average_service_years']
+
+
+# ============================================
+# datetime64 helpers (ทั้ง array)
+# ============================================
+
+def add_years(days, years):
+    """วันที่ + years ปี (29 ก.พ. ในปีที่ไม่มี -> 1 มี.ค.)"""
+    months = days.astype('datetime64[M]')
+    offset = days - months.astype('datetime64[D]')
+    return (months + 12 * years).astype('datetime64[D]') + offset
+
+
+def to_days(values):
+    """list ของ date/None -> datetime64[D] (None = NaT, ปี พ.ศ. แปลงเป็น ค.ศ.)"""
+    days = np.array(values, dtype='datetime64[D]')
+    buddhist = ~np.isnat(days) & (components(days)[0] > 2400)
+    if buddhist.any():
+        days[buddhist] = add_years(days[buddhist], -BUDDHIST_OFFSET)
+    return days
+
+
+def components(days):
+    """-> (ปี, เดือน 1-12, วัน 1-31) เป็น int array"""
+    months = days.astype('datetime64[M]')
+    years = days.astype('datetime64[Y]').astype(np.int64) + 1970
+    return years, months.astype(np.int64) % 12 + 1, (days - months.astype('datetime64[D]')).astype(np.int64) + 1
+
+
+def completed_years(start, as_of):
+    """จำนวนปีเต็มจาก start ถึง as_of (NaT -> nan)"""
+    sy, sm, sd = components(start)
+    ay, am, ad = components(np.datetime64(as_of, 'D'))
+    years = (ay - sy - ((am < sm) | ((am == sm) & (ad < sd)))).astype(float)
+    years[np.isnat(start)] = np.nan
+    return years
+
+
+def elapsed_years(start, as_of):
+    """ปีแบบมีทศนิยม (วัน / 365.25) ทศนิยม 1 ตำแหน่ง (NaT -> nan)"""
+    days = (np.datetime64(as_of, 'D') - start).astype(np.int64).astype(float)
+    days[np.isnat(start)] = np.nan
+    return np.round(days / 365.25, 1)
+
+
+def fiscal_year(days):
+    """ปีงบประมาณ (ค.ศ.) ของวันที่: ต.ค.-ก.ย. นับเป็นปีที่สิ้นสุด"""
+    years, months, _ = components(days)
+    return years + (months >= FISCAL_YEAR_START_MONTH)
+
+
+def projected_retirement(birth):
+    """วันเกษียณจากวันเกิด -> (1 ต.ค. หลังสิ้นปีงบที่ครบ 60 ปีบริบูรณ์)"""
+    completes = add_years(birth, RETIREMENT_AGE) - np.timedelta64(1, 'D')
+    year_end = (fiscal_year(completes) - 1970).astype('datetime64[Y]')
+    retire = (year_end.astype('datetime64[M]') + (FISCAL_YEAR_START_MONTH - 1)).astype('datetime64[D]')
+    retire[np.isnat(birth)] = np.datetime64('NaT')
+    return retire
+
+
+# ============================================
+# Projections
+# ============================================
+
+def load_personnel(cur):
+    """SELECT เดียว -> (DataFrame ของ id/headquarters/rank_type, {column: datetime64[D]})"""
+    cur.execute(SELECT_PERSONNEL)
+    rows = cur.fetchall()
+    columns = [d[0] for d in cur.description]
+    data = dict(zip(columns, zip(*rows))) if rows else {c: () for c in columns}
+    people = pd.DataFrame({c: list(data[c]) for c in ('id', 'headquarters', 'rank_type')})
+    dates = {c: to_days(list(data[c])) for c in DATE_COLUMNS}
+    return people, dates
+
+
+def compute_tenure(people, dates, as_of):
+    """ต่อคน -> DataFrame ตาม TENURE_COLUMNS"""
+    recorded = dates['retirement_date']
+    projected = np.isnat(recorded)
+    retirement = np.where(projected, projected_retirement(dates['birth_date']), recorded)
+
+    # retirement_date เป็นวันถัดจากสิ้นปีงบ (1 ต.ค.) - ปีงบของวันก่อนหน้า
+    valid = ~np.isnat(retirement)
+    fiscal = np.where(valid, fiscal_year(retirement - np.timedelta64(1, 'D')) + BUDDHIST_OFFSET, 0)
+
+    return pd.DataFrame({
+        'personnel_id': people['id'],
+        'age_years': pd.array(completed_years(dates['birth_date'], as_of), dtype='Int64'),
+        'service_years': elapsed_years(dates['hire_date'], as_of),
+        'years_in_position': elapsed_years(dates['appointed_date'], as_of),
+        'retirement_date': pd.Series(retirement).dt.date.astype(object).where(valid, None),
+        'retirement_fiscal_year': pd.array(np.where(valid, fiscal, np.nan), dtype='Int64'),
+        'retirement_projected': projected & valid,
+    })
+
+
+def compute_forecast(people, tenure, as_of, years=FORECAST_YEARS):
+    """จำนวนผู้เกษียณต่อ บก. ต่อปีงบ (พ.ศ.) ตั้งแต่ปีงบปัจจุบัน years ปี - ทุก บก. มีครบทุกปี (0 ได้)"""
+    first = int(fiscal_year(np.datetime64(as_of, 'D'))) + BUDDHIST_OFFSET
+    fiscal_years = range(first, first + years)
+
+    frame = pd.DataFrame({
+        'headquarters': people['headquarters'].fillna('ไม่ระบุ'),
+        'fiscal_year': tenure['retirement_fiscal_year'],
+        'commissioned': people['rank_type'] == 'สัญญาบัตร',
+        'non_commissioned': people['rank_type'] == 'ประทวน',
+        'service_years': tenure['service_years'],
+    })
+    frame = frame[frame['fiscal_year'].isin(fiscal_years)]
+
+    grouped = frame.groupby(['headquarters', 'fiscal_year']).agg(
+        retirees=('fiscal_year', 'size'),
+        commissioned=('commissioned', 'sum'),
+        non_commissioned=('non_commissioned', 'sum'),
+        average_service_years=('service_years', 'mean'),
+    )
+    grid = pd.MultiIndex.from_product([sorted(people['headquarters'].fillna('ไม่ระบุ').unique()), fiscal_years],
+                                      names=['headquarters', 'fiscal_year'])
+    forecast = grouped.reindex(grid).reset_index()
+    for column in ('retirees', 'commissioned', 'non_commissioned'):
+        forecast[column] = forecast[column].fillna(0).astype(int)
+    forecast['average_service_years'] = forecast['average_service_years'].round(1)
+    return forecast[FORECAST_COLUMNS]
+
+
+def refresh_retirement_forecast(conn, years=FORECAST_YEARS, as_of=None, plan=False):
+    """คำนวณใหม่ทั้งหมดแล้วแทนที่ personnel_tenure / retirement_forecast ใน transaction เดียว"""
+    as_of = as_of or date.today()
+    start = time.perf_counter()
+    cur = conn.cursor()
+    try:
+        people, dates = load_personnel(cur)
+        tenure = compute_tenure(people, dates, as_of)
+        forecast = compute_forecast(people, tenure, as_of, years)
+        if not plan:
+            cur.execute("DELETE FROM personnel_tenure")
+            copy_frame(cur, 'personnel_tenure', tenure, TENURE_COLUMNS)
+            cur.execute("DELETE FROM retirement_forecast")
+            copy_frame(cur, 'retirement_forecast', forecast, FORECAST_COLUMNS)
+            conn.commit()
+            cur.execute("ANALYZE personnel_tenure")
+            cur.execute("ANALYZE retirement_forecast")
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    projected = int(tenure['retirement_projected'].sum())
+    print(f"👴 Retirement forecast: {len(tenure)} personnel ({projected} projected from birth date), "
+          f"{len(forecast)} headquarters/year rows ({time.perf_counter() - start:.2f}s)")
+    return tenure, forecast
+
+
+def print_forecast(forecast):
+    table = forecast.pivot(index='headquarters', columns='fiscal_year', values='retirees')
+    print(f"\n📊 ผู้เกษียณต่อปีงบประมาณ")
+    print(table.to_string())
+    print(f"\n   รวม: " + ', '.join(f"{year}: {int(count)}" for year, count in table.sum().items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh personnel tenure and retirement forecast tables')
+    parser.add_argument('--years', type=int, default=FORECAST_YEARS, help='number of fiscal years to forecast')
+    parser.add_argument('--as-of', type=date.fromisoformat, default=None, help='reference date (YYYY-MM-DD)')
+    parser.add_argument('--plan', action='store_true', help='compute and print without writing')
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        _, forecast = refresh_retirement_forecast(conn, args.years, args.as_of, plan=args.plan)
+    finally:
+        conn.close()
+    print_forecast(forecast)
+
+
+if __name__ == '__main__':
+    main()
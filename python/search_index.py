@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Search Index Builder
+สร้างดัชนีค้นหาภาษาไทย (character n-gram) สำหรับ personnel, equipment, vehicles, building
+
+ภาษาไทยไม่มีการเว้นวรรคระหว่างคำ full-text search และ prefix index จึงใช้ไม่ได้
+สคริปต์นี้ normalize ข้อความแล้วแตกเป็น trigram ลงตาราง search_tokens
+และสร้าง pg_trgm GIN index ให้ ILIKE '%q%' ใช้ index ได้
+
+Usage:
+    python search_index.py                     # สร้างดัชนีทุกตาราง
+    python search_index.py personnel vehicles  # เฉพาะบางตาราง
+    python search_index.py --benchmark         # เปรียบเทียบเวลาค้นหาก่อน/หลัง
+"""
+
+import argparse
+import io
+import os
+import re
+import statistics
+import time
+import unicodedata
+
+import psycopg2
+
+from db_config import DB_CONFIG
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'search-schema.sql')
+
+# ตาราง -> columns ที่ใช้ค้นหา
+SEARCH_ENTITIES = {
+    'personnel': ['full_name', 'position', 'rank'],
+    'equipment': ['item_name', 'equipment_code', 'unit'],
+    'vehicles': ['license_plate', 'brand', 'vehicle_type', 'unit'],
+    'building': ['building_name', 'division', 'subdivision', 'province'],
+}
+
+GRAM_SIZE = 3
+FETCH_SIZE = 5000
+
+# ต้องตรงกับ normalizeSearchText() ใน backend/routes/search.js
+ZERO_WIDTH_RE = re.compile('[\u200b-\u200d\ufeff]')
+SEPARATOR_RE = re.compile(r'[\s.\-()/,\'"\\]+')
+
+
+def normalize_text(value):
+    """Normalize ข้อความไทยก่อนแตก n-gram"""
+    if value is None:
+        return ''
+    text = unicodedata.normalize('NFC', str(value))
+    text = ZERO_WIDTH_RE.sub('', text)
+    text = text.replace('\u0e4d\u0e32', '\u0e33')  # นิคหิต + สระอา -> สระอำ
+    text = text.lower()
+    return SEPARATOR_RE.sub('', text)
+
+
+def ngrams(text, n=GRAM_SIZE):
+    """แตกข้อความเป็น character n-grams (ข้อความสั้นกว่า n ใช้ทั้งคำ)"""
+    if not text:
+        return set()
+    if len(text) < n:
+        return {text}
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def record_grams(values):
+    """รวม n-grams ของทุก column ใน record เดียว"""
+    grams = set()
+    for value in values:
+        grams |= ngrams(normalize_text(value))
+    return grams
+
+
+def ensure_schema(conn):
+    """สร้างตาราง search_tokens และ trigram indexes (ถ้ายังไม่มี)"""
+    with open(SCHEMA_FILE, encoding='utf-8') as f:
+        lines = [line for line in f if not line.lstrip().startswith('--')]
+    statements = [s.strip() for s in ''.join(lines).split(';') if s.strip()]
+
+    cur = conn.cursor()
+    for statement in statements:
+        cur.execute("SAVEPOINT search_schema")
+        try:
+            cur.execute(statement)
+            cur.execute("RELEASE SAVEPOINT search_schema")
+        except psycopg2.Error as e:
+            # pg_trgm อาจไม่ได้เปิดใช้บน Azure - ตาราง token ยังใช้งานได้
+            cur.execute("ROLLBACK TO SAVEPOINT search_schema")
+            print(f"⚠️  Skipped: {statement.splitlines()[0][:70]} ({e.pgerror or e})".strip())
+    cur.close()
+    conn.commit()
+
+
+def build_entity_tokens(conn, entity, columns):
+    """สร้าง token ของตารางเดียว (อ่านด้วย server-side cursor แล้ว COPY เป็นชุด)"""
+    write_cur = conn.cursor()
+    write_cur.execute("DELETE FROM search_tokens WHERE entity = %s", (entity,))
+
+    read_cur = conn.cursor(name=f'search_index_{entity}')
+    read_cur.itersize = FETCH_SIZE
+    read_cur.execute(f"SELECT id, {', '.join(columns)} FROM {entity}")
+
+    row_count = 0
+    token_count = 0
+    buffer = io.StringIO()
+    buffered = 0
+
+    for row in read_cur:
+        row_count += 1
+        for gram in record_grams(row[1:]):
+            buffer.write(f"{entity}\t{row[0]}\t{gram}\n")
+            buffered += 1
+
+        if buffered >= FETCH_SIZE * 10:
+            buffer.seek(0)
+            write_cur.copy_expert("COPY search_tokens (entity, entity_id, gram) FROM STDIN", buffer)
+            token_count += buffered
+            buffer = io.StringIO()
+            buffered = 0
+
+    if buffered:
+        buffer.seek(0)
+        write_cur.copy_expert("COPY search_tokens (entity, entity_id, gram) FROM STDIN", buffer)
+        token_count += buffered
+
+    read_cur.close()
+
+    write_cur.execute("""
+        INSERT INTO search_index_state (entity, built_at, row_count, token_count)
+        VALUES (%s, NOW(), %s, %s)
+        ON CONFLICT (entity) DO UPDATE
+        SET built_at = EXCLUDED.built_at,
+            row_count = EXCLUDED.row_count,
+            token_count = EXCLUDED.token_count
+    """, (entity, row_count, token_count))
+    write_cur.close()
+
+    return row_count, token_count
+
+
+def refresh_search_index(conn, entities=None):
+    """สร้างดัชนีค้นหาใหม่ - เรียกหลัง import เสร็จ"""
+    ensure_schema(conn)
+
+    for entity in entities or SEARCH_ENTITIES:
+        start = time.perf_counter()
+        rows, tokens = build_entity_tokens(conn, entity, SEARCH_ENTITIES[entity])
+        conn.commit()
+        print(f"🔎 {entity}: {rows} records -> {tokens} tokens ({time.perf_counter() - start:.2f}s)")
+
+    cur = conn.cursor()
+    cur.execute("ANALYZE search_tokens")
+    cur.close()
+    conn.commit()
+
+
+# ============================================
+# Benchmark
+# ============================================
+
+LEGACY_QUERY = """
+    SELECT full_name, rank, position, headquarters, department, gender, vacancy_status
+    FROM personnel
+    WHERE (full_name ILIKE %(pattern)s OR position ILIKE %(pattern)s OR rank ILIKE %(pattern)s)
+    ORDER BY full_name
+    LIMIT 100
+"""
+
+TOKEN_QUERY = """
+    SELECT full_name, rank, position, headquarters, department, gender, vacancy_status
+    FROM personnel
+    WHERE (id IN (
+            SELECT entity_id FROM search_tokens
+            WHERE entity = 'personnel' AND gram = ANY(%(grams)s)
+            GROUP BY entity_id
+            HAVING COUNT(DISTINCT gram) = %(gram_count)s
+          )
+          OR updated_at > COALESCE(
+            (SELECT built_at FROM search_index_state WHERE entity = 'personnel'), '-infinity'))
+      AND (full_name ILIKE %(pattern)s OR position ILIKE %(pattern)s OR rank ILIKE %(pattern)s)
+    ORDER BY full_name
+    LIMIT 100
+"""
+
+
+def sample_terms(conn, count=20):
+    """สุ่มคำค้นจากข้อมูลจริง (นามสกุล และชิ้นส่วนของชื่อตำแหน่ง)"""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT full_name, position FROM personnel
+        WHERE full_name IS NOT NULL AND full_name <> 'ตำแหน่งว่าง'
+        ORDER BY random()
+        LIMIT %s
+    """, (count,))
+    terms = []
+    for full_name, position in cur.fetchall():
+        parts = full_name.split()
+        terms.append(parts[-1] if parts else full_name)
+        if position and len(position) >= 6:
+            terms.append(position[:6])
+    cur.close()
+    return [t for t in terms if len(normalize_text(t)) >= GRAM_SIZE]
+
+
+def time_queries(conn, sql, terms, repeat=3, seq_scan_only=False):
+    """วัดเวลา (ms) ของ query สำหรับทุกคำค้น คืนค่า median"""
+    cur = conn.cursor()
+    if seq_scan_only:
+        cur.execute("SET enable_bitmapscan TO off")
+        cur.execute("SET enable_indexscan TO off")
+
+    timings = []
+    for term in terms:
+        grams = sorted(ngrams(normalize_text(term)))
+        params = {'pattern': f'%{term}%', 'grams': grams, 'gram_count': len(grams)}
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cur.execute(sql, params)
+            cur.fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+
+    cur.execute("RESET enable_bitmapscan")
+    cur.execute("RESET enable_indexscan")
+    cur.close()
+    conn.rollback()
+    return statistics.median(timings), max(timings)
+
+
+def run_benchmark(conn):
+    """เปรียบเทียบ ILIKE แบบ sequential scan กับ trigram index และ token table"""
+    terms = sample_terms(conn)
+    if not terms:
+        print("❌ No personnel data to benchmark")
+        return
+
+    print(f"📋 {len(terms)} search terms, e.g. {terms[:5]}")
+
+    before = time_queries(conn, LEGACY_QUERY, terms, seq_scan_only=True)
+    refresh_search_index(conn, ['personnel'])
+    trgm = time_queries(conn, LEGACY_QUERY, terms)
+    tokens = time_queries(conn, TOKEN_QUERY, terms)
+
+    print(f"""
+📊 Search latency (median / max, ms)
+   ILIKE sequential scan (before): {before[0]:8.2f} / {before[1]:8.2f}
+   ILIKE + pg_trgm GIN index:      {trgm[0]:8.2f} / {trgm[1]:8.2f}
+   search_tokens prefilter:        {tokens[0]:8.2f} / {tokens[1]:8.2f}
+""")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build Thai n-gram search index')
+    parser.add_argument('entities', nargs='*', help=f"tables to index: {', '.join(SEARCH_ENTITIES)} (default: all)")
+    parser.add_argument('--benchmark', action='store_true', help='compare search latency before/after')
+    args = parser.parse_args()
+
+    unknown = [e for e in args.entities if e not in SEARCH_ENTITIES]
+    if unknown:
+        parser.error(f"unknown table: {', '.join(unknown)}")
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        if args.benchmark:
+            run_benchmark(conn)
+        else:
+            refresh_search_index(conn, args.entities or None)
+            print("✅ Search index updated")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Statistics Snapshot Exporter
+คำนวณสถิติ dashboard ทั้งหมดครั้งเดียว แล้วเขียนเป็น JSON snapshot
+
+แทนที่การรัน COUNT(*) FILTER (...) หลายสิบ query ทุกครั้งที่เปิด dashboard
+- อ่านแต่ละตารางครั้งเดียวด้วย server-side cursor
+- รวมสถิติด้วย pandas/NumPy
+- เขียน snapshot แบบมี version + checksum (ใช้เป็น ETag ใน /api/statistics/snapshot)
+
+Usage:
+    python stats_snapshot.py [--output DIR]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from db_config import DB_CONFIG
+
+SCHEMA_VERSION = 1
+FETCH_SIZE = 5000
+
+DEFAULT_OUTPUT_DIR = os.getenv(
+    'STATS_SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'snapshots', 'stats')
+)
+
+# ต้องตรงกับ getHeadquartersOrder() ใน backend/routes/statistics.js
+HEADQUARTERS_ORDER = [
+    'ส่วนบังคับบัญชา', 'บก.อก.', 'พฐก.', 'ทว.',
+    'ศพฐ.1', 'ศพฐ.2', 'ศพฐ.3', 'ศพฐ.4', 'ศพฐ.5',
+    'ศพฐ.6', 'ศพฐ.7', 'ศพฐ.8', 'ศพฐ.9', 'ศพฐ.10', 'สฝจ.'
+]
+
+# หน่วยที่แสดงเป็น main card แยกจาก ส่วนบังคับบัญชา
+SPECIAL_DEPARTMENTS = ['กพอ.', 'ศขบ.']
+
+TABLE_COLUMNS = {
+    'personnel': ['headquarters', 'department', 'gender', 'rank_type', 'vacancy_status'],
+    'housing': ['division', 'housing_type', 'budget_year', 'total_rooms', 'occupied_rooms',
+                'vacant_rooms', 'damaged_rooms', 'under_construction', 'authorized_quota',
+                'current_occupants', 'entitled_stay', 'private_housing', 'rent_allowance',
+                'other_agency', 'shortage'],
+    'budget': ['division', 'status', 'status_group', 'budget_type', 'project_type',
+               'contract_amount', 'fiscal_year_start'],
+}
+
+
+def read_table(conn, table, columns):
+    """อ่านทั้งตารางด้วย server-side cursor ตัวเดียว"""
+    cur = conn.cursor(name=f'stats_snapshot_{table}')
+    cur.itersize = FETCH_SIZE
+    cur.execute(f"SELECT {', '.join(columns)} FROM {table}")
+
+    chunks = []
+    while True:
+        rows = cur.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        chunks.append(pd.DataFrame.from_records(rows, columns=columns))
+    cur.close()
+
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def to_records(df):
+    """DataFrame -> list of dict ที่ json.dumps ได้ (NaN -> None, numpy -> python)"""
+    df = df.astype(object).where(pd.notna(df), None)
+    return [
+        {k: (v.item() if isinstance(v, np.generic) else v) for k, v in row.items()}
+        for row in df.to_dict('records')
+    ]
+
+
+def hq_sort_key(series):
+    """ลำดับหน่วยงานตาม HEADQUARTERS_ORDER (หน่วยอื่นอยู่ท้าย)"""
+    order = {name: i for i, name in enumerate(HEADQUARTERS_ORDER)}
+    return series.map(lambda v: order.get(v, len(order)))
+
+
+# ============================================
+# Personnel
+# ============================================
+
+PERSONNEL_FLAGS = ['occupied', 'vacant', 'male', 'female', 'sanyabat', 'pratawan']
+
+
+def personnel_flags(df):
+    """คำนวณ column 0/1 ของแต่ละเงื่อนไข FILTER แบบ vectorized"""
+    occupied = (df['vacancy_status'] == 'คนครอง').to_numpy()
+    flags = pd.DataFrame({
+        'headquarters': df['headquarters'],
+        'department': df['department'],
+        'total': 1,
+        'occupied': occupied,
+        'vacant': (df['vacancy_status'] == 'ตำแหน่งว่าง').to_numpy(),
+        'male': occupied & (df['gender'] == 'ชาย').to_numpy(),
+        'female': occupied & (df['gender'] == 'หญิง').to_numpy(),
+        'sanyabat': (df['rank_type'] == 'สัญญาบัตร').to_numpy(),
+        'pratawan': (df['rank_type'] == 'ประทวน').to_numpy(),
+    })
+    flags[PERSONNEL_FLAGS] = flags[PERSONNEL_FLAGS].astype(np.int64)
+    return flags
+
+
+def personnel_stats(df):
+    """สถิติกำลังพล: summary, departments, department detail, organization"""
+    flags = personnel_flags(df)
+    counted = ['total'] + PERSONNEL_FLAGS
+    known = flags[flags['headquarters'].notna() & (flags['headquarters'] != 'ไม่ระบุ')]
+
+    summary = {k: int(v) for k, v in known[counted].sum().items()}
+    summary['vacant_sanyabat'] = int((known['vacant'] & known['sanyabat']).sum())
+    summary['vacant_pratawan'] = int((known['vacant'] & known['pratawan']).sum())
+
+    by_hq = known.groupby('headquarters', sort=False)[counted].sum().reset_index()
+    by_hq = by_hq.sort_values('headquarters', key=hq_sort_key, kind='stable')
+
+    special = flags[(flags['headquarters'] == 'ส่วนบังคับบัญชา')
+                    & flags['department'].isin(SPECIAL_DEPARTMENTS)]
+    by_special = special.groupby('department')[counted].sum().reset_index()
+
+    departments = to_records(by_hq.rename(columns={'headquarters': 'dept'})) + \
+        to_records(by_special.rename(columns={'department': 'dept'}))
+
+    # รายละเอียดรายหน่วย + หน่วยย่อย
+    by_dept = (flags[flags['department'].notna()]
+               .groupby(['headquarters', 'department'])[counted].sum().reset_index())
+    detail = {}
+    for hq, group in flags.groupby('headquarters'):
+        subs = by_dept[by_dept['headquarters'] == hq]
+        if hq == 'ส่วนบังคับบัญชา':
+            subs = subs[~subs['department'].isin(SPECIAL_DEPARTMENTS)]
+        detail[hq] = {
+            'stats': {k: int(v) for k, v in group[counted].sum().items()},
+            'subDepartments': to_records(
+                subs[['department', 'total', 'sanyabat', 'pratawan', 'vacant']]
+                .rename(columns={'department': 'dept'})),
+        }
+    for dept, group in special.groupby('department'):
+        detail[dept] = {
+            'stats': {k: int(v) for k, v in group[counted].sum().items()},
+            'subDepartments': [],
+        }
+
+    organization = []
+    for _, hq in by_hq.iterrows():
+        subs = by_dept[by_dept['headquarters'] == hq['headquarters']]
+        organization.append({
+            'headquarters': hq['headquarters'],
+            'total': int(hq['total']),
+            'dept_count': int(len(subs)),
+            'departments': [{'name': d, 'count': int(c)} for d, c in zip(subs['department'], subs['total'])],
+        })
+
+    return {
+        'summary': summary,
+        'departments': departments,
+        'department': detail,
+        'organization': organization,
+    }
+
+
+# ============================================
+# Housing / Budget
+# ============================================
+
+HOUSING_SUMS = {
+    'total_rooms': 'total_rooms', 'occupied_rooms': 'occupied_rooms',
+    'vacant_rooms': 'vacant_rooms', 'damaged_rooms': 'damaged_rooms',
+    'under_construction': 'under_construction', 'authorized_quota': 'total_authorized',
+    'current_occupants': 'total_occupants', 'entitled_stay': 'total_entitled',
+    'private_housing': 'total_private', 'rent_allowance': 'total_rent_allowance',
+    'other_agency': 'total_other_agency', 'shortage': 'total_shortage',
+}
+
+
+def housing_stats(df):
+    """สถิติที่พักอาศัย (ตรงกับ GET /api/housing/stats แบบไม่กรอง)"""
+    numeric = list(HOUSING_SUMS)
+    df = df.copy()
+    df[numeric] = df[numeric].apply(pd.to_numeric, errors='coerce').fillna(0).astype(np.int64)
+
+    totals = {HOUSING_SUMS[k]: int(v) for k, v in df[numeric].sum().items()}
+    totals['total_records'] = int(len(df))
+
+    by_type = (df.groupby('housing_type', dropna=False)
+               .agg(count=('total_rooms', 'size'), total_rooms=('total_rooms', 'sum'),
+                    damaged_rooms=('damaged_rooms', 'sum'),
+                    under_construction=('under_construction', 'sum'),
+                    entitled_stay=('entitled_stay', 'sum'))
+               .reset_index().sort_values('total_rooms', ascending=False))
+
+    division_cols = [c for c in numeric if c not in ('under_construction', 'entitled_stay')]
+    by_division = df.groupby('division', dropna=False)[division_cols].sum()
+    by_division.insert(0, 'count', df.groupby('division', dropna=False).size())
+    by_division = by_division.reset_index().sort_values('division')
+
+    with_year = df[df['budget_year'].notna()].astype({'budget_year': np.int64})
+    by_year = (with_year.groupby('budget_year')
+               .agg(count=('total_rooms', 'size'), total_rooms=('total_rooms', 'sum'))
+               .reset_index().rename(columns={'budget_year': 'year'})
+               .sort_values('year', ascending=False))
+
+    # หน่วยที่ขาดแคลนที่พัก
+    shortage = by_division[by_division['shortage'] > 0][['division', 'authorized_quota', 'shortage']]
+
+    return {
+        **totals,
+        'byType': to_records(by_type),
+        'byDivision': to_records(by_division),
+        'byYear': to_records(by_year),
+        'yearsInRange': int(len(by_year)),
+        'yearsList': [int(y) for y in by_year['year']],
+        'shortageByDivision': to_records(shortage.sort_values('shortage', ascending=False)),
+    }
+
+
+def budget_stats(df):
+    """สถิติงบลงทุน (ตรงกับ GET /api/budget/stats แบบไม่กรอง)"""
+    df = df.copy()
+    df['contract_amount'] = pd.to_numeric(df['contract_amount'], errors='coerce').fillna(0.0).astype(float)
+    signed = (df['status_group'] == 'signed').to_numpy()
+    df['signed'] = signed.astype(np.int64)
+    df['signed_amount'] = np.where(signed, df['contract_amount'], 0.0)
+
+    totals = {
+        'total_records': int(len(df)),
+        'total_signed': int(signed.sum()),
+        'total_pending': int((~signed).sum()),
+        'total_single_year': int((df['budget_type'] == 'งบปีเดียว').sum()),
+        'total_multi_year': int((df['budget_type'] == 'งบผูกพัน').sum()),
+        'total_project': int((df['project_type'] == 'โครงการ').sum()),
+        'total_item': int((df['project_type'] == 'รายการ').sum()),
+        'total_signed_amount': round(float(df['signed_amount'].sum()), 2),
+        'total_amount': round(float(df['contract_amount'].sum()), 2),
+    }
+
+    def grouped(keys, **aggs):
+        result = df.groupby(keys, dropna=False).agg(**aggs).reset_index()
+        return to_records(result.sort_values('count', ascending=False, kind='stable'))
+
+    years = sorted({int(y) for y in df['fiscal_year_start'].dropna()}, reverse=True)
+
+    return {
+        **totals,
+        'byDivision': grouped('division', count=('signed', 'size'), signed_count=('signed', 'sum'),
+                              signed_amount=('signed_amount', 'sum'), total_amount=('contract_amount', 'sum')),
+        'byStatus': grouped(['status', 'status_group'], count=('signed', 'size'), amount=('contract_amount', 'sum')),
+        'byBudgetType': grouped('budget_type', count=('signed', 'size'), amount=('contract_amount', 'sum')),
+        'byProjectType': grouped('project_type', count=('signed', 'size'), amount=('contract_amount', 'sum')),
+        'yearsInRange': len(years),
+        'yearsList': years,
+    }
+
+
+# ============================================
+# Snapshot file
+# ============================================
+
+def canonical_json(data):
+    """JSON แบบ compact และเรียง key คงที่ เพื่อให้ checksum เหมือนเดิมถ้าข้อมูลไม่เปลี่ยน"""
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def load_latest(output_dir):
+    path = os.path.join(output_dir, 'latest.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_snapshot(data, output_dir):
+    """เขียน snapshot ใหม่ (ข้ามถ้า checksum เท่าเดิม) และชี้ latest.json ไปที่ไฟล์ใหม่"""
+    os.makedirs(output_dir, exist_ok=True)
+
+    body = canonical_json(data)
+    checksum = hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+    latest = load_latest(output_dir)
+    if latest and latest.get('checksum') == checksum and latest.get('schema_version') == SCHEMA_VERSION:
+        print(f"ℹ️  No changes since version {latest['version']} ({checksum[:12]})")
+        return latest['version'], checksum, False
+
+    version = (latest['version'] + 1) if latest else 1
+    generated_at = datetime.now().isoformat(timespec='seconds')
+    envelope = (
+        '{"checksum":' + json.dumps(checksum)
+        + ',"data":' + body
+        + ',"generated_at":' + json.dumps(generated_at)
+        + ',"schema_version":' + str(SCHEMA_VERSION)
+        + ',"version":' + str(version) + '}'
+    )
+
+    filename = f"stats-v{version:05d}.json"
+    with open(os.path.join(output_dir, filename), 'w', encoding='utf-8') as f:
+        f.write(envelope)
+
+    # เขียนไฟล์ชั่วคราวแล้ว rename เพื่อให้ API ไม่เห็นไฟล์ครึ่งๆ กลางๆ
+    tmp_path = os.path.join(output_dir, 'latest.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(envelope)
+    os.replace(tmp_path, os.path.join(output_dir, 'latest.json'))
+
+    return version, checksum, True
+
+
+def build_snapshot(conn):
+    """อ่านทุกตารางครั้งเดียวแล้วคำนวณสถิติทั้งหมด"""
+    frames = {table: read_table(conn, table, columns) for table, columns in TABLE_COLUMNS.items()}
+    conn.rollback()
+    for table, df in frames.items():
+        print(f"📥 {table}: {len(df)} rows")
+
+    return {
+        'personnel': personnel_stats(frames['personnel']),
+        'housing': housing_stats(frames['housing']),
+        'budget': budget_stats(frames['budget']),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export precomputed dashboard statistics')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_DIR, help='snapshot directory')
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        data = build_snapshot(conn)
+    finally:
+        conn.close()
+
+    version, checksum, written = write_snapshot(data, args.output)
+    if written:
+        print(f"✅ Snapshot v{version} written to {args.output} (checksum {checksum[:12]})")
+
+
+if __name__ == '__main__':
+    main()
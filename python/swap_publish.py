@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Swap-table Publishing
+โหลดข้อมูลชุดใหม่ทั้งตารางโดยผู้อ่าน (API) ไม่เห็นตารางว่างหรือครึ่งตาราง
+
+1. สร้าง <table>_staging แบบ UNLOGGED ไม่มี index (LIKE <table>) แล้ว COPY เข้าเต็มความเร็ว
+   (ImportAudit ที่มี dataset= บันทึก change log จาก snapshot ตารางจริงเทียบกับ staging)
+2. SET LOGGED แล้วสร้าง constraint / index / trigger / สิทธิ์ ตามตารางจริงหลังโหลดเสร็จ
+3. transaction สั้น ๆ: RENAME ตารางจริงออก, RENAME staging เข้า, ย้าย sequence,
+   สร้าง foreign key ของตารางลูกใหม่, DROP ตารางเก่า - ผู้อ่านรอแค่ช่วง RENAME
+   และไม่มี dead tuple จาก DELETE ทั้งตาราง
+
+ตารางลูกที่อ้างถึงด้วย ON DELETE CASCADE จะถูกลบแถวที่ไม่มี parent แล้ว
+(ผลเดียวกับ DELETE FROM <table> เดิม) - ตารางที่มี view อ้างถึงใช้โหมดนี้ไม่ได้
+
+    bytes_sent = publish_frame(conn, 'equipment', df, EQUIPMENT.copy_columns, audit)
+    loaded = publish(conn, 'building', lambda cur, staging: load_csv(cur, BUILDING, path, staging), audit)
+"""
+
+import re
+import time
+from contextlib import nullcontext
+
+import psycopg2
+from psycopg2 import sql
+
+from copy_stream import copy_frame
+
+STAGING_SUFFIX = '_staging'
+RETIRED_SUFFIX = '_retired'
+INDEX_SUFFIX = '_swap'
+
+LOCK_TIMEOUT = '5s'
+SWAP_ATTEMPTS = 5
+
+
+class SwapNotSupported(Exception):
+    pass
+
+
+def staging_name(table):
+    return f"{table}{STAGING_SUFFIX}"
+
+
+def _ident(*names):
+    return sql.SQL('.').join(map(sql.Identifier, names))
+
+
+# ============================================
+# Catalog
+# ============================================
+
+def dependent_views(cur, table):
+    cur.execute("""
+        SELECT DISTINCT v.oid::regclass::text
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        JOIN pg_class v ON v.oid = r.ev_class
+        WHERE d.refobjid = %s::regclass AND v.oid <> d.refobjid
+    """, (table,))
+    return [r[0] for r in cur.fetchall()]
+
+
+def table_constraints(cur, table):
+    """primary key / unique / exclusion ของตาราง -> [(ชื่อ, definition)] (CHECK/NOT NULL มากับ LIKE แล้ว)"""
+    cur.execute("""
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'x')
+        ORDER BY contype, conname
+    """, (table,))
+    return cur.fetchall()
+
+
+def outgoing_foreign_keys(cur, table):
+    cur.execute("""
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+        ORDER BY conname
+    """, (table,))
+    return cur.fetchall()
+
+
+def incoming_foreign_keys(cur, table):
+    """foreign key ของตารางลูก -> [(ตารางลูก, ชื่อ, definition, on delete, columns ลูก, columns แม่)]"""
+    cur.execute("""
+        SELECT c.conrelid::regclass::text, c.conname, pg_get_constraintdef(c.oid), c.confdeltype,
+               ARRAY(SELECT attname FROM pg_attribute
+                     WHERE attrelid = c.conrelid AND attnum = ANY(c.conkey) ORDER BY attnum),
+               ARRAY(SELECT attname FROM pg_attribute
+                     WHERE attrelid = c.confrelid AND attnum = ANY(c.confkey) ORDER BY attnum)
+        FROM pg_constraint c
+        WHERE c.confrelid = %s::regclass AND c.contype = 'f' AND c.conrelid <> c.confrelid
+        ORDER BY c.conname
+    """, (table,))
+    return cur.fetchall()
+
+
+def plain_indexes(cur, table):
+    """index ที่ไม่ได้มาจาก constraint -> [(ชื่อ, CREATE INDEX ...)]"""
+    cur.execute("""
+        SELECT c.relname, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conindid = i.indexrelid)
+        ORDER BY c.relname
+    """, (table,))
+    return cur.fetchall()
+
+
+def table_triggers(cur, table):
+    cur.execute("""
+        SELECT tgname, pg_get_triggerdef(oid)
+        FROM pg_trigger
+        WHERE tgrelid = %s::regclass AND NOT tgisinternal
+        ORDER BY tgname
+    """, (table,))
+    return cur.fetchall()
+
+
+def table_grants(cur, table):
+    """[(สิทธิ์, ผู้รับ)] จาก ACL ของตาราง (เจ้าของไม่ต้อง GRANT)"""
+    cur.execute("""
+        SELECT a.privilege_type, CASE WHEN a.grantee = 0 THEN 'PUBLIC' ELSE pg_get_userbyid(a.grantee) END
+        FROM pg_class c, aclexplode(c.relacl) a
+        WHERE c.oid = %s::regclass AND a.grantee <> c.relowner
+    """, (table,))
+    return cur.fetchall()
+
+
+def owned_sequences(cur, table):
+    """sequence ของ SERIAL -> [(sequence, column)] (ต้องย้ายเจ้าของก่อน DROP ตารางเก่า)"""
+    cur.execute("""
+        SELECT s.oid::regclass::text, a.attname
+        FROM pg_class s
+        JOIN pg_depend d ON d.objid = s.oid AND d.classid = 'pg_class'::regclass AND d.deptype = 'a'
+        JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+        WHERE s.relkind = 'S' AND d.refobjid = %s::regclass
+    """, (table,))
+    return cur.fetchall()
+
+
+def _retarget(definition, table, staging):
+    """เปลี่ยน 'ON [schema.]table' ใน DDL ที่ได้จาก pg_get_*def ให้ชี้ไป staging"""
+    return re.sub(rf'\bON (\w+\.)?{re.escape(table)}\b', lambda m: f"ON {m.group(1) or ''}{staging}", definition, count=1)
+
+
+# ============================================
+# Staging
+# ============================================
+
+def prepare_staging(cur, table):
+    """สร้าง <table>_staging เปล่า แบบ UNLOGGED ไม่มี index (ลบของเก่าที่ค้างอยู่ก่อน)"""
+    views = dependent_views(cur, table)
+    if views:
+        raise SwapNotSupported(f"{table} is used by views ({', '.join(views)}) - use DELETE publishing")
+
+    staging = staging_name(table)
+    cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(staging)))
+    cur.execute(sql.SQL(
+        "CREATE UNLOGGED TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)"
+    ).format(sql.Identifier(staging), sql.Identifier(table)))
+    return staging
+
+
+def finish_staging(cur, table):
+    """หลังโหลดเสร็จ: SET LOGGED + constraint / index / trigger / สิทธิ์ ตามตารางจริง"""
+    staging = staging_name(table)
+    cur.execute(sql.SQL("ALTER TABLE {} SET LOGGED").format(sql.Identifier(staging)))
+
+    for name, definition in table_constraints(cur, table) + outgoing_foreign_keys(cur, table):
+        cur.execute(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} ").format(
+            sql.Identifier(staging), sql.Identifier(name + INDEX_SUFFIX)) + sql.SQL(definition))
+    for name, definition in plain_indexes(cur, table):
+        definition = _retarget(definition, table, staging)
+        definition = definition.replace(f"INDEX {name} ", f"INDEX {name}{INDEX_SUFFIX} ", 1)
+        cur.execute(definition)
+    for name, definition in table_triggers(cur, table):
+        cur.execute(_retarget(definition, table, staging).replace(
+            f"TRIGGER {name} ", f"TRIGGER {name}{INDEX_SUFFIX} ", 1))
+    for privilege, grantee in table_grants(cur, table):
+        grantee = sql.SQL('PUBLIC') if grantee == 'PUBLIC' else sql.Identifier(grantee)
+        cur.execute(sql.SQL("GRANT {} ON {} TO {}").format(sql.SQL(privilege), sql.Identifier(staging), grantee))
+
+    cur.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(staging)))
+
+
+# ============================================
+# Swap
+# ============================================
+
+def _rename_swapped(cur, table):
+    """ชื่อ constraint / index / trigger ที่ลงท้าย _swap กลับเป็นชื่อเดิม (หลัง DROP ตารางเก่า)"""
+    cur.execute("""
+        SELECT 'constraint', conname FROM pg_constraint WHERE conrelid = %(t)s::regclass
+        UNION ALL
+        SELECT 'index', c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %(t)s::regclass
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conindid = i.indexrelid)
+        UNION ALL
+        SELECT 'trigger', tgname FROM pg_trigger WHERE tgrelid = %(t)s::regclass AND NOT tgisinternal
+    """, {'t': table})
+    for kind, name in cur.fetchall():
+        if not name.endswith(INDEX_SUFFIX):
+            continue
+        original = sql.Identifier(name[:-len(INDEX_SUFFIX)])
+        if kind == 'constraint':
+            statement = sql.SQL("ALTER TABLE {} RENAME CONSTRAINT {} TO {}").format(
+                sql.Identifier(table), sql.Identifier(name), original)
+        elif kind == 'index':
+            statement = sql.SQL("ALTER INDEX {} RENAME TO {}").format(sql.Identifier(name), original)
+        else:
+            statement = sql.SQL("ALTER TRIGGER {} ON {} RENAME TO {}").format(
+                sql.Identifier(name), sql.Identifier(table), original)
+        cur.execute(statement)
+
+
+def _reattach_children(cur, table, children):
+    """สร้าง foreign key ของตารางลูกใหม่ให้ชี้ตารางที่ swap เข้ามา -> จำนวนแถวลูกที่ถูกลบ/ตั้งเป็น NULL"""
+    affected = 0
+    for child, name, definition, on_delete, child_columns, parent_columns in children:
+        match = sql.SQL(' AND ').join(
+            sql.SQL("p.{} = c.{}").format(sql.Identifier(pc), sql.Identifier(cc))
+            for cc, pc in zip(child_columns, parent_columns))
+        orphan = sql.SQL("{} AND NOT EXISTS (SELECT 1 FROM {} p WHERE {})").format(
+            sql.SQL(' AND ').join(sql.SQL("c.{} IS NOT NULL").format(sql.Identifier(cc)) for cc in child_columns),
+            sql.Identifier(table), match)
+        child_table = sql.SQL(child)  # regclass text - quote แล้วถ้าจำเป็น
+        if on_delete == 'c':
+            cur.execute(sql.SQL("DELETE FROM {} c WHERE {}").format(child_table, orphan))
+            affected += cur.rowcount
+        elif on_delete == 'n':
+            cur.execute(sql.SQL("UPDATE {} c SET {} WHERE {}").format(
+                child_table,
+                sql.SQL(', ').join(sql.SQL("{} = NULL").format(sql.Identifier(cc)) for cc in child_columns),
+                orphan))
+            affected += cur.rowcount
+        else:
+            cur.execute(sql.SQL("SELECT COUNT(*) FROM {} c WHERE {}").format(child_table, orphan))
+            if cur.fetchone()[0]:
+                raise SwapNotSupported(f"{child} rows still reference replaced {table} rows ({name})")
+        cur.execute(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} ").format(child_table, sql.Identifier(name))
+                    + sql.SQL(definition))
+    return affected
+
+
+def swap_in(cur, table):
+    """
+    เปลี่ยน staging เป็นตารางจริง (ต้องอยู่ใน transaction เดียวกันแล้วให้ผู้เรียก commit)
+    -> จำนวนแถวในตารางลูกที่ได้รับผล
+    """
+    staging = staging_name(table)
+    retired = f"{table}{RETIRED_SUFFIX}"
+    cur.execute(sql.SQL("SET LOCAL lock_timeout = {}").format(sql.Literal(LOCK_TIMEOUT)))
+    cur.execute(sql.SQL("LOCK TABLE {} IN ACCESS EXCLUSIVE MODE").format(sql.Identifier(table)))
+
+    children = incoming_foreign_keys(cur, table)
+    sequences = owned_sequences(cur, table)
+    for child, name, *_ in children:
+        cur.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(sql.SQL(child), sql.Identifier(name)))
+
+    cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(sql.Identifier(table), sql.Identifier(retired)))
+    cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(sql.Identifier(staging), sql.Identifier(table)))
+    for sequence, column in sequences:
+        cur.execute(sql.SQL("ALTER SEQUENCE {} OWNED BY {}").format(sql.SQL(sequence), _ident(table, column)))
+    cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(retired)))
+
+    _rename_swapped(cur, table)
+    return _reattach_children(cur, table, children)
+
+
+def publish_frame(conn, table, frame, columns, audit=None):
+    """
+    โหลด frame ผ่าน staging แล้ว swap -> จำนวน bytes ที่ COPY
+    audit (ImportAudit) ถูก flush ใน transaction เดียวกับการ swap
+    """
+    def load(cur, staging):
+        return {'count': len(frame), 'bytes': copy_frame(cur, staging, frame, columns)}
+
+    return publish(conn, table, load, audit)['bytes']
+
+
+def publish(conn, table, load, audit=None):
+    """
+    load(cur, ชื่อตาราง staging) -> dict ของ field ใน audit step 'stage' (เช่น count, bytes)
+    เช่น csv_reader.load_csv ที่ stream ไฟล์เข้า staging โดยไม่สร้าง DataFrame ทั้งไฟล์ -> dict นั้น
+    """
+    cur = conn.cursor()
+    try:
+        with _step(audit, 'stage') as event:
+            prepare_staging(cur, table)
+            with _changes(audit, cur, staging_name(table)):
+                loaded = load(cur, staging_name(table))
+            event.update(loaded)
+        with _step(audit, 'index'):
+            finish_staging(cur, table)
+        conn.commit()
+
+        for attempt in range(1, SWAP_ATTEMPTS + 1):
+            try:
+                with _step(audit, 'swap') as event:
+                    event['children'] = swap_in(cur, table)
+                if audit is not None:
+                    audit.flush(cur)
+                conn.commit()
+                break
+            except psycopg2.errors.LockNotAvailable:
+                conn.rollback()
+                if attempt == SWAP_ATTEMPTS:
+                    raise
+                print(f"⏳ {table} is busy - retrying swap ({attempt}/{SWAP_ATTEMPTS})")
+                time.sleep(attempt)
+    except Exception:
+        conn.rollback()
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(staging_name(table))))
+        conn.commit()
+        raise
+    finally:
+        cur.close()
+    return loaded
+
+
+def _step(audit, event, **fields):
+    return audit.step(event, **fields) if audit is not None else nullcontext({})
+
+
+def _changes(audit, cur, staging):
+    """change log: ตารางจริงก่อนโหลด เทียบกับ staging หลังโหลด (ImportAudit ที่ส่ง dataset=)"""
+    return audit.changes(cur, staging) if audit is not None else nullcontext()
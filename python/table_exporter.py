@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Table Exporter
+ส่งออกตาราง (personnel, equipment, vehicles, ...) เป็น .xlsx หรือ .csv
+
+อ่านผ่าน server-side (named) cursor ทีละชุด แล้วเขียนแบบ streaming
+(openpyxl write-only / csv.writer) หน่วยความจำคงที่ไม่ขึ้นกับขนาดตาราง
+หลายตารางเขียนพร้อมกันใน worker processes
+
+Usage:
+    python table_exporter.py personnel equipment vehicles --format xlsx
+    python table_exporter.py personnel --headquarters ศพฐ.1 --format csv
+    python table_exporter.py equipment --division "ฝทส.บก.อก.สพฐ.ตร." --fetch-size 2000
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import psycopg2
+from psycopg2 import sql
+from openpyxl import Workbook
+
+from db_config import DB_CONFIG
+
+DEFAULT_FETCH_SIZE = 2000
+
+# ตาราง -> column ที่ใช้กรองตาม บก. (headquarters) และหน่วยย่อย (division)
+EXPORT_TABLES = {
+    'personnel': {'headquarters': 'headquarters', 'division': 'department'},
+    'equipment': {'headquarters': 'division', 'division': 'unit'},
+    'vehicles': {'headquarters': 'department_code', 'division': 'unit'},
+    'housing': {'headquarters': 'division', 'division': 'subdivision'},
+    'building': {'headquarters': 'division', 'division': 'subdivision'},
+    'budget': {'headquarters': 'division', 'division': None},
+    'secondment': {'headquarters': 'origin_unit', 'division': None},
+}
+
+
+def build_query(table, headquarters=None, division=None):
+    """สร้าง SELECT พร้อมเงื่อนไขกรอง"""
+    filters = EXPORT_TABLES[table]
+    conditions = []
+    params = []
+
+    for key, value in (('headquarters', headquarters), ('division', division)):
+        if value is None:
+            continue
+        column = filters[key]
+        if column is None:
+            raise ValueError(f"{table} cannot be filtered by {key}")
+        conditions.append(sql.SQL("{} = %s").format(sql.Identifier(column)))
+        params.append(value)
+
+    query = sql.SQL("SELECT * FROM {}").format(sql.Identifier(table))
+    if conditions:
+        query += sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions)
+    query += sql.SQL(" ORDER BY id")
+    return query, params
+
+
+def iter_batches(cur, fetch_size):
+    while True:
+        rows = cur.fetchmany(fetch_size)
+        if not rows:
+            break
+        yield rows
+
+
+def write_xlsx(path, table, header, batches):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=table[:31])
+    ws.append(header)
+    count = 0
+    for rows in batches:
+        for row in rows:
+            ws.append(row)
+        count += len(rows)
+    wb.save(path)
+    return count
+
+
+def write_csv(path, table, header, batches, delimiter=','):
+    count = 0
+    # utf-8-sig ให้ Excel เปิดภาษาไทยได้ถูกต้อง
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerow(header)
+        for rows in batches:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+WRITERS = {
+    'xlsx': write_xlsx,
+    'csv': write_csv,
+}
+
+
+def output_path(output_dir, table, fmt, headquarters=None, division=None):
+    parts = [table] + [p for p in (headquarters, division) if p]
+    name = '_'.join(parts).replace('/', '-').replace(' ', '')
+    return os.path.join(output_dir, f"{name}.{fmt}")
+
+
+def export_table(table, fmt='xlsx', output_dir='.', headquarters=None, division=None,
+                 fetch_size=DEFAULT_FETCH_SIZE):
+    """ส่งออกตารางเดียว (ทำงานใน worker process - เปิด connection ของตัวเอง)"""
+    start = time.perf_counter()
+    query, params = build_query(table, headquarters, division)
+    path = output_path(output_dir, table, fmt, headquarters, division)
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        cur = conn.cursor(name=f'export_{table}')
+        cur.itersize = fetch_size
+        cur.execute(query, params)
+
+        # named cursor ได้ description หลัง fetch ครั้งแรก
+        first = cur.fetchmany(fetch_size)
+        header = [col.name for col in cur.description]
+
+        def batches():
+            if first:
+                yield first
+                yield from iter_batches(cur, fetch_size)
+
+        count = WRITERS[fmt](path, table, header, batches())
+        cur.close()
+    finally:
+        conn.close()
+
+    return table, path, count, time.perf_counter() - start
+
+
+def export_tables(tables, fmt='xlsx', output_dir='.', headquarters=None, division=None,
+                  fetch_size=DEFAULT_FETCH_SIZE, jobs=None):
+    """ส่งออกหลายตารางพร้อมกัน -> (ผลของตารางที่สำเร็จ, {ตารางที่ล้มเหลว: error})"""
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = jobs or min(len(tables), os.cpu_count() or 1)
+    results = []
+    failures = {}
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(export_table, table, fmt, output_dir, headquarters, division, fetch_size): table
+            for table in tables
+        }
+        for future in as_completed(futures):
+            table = futures[future]
+            try:
+                results.append(future.result())
+                _, path, count, elapsed = results[-1]
+                print(f"✅ {table}: {count} rows -> {path} ({elapsed:.2f}s)")
+            except Exception as e:
+                failures[table] = str(e)
+                print(f"❌ {table}: {e}")
+
+    return results, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export tables to xlsx/csv with constant memory')
+    parser.add_argument('tables', nargs='+', help=f"tables: {', '.join(EXPORT_TABLES)}")
+    parser.add_argument('--format', choices=list(WRITERS), default='xlsx')
+    parser.add_argument('--output', default='exports', help='output directory')
+    parser.add_argument('--headquarters', help='filter by บก.')
+    parser.add_argument('--division', help='filter by หน่วยย่อย (สังกัด / กก. / พฐ.จว.)')
+    parser.add_argument('--fetch-size', type=int, default=DEFAULT_FETCH_SIZE, help='rows per server-side fetch')
+    parser.add_argument('--jobs', type=int, help='parallel workers (default: one per table)')
+    args = parser.parse_args()
+
+    unknown = [t for t in args.tables if t not in EXPORT_TABLES]
+    if unknown:
+        parser.error(f"unknown table: {', '.join(unknown)}")
+
+    results, failures = export_tables(args.tables, args.format, args.output, args.headquarters,
+                                      args.division, args.fetch_size, args.jobs)
+    print(f"\n📊 Exported {sum(r[2] for r in results)} rows from {len(results)} tables")
+    if failures:
+        print(f"❌ Failed: {', '.join(sorted(failures))}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Point-in-time Table Snapshots
+เก็บสำเนาตารางก่อน import ทุกครั้ง (แทนการ backup ด้วยมือใน backups/) และ restore กลับได้
+
+- snapshot: อ่านผ่าน server-side (named) cursor ทีละ fetch_size แถว แล้วเขียนเป็น
+  Parquet (zstd) ทีละ row group - หน่วยความจำคงที่ไม่ขึ้นกับขนาดตาราง
+- ไฟล์: <SNAPSHOT_DIR>/<table>/<table>-<YYYYmmddTHHMMSS>-<sha256 ของไฟล์ต้นทาง 12 ตัว>.parquet
+  metadata ในไฟล์: ตาราง, เวลา, ไฟล์ต้นทาง + hash, ชนิด column ใน PostgreSQL (จำนวนแถวอยู่ใน footer)
+- ชนิดที่ Arrow ไม่มีตรง ๆ (numeric, jsonb, array, ...) เก็บเป็นข้อความ ::text
+  แล้ว COPY แปลงกลับตอน restore
+- restore: อ่านทีละ row group ป้อน COPY เดียว (copy_stream.copy_frames)
+  DELETE + COPY ใน transaction เดียว หรือ --swap ผ่าน swap_publish
+- เก็บล่าสุด SNAPSHOT_KEEP ไฟล์ต่อตาราง
+
+importer เรียก pre_import_snapshot(...) ก่อนลบข้อมูลเดิม (ปิดได้ด้วย TABLE_SNAPSHOTS=0)
+
+Usage:
+    python table_snapshot.py snapshot equipment vehicles
+    python table_snapshot.py list [equipment]
+    python table_snapshot.py restore equipment            # ไฟล์ล่าสุดของตาราง
+    python table_snapshot.py restore backups/tables/equipment/equipment-20250101T090000-ab12cd34ef56.parquet [--swap]
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+import pandas as pd
+import psycopg2
+import pyarrow as pa
+import pyarrow.parquet as pq
+from psycopg2 import sql
+
+from copy_stream import copy_frames
+from csv_reader import sync_serial
+from db_config import DB_CONFIG
+from retirement_forecast import refresh_retirement_forecast
+from search_index import SEARCH_ENTITIES, refresh_search_index
+
+SNAPSHOT_DIR = os.getenv(
+    'TABLE_SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backups', 'tables')
+)
+SNAPSHOT_KEEP = int(os.getenv('SNAPSHOT_KEEP', '10'))
+ENABLED = os.getenv('TABLE_SNAPSHOTS', '1') != '0'
+
+DEFAULT_FETCH_SIZE = 20000
+COMPRESSION = 'zstd'
+METADATA_KEY = b'table_snapshot'
+
+# format_type ของ PostgreSQL -> ชนิดใน Arrow (ชนิดอื่นเก็บเป็นข้อความ)
+ARROW_TYPES = {
+    'smallint': pa.int16(),
+    'integer': pa.int32(),
+    'bigint': pa.int64(),
+    'real': pa.float64(),
+    'double precision': pa.float64(),
+    'boolean': pa.bool_(),
+    'date': pa.date32(),
+    'timestamp without time zone': pa.timestamp('us'),
+    'timestamp with time zone': pa.timestamp('us', tz='UTC'),
+    'text': pa.string(),
+}
+TEXT_PREFIXES = ('character varying', 'character(')
+
+# int ที่มี null -> Int64 ของ pandas (ไม่กลายเป็น float ตอน COPY กลับ)
+PANDAS_TYPES = {
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+}
+
+
+# ============================================
+# Catalog / files
+# ============================================
+
+def table_columns(cur, table):
+    """-> [(column, format_type, generated)] ตามลำดับใน table"""
+    cur.execute("""
+        SELECT attname, format_type(atttypid, atttypmod), attgenerated <> ''
+        FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+        ORDER BY attnum
+    """, (table,))
+    return cur.fetchall()
+
+
+def arrow_type(pg_type):
+    if pg_type in ARROW_TYPES:
+        return ARROW_TYPES[pg_type]
+    if pg_type.startswith(TEXT_PREFIXES):
+        return pa.string()
+    return None
+
+
+def file_hash(path, block_size=1 << 20):
+    """sha256 ของไฟล์ต้นทาง (อ่านทีละ block)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def snapshot_path(table, taken_at, source_hash=None, directory=SNAPSHOT_DIR):
+    tag = source_hash[:12] if source_hash else 'manual'
+    return os.path.join(directory, table, f"{table}-{taken_at:%Y%m%dT%H%M%S}-{tag}.parquet")
+
+
+def list_snapshots(table, directory=SNAPSHOT_DIR):
+    """ไฟล์ snapshot ของตาราง เรียงจากเก่าไปใหม่ (ชื่อไฟล์มีเวลาแบบเรียงได้)"""
+    return sorted(glob.glob(os.path.join(directory, table, f"{table}-*.parquet")))
+
+
+def read_info(path):
+    """metadata ที่บันทึกไว้ใน footer ของไฟล์ + จำนวนแถว (ไม่อ่านข้อมูล)"""
+    footer = pq.read_metadata(path)
+    info = json.loads((footer.metadata or {}).get(METADATA_KEY, b'{}'))
+    info['rows'] = footer.num_rows
+    return info
+
+
+def prune_snapshots(table, keep=SNAPSHOT_KEEP, directory=SNAPSHOT_DIR):
+    old = list_snapshots(table, directory)[:-keep] if keep > 0 else []
+    for path in old:
+        os.remove(path)
+    return old
+
+
+# ============================================
+# Snapshot
+# ============================================
+
+def snapshot_table(conn, table, source_file=None, fetch_size=DEFAULT_FETCH_SIZE, directory=SNAPSHOT_DIR):
+    """
+    ตารางทั้งตาราง -> ไฟล์ Parquet (zstd) -> {'path', 'count', 'bytes', 'seconds'}
+    อ่านใน transaction แบบ REPEATABLE READ แยกของตัวเอง (เห็นข้อมูล ณ จุดเวลาเดียว)
+    """
+    start = time.perf_counter()
+    taken_at = datetime.now()
+    source_hash = file_hash(source_file) if source_file else None
+    path = snapshot_path(table, taken_at, source_hash, directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    cur = conn.cursor()
+    try:
+        columns = table_columns(cur, table)
+        fields, select = [], []
+        for name, pg_type, _ in columns:
+            target = arrow_type(pg_type)
+            if target is None:
+                select.append(sql.SQL("{}::text").format(sql.Identifier(name)))
+                target = pa.string()
+            else:
+                select.append(sql.Identifier(name))
+            fields.append(pa.field(name, target))
+
+        info = {
+            'table': table, 'taken_at': taken_at.isoformat(timespec='seconds'),
+            'source_file': os.path.basename(source_file) if source_file else None,
+            'source_sha256': source_hash,
+            'columns': {name: pg_type for name, pg_type, _ in columns},
+        }
+        schema = pa.schema(fields, metadata={METADATA_KEY: json.dumps(info, ensure_ascii=False)})
+
+        named = conn.cursor(name=f'snapshot_{table}')
+        named.itersize = fetch_size
+        named.execute(sql.SQL("SELECT {} FROM {}").format(sql.SQL(', ').join(select), sql.Identifier(table)))
+
+        count = 0
+        tmp_path = f"{path}.tmp"
+        with pq.ParquetWriter(tmp_path, schema, compression=COMPRESSION) as writer:
+            while True:
+                rows = named.fetchmany(fetch_size)
+                if not rows:
+                    break
+                values = list(zip(*rows))
+                writer.write_batch(pa.record_batch(
+                    [pa.array(values[i], type=field.type) for i, field in enumerate(fields)], schema=schema))
+                count += len(rows)
+        named.close()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        if os.path.exists(f"{path}.tmp"):
+            os.remove(f"{path}.tmp")
+        raise
+    finally:
+        cur.close()
+        conn.set_session(isolation_level='DEFAULT', readonly=False)
+
+    os.replace(tmp_path, path)
+    return {'path': path, 'count': count, 'bytes': os.path.getsize(path), 'seconds': time.perf_counter() - start}
+
+
+def pre_import_snapshot(table, source_file=None, config=None, audit=None):
+    """
+    ขั้นตอนก่อน import: snapshot ตารางที่จะถูกแทนที่ (connection แยก ไม่ค้าง transaction ของ importer)
+    ล้มเหลวแล้วหยุด import - ไม่เขียนทับข้อมูลที่ยังไม่มีสำเนา
+    """
+    if not ENABLED:
+        return None
+    conn = psycopg2.connect(**(config or DB_CONFIG))
+    try:
+        result = snapshot_table(conn, table, source_file)
+    finally:
+        conn.close()
+    pruned = prune_snapshots(table)
+    if audit is not None:
+        audit.record('snapshot', count=result['count'], duration=result['seconds'],
+                     path=os.path.basename(result['path']), bytes=result['bytes'])
+    print(f"📸 Snapshot {table}: {result['count']:,} rows -> {result['path']} "
+          f"({result['bytes'] / 1e6:.1f} MB, {result['seconds']:.1f}s"
+          + (f", pruned {len(pruned)}" if pruned else '') + ")")
+    return result
+
+
+# ============================================
+# Restore
+# ============================================
+
+def iter_snapshot(path, columns, batch_size=DEFAULT_FETCH_SIZE):
+    """ไฟล์ snapshot -> DataFrame ทีละ batch (int/bool ที่มี null คงเป็น nullable)"""
+    source = pq.ParquetFile(path)
+    try:
+        for batch in source.iter_batches(batch_size=batch_size, columns=columns):
+            # timestamp เป็น datetime object - ปี พ.ศ. เกินช่วง datetime64[ns]
+            yield batch.to_pandas(types_mapper=PANDAS_TYPES.get, timestamp_as_object=True)
+    finally:
+        source.close()
+
+
+def restore_columns(cur, table, path):
+    """column ที่ COPY กลับได้: มีทั้งในไฟล์และตารางปัจจุบัน และไม่ใช่ generated column"""
+    stored = pq.read_schema(path).names
+    current = {name: generated for name, _, generated in table_columns(cur, table)}
+    columns = [c for c in stored if c in current and not current[c]]
+    dropped = [c for c in stored if c not in current]
+    if dropped:
+        print(f"⚠️  Columns no longer in {table} (skipped): {', '.join(dropped)}")
+    return columns
+
+
+def resolve_snapshot(target, directory=SNAPSHOT_DIR):
+    """ชื่อตาราง (ไฟล์ล่าสุด) หรือ path ของไฟล์ -> (table, path)"""
+    if os.path.isfile(target):
+        return read_info(target).get('table') or os.path.basename(target).split('-', 1)[0], target
+    snapshots = list_snapshots(target, directory)
+    if not snapshots:
+        raise FileNotFoundError(f"no snapshots for {target} in {directory}")
+    return target, snapshots[-1]
+
+
+def restore_snapshot(conn, table, path, swap=False, audit=None):
+    """
+    แทนที่ข้อมูลทั้งตารางด้วยไฟล์ snapshot -> จำนวนแถว
+    swap=False: DELETE + COPY ใน transaction เดียว, swap=True: ผ่าน <table>_staging
+    หลัง commit สร้างข้อมูลที่คำนวณจากตารางนี้ใหม่ (refresh_derived) เหมือน importer
+    """
+    from swap_publish import publish
+
+    def load(cur, target):
+        columns = restore_columns(cur, table, path)
+        start = time.perf_counter()
+        sent = copy_frames(cur, target, iter_snapshot(path, columns), columns)
+        cur.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(sql.Identifier(target)))
+        count = cur.fetchone()[0]
+        sync_serial(cur, table, target, columns)
+        return {'count': count, 'bytes': sent, 'seconds': round(time.perf_counter() - start, 2)}
+
+    if swap:
+        count = publish(conn, table, load, audit)['count']
+        refresh_derived(conn, table)
+        return count
+
+    cur = conn.cursor()
+    try:
+        with audit.changes(cur) if audit is not None else nullcontext():
+            cur.execute(sql.SQL("DELETE FROM {}").format(sql.Identifier(table)))
+            loaded = load(cur, table)
+        if audit is not None:
+            audit.record('restore', **loaded)
+            audit.flush(cur)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    refresh_derived(conn, table)
+    return loaded['count']
+
+
+def refresh_derived(conn, table):
+    """
+    personnel: DELETE/swap ลบ personnel_tenure ไปด้วย (ON DELETE CASCADE) -> คำนวณ tenure / forecast ใหม่
+    ตารางที่มีดัชนีค้นหา: สร้าง search_tokens ใหม่ - ล้มเหลวแค่เตือน (ข้อมูล restore แล้ว)
+    """
+    if table == 'personnel':
+        try:
+            refresh_retirement_forecast(conn)
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️  Retirement forecast not updated: {e}")
+    if table in SEARCH_ENTITIES:
+        try:
+            refresh_search_index(conn, [table])
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️  Search index not updated: {e}")
+
+
+# ============================================
+# CLI
+# ============================================
+
+def print_snapshots(tables):
+    for table in tables:
+        snapshots = list_snapshots(table)
+        print(f"\n📦 {table}: {len(snapshots)} snapshots")
+        for path in snapshots:
+            info = read_info(path)
+            print(f"   {os.path.basename(path)}  {info.get('rows', '?'):>8} rows  "
+                  f"{os.path.getsize(path) / 1e6:7.1f} MB  {info.get('source_file') or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Point-in-time table snapshots (Parquet, zstd)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    take = commands.add_parser('snapshot', help='snapshot tables now')
+    take.add_argument('tables', nargs='+')
+    take.add_argument('--fetch-size', type=int, default=DEFAULT_FETCH_SIZE)
+
+    show = commands.add_parser('list', help='list stored snapshots')
+    show.add_argument('tables', nargs='*')
+
+    restore = commands.add_parser('restore', help='replace a table with a snapshot')
+    restore.add_argument('target', help='table name (latest snapshot) or snapshot file')
+    restore.add_argument('--swap', action='store_true', help='load into <table>_staging and swap')
+    restore.add_argument('--no-backup', action='store_true', help='skip snapshotting the current rows first')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        if not args.tables and os.path.isdir(SNAPSHOT_DIR):
+            args.tables = sorted(os.listdir(SNAPSHOT_DIR))
+        print_snapshots(args.tables)
+        return
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        if args.command == 'snapshot':
+            for table in args.tables:
+                result = snapshot_table(conn, table, fetch_size=args.fetch_size)
+                prune_snapshots(table)
+                print(f"📸 {table}: {result['count']:,} rows -> {result['path']} "
+                      f"({result['bytes'] / 1e6:.1f} MB, {result['seconds']:.1f}s)")
+        else:
+            from dataset_registry import REGISTRY
+            from import_audit import ImportAudit
+
+            table, path = resolve_snapshot(args.target)
+            print(f"♻️  Restoring {table} from {path}")
+            if not args.no_backup:
+                result = snapshot_table(conn, table)
+                print(f"📸 Current {table} saved: {result['path']}")
+            audit = ImportAudit(path, table, dataset=REGISTRY.get(table))
+            start = time.perf_counter()
+            count = restore_snapshot(conn, table, path, swap=args.swap, audit=audit)
+            print(f"✅ Restored {count:,} rows ({time.perf_counter() - start:.1f}s)")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Unit Name Normalizer
+ชื่อหน่วย (บก. / หน่วยงาน / พฐ.จว.) ที่สะกดต่างกันในแต่ละไฟล์ -> ชื่อมาตรฐานชื่อเดียว
+เพื่อไม่ให้ GROUP BY ใน statistics แยกหน่วยเดียวกันออกเป็นหลายแถว
+
+ลำดับการค้นหา (ผลของแต่ละชื่อ memoize ด้วย LRU - ชื่อซ้ำ ๆ ทั้งไฟล์คำนวณครั้งเดียว):
+    1. exact:  ชื่อมาตรฐาน หรือ alias ที่รู้จัก
+    2. key:    ไม่สนช่องว่าง/จุด/วงเล็บ ('สพฐ.ตร' = 'สพฐ.ตร.')
+               และตัดคำอธิบายในวงเล็บ ('ศพฐ.4 (ขอนแก่น)' = 'ศพฐ.4')
+    3. fuzzy:  difflib ratio >= FUZZY_CUTOFF กับชื่อมาตรฐาน - ตัวเลขต้องตรงกัน
+               (ศพฐ.1 ไม่กลายเป็น ศพฐ.10) และต้องมีผู้ชนะชัดเจนหนึ่งชื่อ
+    ไม่พบ -> คืนชื่อเดิม (trim แล้ว)
+
+alias: SEED_ALIASES ในไฟล์นี้ + ตาราง unit_aliases (backend/db/add_unit_aliases.sql)
+ตารางถูก cache ไว้ที่ ALIAS_CACHE (importer clean ข้อมูลก่อนต่อฐานข้อมูล) - --sync เพื่ออัปเดต
+
+dataset_registry ใส่ normalize_unit ให้ column UNIT_COLUMNS ของทุก dataset อัตโนมัติ
+
+Usage:
+    python unit_normalizer.py --sync        # ดึง unit_aliases -> cache
+    python unit_normalizer.py --report      # ชื่อในฐานข้อมูลที่ยังไม่ใช่ชื่อมาตรฐาน
+    python unit_normalizer.py --apply       # แก้ชื่อในตารางที่ import ไปแล้วให้เป็นชื่อมาตรฐาน
+    python unit_normalizer.py ชื่อ [ชื่อ ...]  # ทดสอบการ resolve
+"""
+
+import difflib
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+
+FUZZY_CUTOFF = 0.9
+RESOLVE_CACHE_SIZE = 4096
+
+ALIAS_CACHE = os.getenv(
+    'UNIT_ALIAS_CACHE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.unit_aliases.json')
+)
+
+# column ที่เป็นชื่อหน่วยในทุก dataset (department_code ของ vehicles คือ บก.)
+UNIT_COLUMNS = ('division', 'headquarters', 'unit', 'subdivision', 'department_code')
+
+# ตาราง -> column ชื่อหน่วยที่มีอยู่ (สำหรับ --report / --apply)
+TABLE_UNIT_COLUMNS = {
+    'personnel': ['headquarters'],
+    'equipment': ['division', 'unit'],
+    'vehicles': ['department_code', 'unit'],
+    'housing': ['division', 'subdivision'],
+    'building': ['division', 'subdivision'],
+    'budget': ['division'],
+}
+
+HEADQUARTERS = [
+    'สพฐ.ตร.', 'ส่วนบังคับบัญชา', 'บก.อก.สพฐ.ตร.', 'พฐก.', 'ทว.', 'สฝจ.', 'กพอ.', 'ศขบ.',
+    'ศพฐ.1', 'ศพฐ.2', 'ศพฐ.3', 'ศพฐ.4', 'ศพฐ.5', 'ศพฐ.6', 'ศพฐ.7', 'ศพฐ.8', 'ศพฐ.9', 'ศพฐ.10',
+]
+
+PROVINCES = [
+    'กระบี่', 'กาญจนบุรี', 'กาฬสินธุ์', 'กำแพงเพชร', 'ขอนแก่น', 'จันทบุรี', 'ฉะเชิงเทรา', 'ชลบุรี',
+    'ชัยนาท', 'ชัยภูมิ', 'ชุมพร', 'เชียงราย', 'เชียงใหม่', 'ตรัง', 'ตราด', 'ตาก', 'นครนายก', 'นครปฐม',
+    'นครพนม', 'นครราชสีมา', 'นครศรีธรรมราช', 'นครสวรรค์', 'นนทบุรี', 'นราธิวาส', 'น่าน', 'บึงกาฬ',
+    'บุรีรัมย์', 'ปทุมธานี', 'ประจวบคีรีขันธ์', 'ปราจีนบุรี', 'ปัตตานี', 'พระนครศรีอยุธยา', 'พะเยา',
+    'พังงา', 'พัทลุง', 'พิจิตร', 'พิษณุโลก', 'เพชรบุรี', 'เพชรบูรณ์', 'แพร่', 'ภูเก็ต', 'มหาสารคาม',
+    'มุกดาหาร', 'แม่ฮ่องสอน', 'ยโสธร', 'ยะลา', 'ร้อยเอ็ด', 'ระนอง', 'ระยอง', 'ราชบุรี', 'ลพบุรี',
+    'ลำปาง', 'ลำพูน', 'เลย', 'ศรีสะเกษ', 'สกลนคร', 'สงขลา', 'สตูล', 'สมุทรปราการ', 'สมุทรสงคราม',
+    'สมุทรสาคร', 'สระแก้ว', 'สระบุรี', 'สิงห์บุรี', 'สุโขทัย', 'สุพรรณบุรี', 'สุราษฎร์ธานี', 'สุรินทร์',
+    'หนองคาย', 'หนองบัวลำภู', 'อ่างทอง', 'อำนาจเจริญ', 'อุดรธานี', 'อุตรดิตถ์', 'อุทัยธานี', 'อุบลราชธานี',
+]
+
+CANONICAL_UNITS = HEADQUARTERS + [f'พฐ.จว.{p}' for p in PROVINCES]
+
+# ชื่อที่ key/fuzzy จับไม่ได้ (ตัวย่อ ชื่อสั้น)
+SEED_ALIASES = {
+    'บก.อก.': 'บก.อก.สพฐ.ตร.',
+    'พฐ.จว.ประจวบฯ': 'พฐ.จว.ประจวบคีรีขันธ์',
+    'พฐ.จว.อยุธยา': 'พฐ.จว.พระนครศรีอยุธยา',
+    'พฐ.จว.โคราช': 'พฐ.จว.นครราชสีมา',
+}
+
+PUNCTUATION = re.compile(r'[\s.,()\[\]\-_/]+')
+ANNOTATION = re.compile(r'\([^)]*\)')
+DIGITS = re.compile(r'\d+')
+
+
+def unit_key(name):
+    """ไม่สนช่องว่าง/เครื่องหมาย: 'ศพฐ.2 (ชลบุรี)' -> 'ศพฐ2ชลบุรี'"""
+    return PUNCTUATION.sub('', str(name)).lower()
+
+
+def bare_key(name):
+    """key หลังตัดคำอธิบายในวงเล็บ: 'ศพฐ.2 (ชลบุรี)' -> 'ศพฐ2'"""
+    return unit_key(ANNOTATION.sub('', str(name)))
+
+
+class UnitNormalizer:
+    """ชื่อมาตรฐาน + alias -> resolve(ชื่อ) และ normalize(Series)"""
+
+    def __init__(self, canonical=CANONICAL_UNITS, aliases=None):
+        aliases = {**SEED_ALIASES, **(aliases or {})}
+        self.canonical = list(dict.fromkeys(list(canonical) + list(aliases.values())))
+        self.exact = {name: name for name in self.canonical}
+        self.exact.update(aliases)
+
+        self.keys = {}
+        for name, target in self.exact.items():
+            self.keys.setdefault(unit_key(name), target)
+        self.bare = {}
+        for name, target in self.exact.items():
+            self.bare.setdefault(bare_key(name), target)
+        self.fuzzy = {unit_key(name): name for name in self.canonical}
+        self.resolve = lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._resolve)
+
+    def _resolve(self, name):
+        """ชื่อเดียว -> (ชื่อมาตรฐาน, วิธีที่พบ: exact/key/fuzzy/None)"""
+        text = re.sub(r'\s+', ' ', str(name)).strip()
+        if text in self.exact:
+            return self.exact[text], 'exact'
+        key = unit_key(text)
+        if key in self.keys:
+            return self.keys[key], 'key'
+        bare = bare_key(text)
+        if bare and bare in self.bare:
+            return self.bare[bare], 'key'
+        match = self._fuzzy(key)
+        if match is not None:
+            return match, 'fuzzy'
+        return text, None
+
+    def _fuzzy(self, key):
+        if len(key) < 4:
+            return None
+        digits = DIGITS.findall(key)
+        candidates = [c for c in difflib.get_close_matches(key, self.fuzzy, n=3, cutoff=FUZZY_CUTOFF)
+                      if DIGITS.findall(c) == digits]
+        if not candidates:
+            return None
+        if len(candidates) > 1:
+            scores = [difflib.SequenceMatcher(None, key, c).ratio() for c in candidates[:2]]
+            if scores[0] == scores[1]:
+                return None
+        return self.fuzzy[candidates[0]]
+
+    def name(self, value):
+        return self.resolve(value)[0]
+
+    def normalize(self, s):
+        """Series -> Series (resolve เฉพาะค่าไม่ซ้ำ แล้ว map กลับ)"""
+        lookup = {value: self.name(value) for value in s.dropna().unique()}
+        return s.map(lookup).astype(s.dtype)
+
+
+# ============================================
+# Alias table + cache
+# ============================================
+
+def load_aliases(cur):
+    cur.execute("SELECT alias, canonical FROM unit_aliases")
+    return dict(cur.fetchall())
+
+
+def read_cache(path=ALIAS_CACHE):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_cache(aliases, path=ALIAS_CACHE):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(aliases, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+_normalizer = None
+
+
+def get_normalizer():
+    """normalizer ที่ใช้ร่วมกันทั้ง process (seed + alias จาก cache)"""
+    global _normalizer
+    if _normalizer is None:
+        _normalizer = UnitNormalizer(aliases=read_cache())
+    return _normalizer
+
+
+def sync_aliases(conn):
+    """ดึง unit_aliases -> cache แล้วสร้าง normalizer ใหม่ -> จำนวน alias"""
+    global _normalizer
+    cur = conn.cursor()
+    try:
+        aliases = load_aliases(cur)
+    finally:
+        cur.close()
+    write_cache(aliases)
+    _normalizer = UnitNormalizer(aliases=aliases)
+    return len(aliases)
+
+
+def normalize_unit(s):
+    """cleaner ของ dataset_registry"""
+    return get_normalizer().normalize(s)
+
+
+# ============================================
+# Existing rows
+# ============================================
+
+def distinct_units(cur):
+    """-> [(ตาราง, column, ชื่อ, จำนวนแถว)]"""
+    found = []
+    for table, columns in TABLE_UNIT_COLUMNS.items():
+        for column in columns:
+            cur.execute(f"SELECT {column}, COUNT(*) FROM {table} WHERE {column} IS NOT NULL GROUP BY {column}")
+            found += [(table, column, value, count) for value, count in cur.fetchall()]
+    return found
+
+
+def report(cur, normalizer):
+    changes = unresolved = 0
+    for table, column, value, count in distinct_units(cur):
+        target, method = normalizer.resolve(value)
+        if target != value:
+            changes += count
+            print(f"  🔁 {table}.{column}: '{value}' -> '{target}' ({method}, {count} rows)")
+        elif method is None:
+            unresolved += 1
+            print(f"  ❓ {table}.{column}: '{value}' ({count} rows)")
+    print(f"\n{changes} rows would change, {unresolved} names not in the alias dictionary")
+
+
+def apply(conn, normalizer):
+    """แก้ชื่อหน่วยในทุกตารางให้เป็นชื่อมาตรฐาน (UPDATE ต่อ column ครั้งเดียว) -> จำนวนแถวที่แก้"""
+    from psycopg2.extras import execute_values
+
+    cur = conn.cursor()
+    updated = 0
+    try:
+        mapping = {}
+        for table, column, value, _ in distinct_units(cur):
+            target = normalizer.name(value)
+            if target != value:
+                mapping.setdefault((table, column), []).append((value, target))
+        for (table, column), pairs in mapping.items():
+            execute_values(cur, f"""
+                UPDATE {table} t SET {column} = m.canonical
+                FROM (VALUES %s) AS m(alias, canonical)
+                WHERE t.{column} = m.alias
+            """, pairs, page_size=len(pairs))
+            print(f"  ✏️  {table}.{column}: {cur.rowcount} rows")
+            updated += cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return updated
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    flags = {a for a in sys.argv[1:] if a.startswith('--')}
+
+    if not flags & {'--sync', '--report', '--apply'}:
+        if not args:
+            print(f"📖 วิธีใช้: python3 {sys.argv[0]} --sync | --report | --apply | ชื่อหน่วย ...")
+            sys.exit(1)
+        normalizer = get_normalizer()
+        for name in args:
+            target, method = normalizer.resolve(name)
+            print(f"{name} -> {target} ({method or 'not found'})")
+        return
+
+    import psycopg2
+    from db_config import DB_CONFIG
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        if '--sync' in flags:
+            print(f"📚 {sync_aliases(conn)} aliases cached in {ALIAS_CACHE}")
+        normalizer = get_normalizer()
+        if '--report' in flags:
+            cur = conn.cursor()
+            report(cur, normalizer)
+            cur.close()
+        if '--apply' in flags:
+            print(f"✅ {apply(conn, normalizer)} rows normalised")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
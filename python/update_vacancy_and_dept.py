@@ -1,65 +1,105 @@
+"""
+Update vacancy_status / สังกัด / บก. ของ personnel จาก สัญญาบัตร.xlsx / ประทวน.xlsx
+
+จับคู่แถวกับ personnel.id ด้วย record_linkage (ชื่อสะกดต่างเล็กน้อย, ยศติดหน้าชื่อ, ช่องว่าง)
+แทน WHERE full_name = ... AND rank = ... ที่นับเป็น 0 เมื่อชื่อต่างกันแม้ตัวเดียว
+แถวที่ไม่แน่ใจเขียนเป็น review queue (<ไฟล์>_review.csv) ไม่ถูก UPDATE
+
+Usage:
+    python update_vacancy_and_dept.py [--async]
+"""
+
+import os
+import sys
 import pandas as pd
 import psycopg2
+from psycopg2.extras import execute_values
 
-DB_CONFIG = {
-    'host': 'forensic-hr-db.postgres.database.azure.com',
-    'database': 'forensic_hr',
-    'user': 'forensicadmin',
-    'password': 'ForensicHR2025!Strong',
-    'port': 5432,
-    'sslmode': 'require'
-}
+from db_config import DB_CONFIG
+from record_linkage import link_records, print_stats
+from unit_normalizer import get_normalizer
 
-def update_from_excel(file_path):
+SELECT_PEOPLE = """
+    SELECT id, full_name, rank, headquarters
+    FROM personnel
+    WHERE full_name IS NOT NULL AND full_name <> 'ตำแหน่งว่าง'
+"""
+
+UPDATE_BY_ID = """
+    UPDATE personnel p
+    SET vacancy_status = v.vacancy_status,
+        department = COALESCE(v.department, p.department),
+        headquarters = COALESCE(v.headquarters, p.headquarters)
+    FROM (VALUES %s) AS v(id, vacancy_status, department, headquarters)
+    WHERE p.id = v.id
+    RETURNING p.id
+"""
+UPDATE_TEMPLATE = "(%s::int, %s::text, %s::text, %s::text)"
+
+# UPDATE ทีละ batch ด้วย unnest - 1 round-trip ต่อ batch แทน 1 ต่อแถว
+BATCH_UPDATE = """
+    UPDATE personnel p
+    SET vacancy_status = v.vacancy_status,
+        department = COALESCE(v.department, p.department),
+        headquarters = COALESCE(v.headquarters, p.headquarters)
+    FROM unnest($1::int[], $2::text[], $3::text[], $4::text[])
+         AS v(id, vacancy_status, department, headquarters)
+    WHERE p.id = v.id
+"""
+
+UPDATE_COLUMNS = ['id', 'vacancy_status', 'department', 'headquarters']
+
+def sheet_frame(df):
+    """แถวคนครองใน Excel -> DataFrame: row, full_name, rank, vacancy_status, department, headquarters"""
+    vacancy = df.get('ว่าง', pd.Series(index=df.index, dtype=object)).astype('string').str.strip()
+    frame = pd.DataFrame({
+        'row': df.index,
+        'full_name': df['ชื่อ-นามสกุล'],
+        'rank': df['ยศ'],
+        'vacancy_status': vacancy.map({'ว่าง': 'ตำแหน่งว่าง', 'คนครอง': 'คนครอง'}),
+        'department': df.get('สังกัด'),
+        'headquarters': df.get('บก.'),
+    })
+    named = frame['full_name'].notna() & frame['rank'].notna()
+    named &= ~frame['full_name'].astype('string').str.contains('ตำแหน่งว่าง', regex=False).fillna(False)
+    frame = frame[named].astype(object).where(frame[named].notna(), None)
+    frame['full_name'] = frame['full_name'].map(str)
+    frame['rank'] = frame['rank'].map(str)
+    frame['department'] = frame['department'].map(str, na_action='ignore')
+    # ชื่อหน่วยมาตรฐานเดียวกับที่ importer เขียนลง personnel
+    normalizer = get_normalizer()
+    frame['headquarters'] = frame['headquarters'].map(lambda v: normalizer.name(str(v)), na_action='ignore')
+    # แถวซ้ำ (ชื่อ + ยศ) ใช้แถวสุดท้าย เหมือนการ UPDATE ทีละแถว
+    return frame.drop_duplicates(subset=['full_name', 'rank'], keep='last')
+
+def link_sheet(file_path, cursor):
+    """อ่าน Excel แล้วจับคู่กับ personnel -> DataFrame ตาม UPDATE_COLUMNS (เฉพาะที่จับคู่ได้)"""
     print(f"\n📂 Reading {file_path}...")
     df = pd.read_excel(file_path)
-    
     print(f"Total rows: {len(df)}")
+    sheet = sheet_frame(df)
+    
+    cursor.execute(SELECT_PEOPLE)
+    people = pd.DataFrame(cursor.fetchall(), columns=['id', 'full_name', 'rank', 'headquarters'])
     
+    result = link_records(sheet[['row', 'full_name', 'rank', 'headquarters']], people)
+    print_stats(result.stats)
+    if not result.review.empty:
+        review_path = f"{os.path.splitext(file_path)[0]}_review.csv"
+        result.review.assign(row=result.review['row'] + 2).to_csv(review_path, index=False, encoding='utf-8-sig')
+        print(f"📝 Review queue: {result.stats['review']} rows -> {review_path} (not updated)")
+    
+    updates = result.matches[['row', 'id']].merge(sheet, on='row')
+    return updates[UPDATE_COLUMNS].astype(object).where(updates[UPDATE_COLUMNS].notna(), None)
+
+def update_from_excel(file_path):
     conn = psycopg2.connect(**DB_CONFIG)
     cursor = conn.cursor()
     
-    updated = 0
-    
-    for idx, row in df.iterrows():
-        full_name = row.get('ชื่อ-นามสกุล')
-        rank = row.get('ยศ')
-        department = row.get('สังกัด')
-        headquarters = row.get('บก.')
-        vacancy_col = row.get('ว่าง')  # ใช้ column นี้!
-        
-        # กำหนด vacancy_status จาก column 'ว่าง'
-        if pd.notna(vacancy_col) and str(vacancy_col).strip() == 'ว่าง':
-            vacancy_status = 'ตำแหน่งว่าง'
-        elif pd.notna(vacancy_col) and str(vacancy_col).strip() == 'คนครอง':
-            vacancy_status = 'คนครอง'
-        else:
-            vacancy_status = None
-        
-        # Update ถ้ามีชื่อ + ยศ
-        if pd.notna(full_name) and pd.notna(rank) and 'ตำแหน่งว่าง' not in str(full_name):
-            try:
-                cursor.execute("""
-                    UPDATE personnel 
-                    SET vacancy_status = %s,
-                        department = COALESCE(%s, department),
-                        headquarters = COALESCE(%s, headquarters)
-                    WHERE full_name = %s AND rank = %s
-                """, (vacancy_status, 
-                      str(department) if pd.notna(department) else None,
-                      str(headquarters) if pd.notna(headquarters) else None,
-                      str(full_name), 
-                      str(rank)))
-                
-                if cursor.rowcount > 0:
-                    updated += 1
-                        
-            except Exception as e:
-                print(f"Error at row {idx}: {e}")
-                continue
-        
-        if (idx + 1) % 100 == 0:
-            print(f"Processed {idx + 1} rows...")
+    updates = link_sheet(file_path, cursor)
+    # rowcount ของ execute_values นับเฉพาะหน้าสุดท้าย -> นับจาก RETURNING ทุกหน้า
+    updated = len(execute_values(cursor, UPDATE_BY_ID, list(updates.itertuples(index=False, name=None)),
+                                 template=UPDATE_TEMPLATE, page_size=1000, fetch=True))
     
     conn.commit()
     cursor.close()
@@ -67,11 +107,36 @@ def update_from_excel(file_path):
     
     print(f"✅ Updated: {updated} records")
 
+def update_rows(chunk):
+    return list(chunk.itertuples(index=False, name=None))
+
+async def batch_update(conn, records):
+    from async_import import status_count
+    status = await conn.execute(BATCH_UPDATE, *[list(col) for col in zip(*records)])
+    return status_count(status)
+
+def update_from_excel_async(file_path):
+    """อัปเดตแบบ pipelined ผ่าน asyncpg (จับคู่ก่อน แล้วส่ง UPDATE ตาม id ทีละ batch ซ้อนกัน)"""
+    from async_import import run_statements, frame_chunks
+    
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        cursor = conn.cursor()
+        updates = link_sheet(file_path, cursor)
+        cursor.close()
+    finally:
+        conn.close()
+    
+    stats = run_statements(batch_update, frame_chunks(updates, 500), transform=update_rows, config=DB_CONFIG)
+    print(f"✅ Updated: {stats['rows']} records")
+
 if __name__ == '__main__':
+    update = update_from_excel_async if '--async' in sys.argv else update_from_excel
+    
     print("=== Updating from สัญญาบัตร.xlsx ===")
-    update_from_excel('สัญญาบัตร.xlsx')
+    update('สัญญาบัตร.xlsx')
     
     print("\n=== Updating from ประทวน.xlsx ===")
-    update_from_excel('ประทวน.xlsx')
+    update('ประทวน.xlsx')
     
     print("\n🎉 All done!")
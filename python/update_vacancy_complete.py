@@ -1,138 +1,235 @@
+#!/usr/bin/env python3
+"""
+Update vacancy_status / สังกัด / บก. ของ personnel จากไฟล์ Excel (สัญญาบัตร.xlsx, ประทวน.xlsx)
+
+- โหลด personnel ครั้งเดียวแล้วสร้าง hash index ใน memory
+    คนครอง:      (ชื่อ-นามสกุล, ยศ)
+    ตำแหน่งว่าง: (ตำแหน่ง, สังกัด, บก., เพศ) เฉพาะ column ที่แถวใน Excel มีค่า
+- จับคู่แถว Excel กับ id แบบกำหนดได้แน่นอน: ลำดับ ตรงกับ sequence_number ก่อน แล้วเรียงตาม id
+  id หนึ่งถูกใช้ได้ครั้งเดียว (แถวคนครองจองก่อน ตำแหน่งว่างจึงไม่ไปทับ)
+- รายงาน ambiguous (มีแถวในฐานข้อมูลให้เลือกมากกว่าหนึ่ง) และ duplicate
+  (หลายแถวใน Excel อ้างถึงช่องเดียวกันมากกว่าที่มีในฐานข้อมูล)
+- เขียนทั้งหมดด้วย UPDATE ... FROM (VALUES ...) คำสั่งเดียว
+
+Usage:
+    python update_vacancy_complete.py [file.xlsx ...] [--plan]
+"""
+
+import sys
+from collections import defaultdict
+
 import pandas as pd
 import psycopg2
+from psycopg2.extras import execute_values
 
-DB_CONFIG = {
-    'host': 'forensic-hr-db.postgres.database.azure.com',
-    'database': 'forensic_hr',
-    'user': 'forensicadmin',
-    'password': 'ForensicHR2025!Strong',
-    'port': 5432,
-    'sslmode': 'require'
-}
+from db_config import DB_CONFIG
+from excel_reader import read_excel, use_reader_option
+from unit_normalizer import get_normalizer
 
-def update_from_excel(file_path):
-    print(f"\n📂 Reading {file_path}...")
-    df = pd.read_excel(file_path)
-    
-    print(f"Total rows: {len(df)}")
-    
-    conn = psycopg2.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    
-    updated_krong = 0
-    updated_wang = 0
-    not_found = 0
-    
+VACANCY_VALUES = {'ว่าง': 'ตำแหน่งว่าง', 'คนครอง': 'คนครอง'}
+VACANT_NAMES = (None, '', 'ตำแหน่งว่าง')
+SLOT_FIELDS = ('position', 'department', 'headquarters', 'gender')
+
+SELECT_CANDIDATES = """
+    SELECT id, full_name, rank, position, department, headquarters, gender, vacancy_status, sequence_number
+    FROM personnel
+    ORDER BY id
+"""
+
+BATCH_UPDATE = """
+    UPDATE personnel p
+    SET vacancy_status = v.vacancy_status,
+        department = COALESCE(v.department, p.department),
+        headquarters = COALESCE(v.headquarters, p.headquarters)
+    FROM (VALUES %s) AS v(id, vacancy_status, department, headquarters)
+    WHERE p.id = v.id
+"""
+BATCH_TEMPLATE = "(%s::int, %s::text, %s::text, %s::text)"
+
+
+def _text(value):
+    return str(value) if pd.notna(value) else None
+
+
+def _unit(value):
+    """ชื่อหน่วยมาตรฐานเดียวกับที่ importer เขียนลง personnel"""
+    return get_normalizer().name(value) if pd.notna(value) else None
+
+
+def _sequence(value):
+    if pd.isna(value):
+        return None
+    return str(int(value)) if isinstance(value, float) and value.is_integer() else str(value).strip()
+
+
+def sheet_rows(df):
+    """แถว Excel -> list of dict (เฉพาะแถวที่ระบุ ว่าง/คนครอง)"""
+    rows = []
     for idx, row in df.iterrows():
-        full_name = row.get('ชื่อ-นามสกุล')
-        rank = row.get('ยศ')
-        position = row.get('ชื่อตำแหน่ง')
-        department = row.get('สังกัด')
-        headquarters = row.get('บก.')
         vacancy_col = row.get('ว่าง')
-        gender = row.get('เพศ')
-        order_num = row.get('ลำดับ')
-        
-        # กำหนด vacancy_status
-        if pd.notna(vacancy_col):
-            if str(vacancy_col).strip() == 'ว่าง':
-                vacancy_status = 'ตำแหน่งว่าง'
-            elif str(vacancy_col).strip() == 'คนครอง':
-                vacancy_status = 'คนครอง'
-            else:
-                vacancy_status = None
-        else:
-            vacancy_status = None
-        
+        vacancy_status = VACANCY_VALUES.get(str(vacancy_col).strip()) if pd.notna(vacancy_col) else None
         if vacancy_status is None:
             continue
-        
-        try:
-            # กรณี 1: มีชื่อเต็ม + ยศ (คนครอง)
-            if pd.notna(full_name) and pd.notna(rank) and 'ตำแหน่งว่าง' not in str(full_name):
-                cursor.execute("""
-                    UPDATE personnel 
-                    SET vacancy_status = %s,
-                        department = COALESCE(%s, department),
-                        headquarters = COALESCE(%s, headquarters)
-                    WHERE full_name = %s AND rank = %s
-                """, (vacancy_status, 
-                      str(department) if pd.notna(department) else None,
-                      str(headquarters) if pd.notna(headquarters) else None,
-                      str(full_name), 
-                      str(rank)))
-                
-                if cursor.rowcount > 0:
-                    updated_krong += 1
-                else:
-                    not_found += 1
-            
-            # กรณี 2: ตำแหน่งว่าง (match โดย position + department + headquarters)
-            elif vacancy_status == 'ตำแหน่งว่าง' and pd.notna(position):
-                # ลอง match หลายเงื่อนไข
-                where_conditions = ["position = %s"]
-                params = [str(position)]
-                
-                if pd.notna(department):
-                    where_conditions.append("department = %s")
-                    params.append(str(department))
-                
-                if pd.notna(headquarters):
-                    where_conditions.append("headquarters = %s")
-                    params.append(str(headquarters))
-                
-                if pd.notna(gender):
-                    where_conditions.append("gender = %s")
-                    params.append(str(gender))
-                
-                # ลองหา record ที่ vacancy_status ยัง NULL หรือเป็น 'คนครอง' แต่ไม่มีชื่อ
-                where_conditions.append("(vacancy_status IS NULL OR (full_name IS NULL OR full_name = '' OR full_name = 'ตำแหน่งว่าง'))")
-                
-                query = f"""
-                    UPDATE personnel 
-                    SET vacancy_status = %s,
-                        department = COALESCE(%s, department),
-                        headquarters = COALESCE(%s, headquarters)
-                    WHERE {' AND '.join(where_conditions)}
-                    AND id IN (
-                        SELECT id FROM personnel 
-                        WHERE {' AND '.join(where_conditions)}
-                        LIMIT 1
-                    )
-                """
-                
-                params_full = [vacancy_status,
-                              str(department) if pd.notna(department) else None,
-                              str(headquarters) if pd.notna(headquarters) else None] + params + params
-                
-                cursor.execute(query, params_full)
-                
-                if cursor.rowcount > 0:
-                    updated_wang += 1
-                else:
-                    not_found += 1
-                    
-        except Exception as e:
-            print(f"Error at row {idx}: {e}")
+        rows.append({
+            'row': idx + 2,  # เลขแถวใน Excel (header แถว 1)
+            'vacancy_status': vacancy_status,
+            'full_name': _text(row.get('ชื่อ-นามสกุล')),
+            'rank': _text(row.get('ยศ')),
+            'position': _text(row.get('ชื่อตำแหน่ง')),
+            'department': _text(row.get('สังกัด')),
+            'headquarters': _unit(row.get('บก.')),
+            'gender': _text(row.get('เพศ')),
+            'sequence': _sequence(row.get('ลำดับ')),
+        })
+    return rows
+
+
+def is_named(row):
+    return row['full_name'] is not None and row['rank'] is not None and 'ตำแหน่งว่าง' not in row['full_name']
+
+
+class MatchIndex:
+    """personnel ที่โหลดมาครั้งเดียว + hash index สำหรับจับคู่"""
+
+    def __init__(self, records):
+        self.records = {r['id']: r for r in records}
+        self.by_name = defaultdict(list)
+        for r in records:
+            self.by_name[(r['full_name'], r['rank'])].append(r['id'])
+        # ตำแหน่งที่ยังว่าง/ยังไม่มีสถานะ - เงื่อนไขเดียวกับ UPDATE เดิม
+        self.vacant = [r for r in records if r['vacancy_status'] is None or r['full_name'] in VACANT_NAMES]
+        self._slots = {}
+        self.claimed = set()
+
+    def slot_index(self, mask):
+        """hash index ของตำแหน่งว่างตาม column ชุดหนึ่ง (สร้างครั้งแรกที่ใช้)"""
+        if mask not in self._slots:
+            index = defaultdict(list)
+            for r in self.vacant:
+                index[tuple(r[f] for f in mask)].append(r['id'])
+            self._slots[mask] = index
+        return self._slots[mask]
+
+
+def assign_named(index, rows, report):
+    """คนครอง: (ชื่อ, ยศ) -> ทุก id ที่ตรง (แถวซ้ำใน Excel ใช้แถวสุดท้าย)"""
+    latest = {}
+    for row in rows:
+        key = (row['full_name'], row['rank'])
+        if key in latest:
+            report['duplicate'].append((row['row'], f"{row['full_name']} ({row['rank']}) ซ้ำกับแถว {latest[key]['row']}"))
+        latest[key] = row
+
+    assignments = {}
+    for key, row in latest.items():
+        ids = index.by_name.get(key, [])
+        if not ids:
+            report['not_found'].append((row['row'], f"{row['full_name']} ({row['rank']})"))
             continue
-        
-        if (idx + 1) % 100 == 0:
-            print(f"Processed {idx + 1} rows...")
-            conn.commit()  # Commit ทุก 100 rows
-    
-    conn.commit()
-    cursor.close()
-    conn.close()
-    
-    print(f"✅ Updated คนครอง: {updated_krong}")
-    print(f"✅ Updated ตำแหน่งว่าง: {updated_wang}")
-    print(f"⚠️  Not found: {not_found}")
+        if len(ids) > 1:
+            report['ambiguous'].append((row['row'], f"{row['full_name']} ({row['rank']}) ตรงกับ {len(ids)} แถว: {ids}"))
+        for person_id in ids:
+            assignments[person_id] = row
+            index.claimed.add(person_id)
+    return assignments
+
+
+def assign_vacant(index, rows, report):
+    """ตำแหน่งว่าง: จับคู่ตาม slot - ลำดับตรงกับ sequence_number ก่อน แล้วเรียงตาม id"""
+    groups = defaultdict(list)
+    for row in rows:
+        if row['position'] is None:
+            report['not_found'].append((row['row'], 'ตำแหน่งว่างไม่มีชื่อตำแหน่ง'))
+            continue
+        mask = tuple(f for f in SLOT_FIELDS if row[f] is not None)
+        groups[(mask, tuple(row[f] for f in mask))].append(row)
+
+    assignments = {}
+    for (mask, key), group in groups.items():
+        candidates = [i for i in index.slot_index(mask).get(key, []) if i not in index.claimed]
+        label = ' / '.join(key)
+        if len(candidates) > len(group):
+            report['ambiguous'].append((group[0]['row'], f"{label}: {len(candidates)} แถวว่างสำหรับ {len(group)} แถวใน Excel"))
+
+        by_sequence = {index.records[i]['sequence_number']: i for i in reversed(candidates)}
+        pending = []
+        for row in group:
+            person_id = by_sequence.get(row['sequence']) if row['sequence'] else None
+            if person_id is not None and person_id not in index.claimed:
+                assignments[person_id] = row
+                index.claimed.add(person_id)
+            else:
+                pending.append(row)
+
+        remaining = iter(i for i in candidates if i not in index.claimed)
+        for row in pending:
+            person_id = next(remaining, None)
+            if person_id is None:
+                reason = 'duplicate' if candidates else 'not_found'
+                report[reason].append((row['row'], f"{label}: ไม่มีแถวว่างเหลือ"))
+                continue
+            assignments[person_id] = row
+            index.claimed.add(person_id)
+    return assignments
+
+
+def print_report(report, limit=10):
+    for kind, icon in (('ambiguous', '⚠️ '), ('duplicate', '🔁'), ('not_found', '❓')):
+        entries = report[kind]
+        if not entries:
+            continue
+        print(f"{icon} {kind}: {len(entries)}")
+        for row, message in entries[:limit]:
+            print(f"     แถว {row}: {message}")
+        if len(entries) > limit:
+            print(f"     ... อีก {len(entries) - limit}")
+
+
+def update_from_excel(file_path, plan=False):
+    print(f"\n📂 Reading {file_path}...")
+    df = read_excel(file_path)
+    print(f"Total rows: {len(df)}")
+    rows = sheet_rows(df)
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(SELECT_CANDIDATES)
+        columns = [d[0] for d in cursor.description]
+        index = MatchIndex([dict(zip(columns, r)) for r in cursor.fetchall()])
+        print(f"🗂️  Loaded {len(index.records)} personnel ({len(index.vacant)} vacant candidates)")
+
+        report = {'ambiguous': [], 'duplicate': [], 'not_found': []}
+        named = assign_named(index, [r for r in rows if is_named(r)], report)
+        vacant = assign_vacant(index, [r for r in rows if not is_named(r) and r['vacancy_status'] == 'ตำแหน่งว่าง'], report)
+
+        values = [(person_id, row['vacancy_status'], row['department'], row['headquarters'])
+                  for person_id, row in sorted({**named, **vacant}.items())]
+        if plan:
+            print(f"📝 Plan only - {len(values)} rows would be updated")
+        elif values:
+            execute_values(cursor, BATCH_UPDATE, values, template=BATCH_TEMPLATE, page_size=len(values))
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    print(f"✅ Updated คนครอง: {len(named)}")
+    print(f"✅ Updated ตำแหน่งว่าง: {len(vacant)}")
+    print_report(report)
+    return report
+
 
 if __name__ == '__main__':
-    print("=== Updating from สัญญาบัตร.xlsx ===")
-    update_from_excel('สัญญาบัตร.xlsx')
-    
-    print("\n=== Updating from ประทวน.xlsx ===")
-    update_from_excel('ประทวน.xlsx')
-    
+    use_reader_option(sys.argv)
+    plan = '--plan' in sys.argv
+    files = [a for a in sys.argv[1:] if not a.startswith('--')] or ['สัญญาบัตร.xlsx', 'ประทวน.xlsx']
+
+    for file_path in files:
+        print(f"=== Updating from {file_path} ===")
+        update_from_excel(file_path, plan=plan)
+
     print("\n🎉 All done!")